@@ -0,0 +1,73 @@
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.gui.needed_dict import ALLOWED_COLUMNS
+
+def sensor_columns(n_columns):
+    """
+  This function returns n_columns column names shaped like the sensor schema in ALLOWED_COLUMNS ("time" first, then the sensors).
+  Extra sensor columns are added if n_columns is larger than the schema.
+  """
+    sensors = sorted(col for col in ALLOWED_COLUMNS if col != "time")
+    columns = ["time"] + sensors
+    i = 1
+    while len(columns) < n_columns:
+        columns.append(f"extraSen{i}")
+        i += 1
+    return columns[:max(n_columns, 1)]
+
+def generate_frame(file_index, n_rows, n_columns, seed=0):
+    """
+  This function generates one deterministic file worth of sensor readings. Every file covers its own time range,
+  one reading per second, so the files are sorted by "time" within and across files.
+  """
+    rng = np.random.default_rng(seed + file_index)
+    columns = sensor_columns(n_columns)
+    start = pd.Timestamp("2024-01-01") + pd.Timedelta(seconds=file_index * n_rows)
+
+    data = {}
+    for column in columns:
+        if column == "time":
+            data[column] = pd.date_range(start, periods=n_rows, freq="s").strftime("%Y-%m-%d %H:%M:%S")
+        elif column.startswith("hum"):
+            data[column] = rng.uniform(30, 70, n_rows).round(2)
+        else:
+            data[column] = rng.normal(22, 3, n_rows).round(2)
+    return pd.DataFrame(data)
+
+def generate_dataset(output_dir, n_files, n_rows, n_columns, file_format="csv", seed=0):
+    """
+  This function writes n_files files of n_rows x n_columns synthetic sensor data into output_dir and returns their paths.
+  """
+    os.makedirs(output_dir, exist_ok=True)
+    extension = "xlsx" if file_format == "excel" else file_format
+    paths = []
+    for i in range(n_files):
+        df = generate_frame(i, n_rows, n_columns, seed)
+        path = os.path.join(output_dir, f"sensor_{i:04d}.{extension}")
+        if extension == "csv":
+            df.to_csv(path, index=False)
+        elif extension == "xlsx":
+            df.to_excel(path, index=False)
+        elif extension == "parquet":
+            df.to_parquet(path, index=False)
+        else:
+            raise ValueError(f"Unsupported format '{file_format}'.")
+        paths.append(path)
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic sensor dataset.")
+    parser.add_argument("output_dir")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--columns", type=int, default=len(ALLOWED_COLUMNS))
+    parser.add_argument("--format", choices=["csv", "excel", "parquet"], default="csv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate_dataset(args.output_dir, args.files, args.rows, args.columns, args.format, args.seed)
@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import statistics
+from datetime import datetime, timezone
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from benchmarks.generate_dataset import generate_dataset, sensor_columns
+from src.combine_files import combine_and_filter, combine_files
+from src.filter_combined_file import filter_file
+
+# (files, rows per file, columns) for every scale
+SCALES = {
+    "tiny": (2, 100, 9),
+    "small": (8, 2000, 9),
+    "medium": (32, 20000, 9),
+    "large": (64, 100000, 12),
+}
+
+CONDITIONS = {
+    "tempSen1": {"type": "greater_than", "value": 20.0},
+    "humSen1": {"type": "less_than", "value": 60.0},
+    "columns_to_keep": ["time", "tempSen1", "humSen1"],
+}
+
+def measure(function, repeat):
+    """
+  This function runs function repeat times and returns the wall times and the peak traced memory (in MB).
+  tracemalloc slows allocations down a lot, so the memory is measured in one extra run that isn't timed.
+  """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak / (1024 * 1024)
+
+def benchmark_cases(input_dir, work_dir, file_format, chunk_size, workers):
+    """
+  This function returns the (name, callable) pairs to benchmark for one generated dataset.
+  The filter benchmarks all read the same combined file, written once here to a path none of the benchmarks write to.
+  """
+    extension = "xlsx" if file_format == "excel" else file_format
+    file_type = file_format if file_format in {"csv", "excel", "parquet"} else "all"
+    combined = os.path.join(work_dir, f"combined.{extension}")
+    filtered = os.path.join(work_dir, f"filtered.{extension}")
+    filter_input = os.path.join(work_dir, f"filter_input.{extension}")
+    combine_files(input_dir, filter_input, file_type, use_cache=False)
+
+    def combine_then_filter():
+        # what the GUI used to do: combine, read the output back and filter it
+        combine_files(input_dir, combined, file_type, use_cache=False)
+        filter_file(combined, combined, CONDITIONS, use_cache=False)
+
+    cases = [
+        ("combine_files", lambda: combine_files(input_dir, combined, file_type, use_cache=False)),
+        ("combine_files_chunked", lambda: combine_files(input_dir, combined, file_type, chunk_size=chunk_size, use_cache=False)),
+        ("combine_files_parallel", lambda: combine_files(input_dir, combined, file_type, workers=workers, use_cache=False)),
+        ("combine_files_merged", lambda: combine_files(input_dir, combined, file_type, chunk_size=chunk_size, use_cache=False, merge_on="time")),
+        ("filter_file", lambda: filter_file(filter_input, filtered, CONDITIONS, use_cache=False)),
+        ("filter_file_chunked", lambda: filter_file(filter_input, filtered, CONDITIONS, chunk_size=chunk_size, use_cache=False)),
+        ("combine_then_filter", combine_then_filter),
+        ("combine_and_filter", lambda: combine_and_filter(input_dir, combined, CONDITIONS, file_type, use_cache=False)),
+    ]
+    # Excel files can't be memory mapped
+    if file_format != "excel":
+        cases += [
+            ("combine_files_memory_map", lambda: combine_files(input_dir, combined, file_type, use_cache=False, memory_map=True)),
+            ("filter_file_memory_map", lambda: filter_file(filter_input, filtered, CONDITIONS, use_cache=False, memory_map=True)),
+        ]
+    return cases
+
+def run_benchmarks(scales, formats, repeat=3, chunk_size=50000, workers=4, work_root=None):
+    """
+  This function generates the datasets, runs every benchmark on them and returns the results as a dict.
+  """
+    results = []
+    work_root = work_root or tempfile.mkdtemp(prefix="combine_filter_bench_")
+    try:
+        for scale in scales:
+            n_files, n_rows, n_columns = SCALES[scale]
+            for file_format in formats:
+                input_dir = os.path.join(work_root, f"{scale}_{file_format}", "input")
+                work_dir = os.path.dirname(input_dir)
+                paths = generate_dataset(input_dir, n_files, n_rows, n_columns, file_format)
+                input_bytes = sum(os.path.getsize(path) for path in paths)
+
+                for name, function in benchmark_cases(input_dir, work_dir, file_format, chunk_size, workers):
+                    seconds, peak_mb = measure(function, repeat)
+                    results.append({
+                        "benchmark": name,
+                        "scale": scale,
+                        "format": file_format,
+                        "files": n_files,
+                        "rows": n_files * n_rows,
+                        "columns": len(sensor_columns(n_columns)),
+                        "input_bytes": input_bytes,
+                        "seconds_min": min(seconds),
+                        "seconds_median": statistics.median(seconds),
+                        "rows_per_second": n_files * n_rows / min(seconds) if min(seconds) else None,
+                        "peak_traced_mb": round(peak_mb, 3),
+                    })
+                    print(f"{scale:>6} {file_format:>7} {name:<24} {min(seconds):8.3f}s {peak_mb:10.1f} MB", file=sys.stderr)
+    finally:
+        shutil.rmtree(work_root, ignore_errors=True)
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "chunk_size": chunk_size,
+        "workers": workers,
+        "results": results,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark combine_files and filter_file on synthetic sensor data.")
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["tiny", "small"])
+    parser.add_argument("--formats", nargs="+", choices=["csv", "excel", "parquet"], default=["csv"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    args = parser.parse_args()
+
+    # the per-file log lines would dominate the timings of small files
+    logging.disable(logging.WARNING)
+    report = run_benchmarks(args.scales, args.formats, args.repeat, args.chunk_size, args.workers)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+AGGREGATE_FUNCTIONS = ("mean", "min", "max", "count", "sum")
+
+# the partial aggregates every function is computed from; they can be merged across chunks by the "merge" function
+PARTIALS = {"mean": ("sum", "count"), "sum": ("sum",), "count": ("count",), "min": ("min",), "max": ("max",)}
+MERGE_PARTIALS = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+# partial results held before they are merged into one
+MAX_PARTIALS = 8
+
+def aggregation_spec(aggregate):
+    """
+  This function fills in the defaults of an aggregation spec: {"by": "time", "every": None, "functions": ["mean", "min", "max", "count"],
+  "columns": None}. by is a key column (or a list of them), every a time bucket size for the time column by (e.g. "1min", "15s",
+  "1h"; pandas frequency strings), and columns the columns to aggregate (all numeric columns other than by by default).
+  """
+    spec = {"by": "time", "every": None, "functions": ["mean", "min", "max", "count"], "columns": None, **aggregate}
+    spec["by"] = [spec["by"]] if isinstance(spec["by"], str) else list(spec["by"])
+    if isinstance(spec["functions"], str):
+        spec["functions"] = [spec["functions"]]
+    return spec
+
+def validate_aggregation(aggregate, df_columns):
+    """
+  This function validates an aggregation spec (see aggregation_spec) against the columns it is applied to.
+  """
+    if not isinstance(aggregate, dict):
+        raise ValueError("The aggregation should be a dict with 'by', 'every', 'functions' and 'columns'.")
+    unknown_keys = set(aggregate) - {"by", "every", "functions", "columns"}
+    if unknown_keys:
+        raise ValueError(f"Unknown aggregation options: {', '.join(sorted(unknown_keys))}.")
+    spec = aggregation_spec(aggregate)
+
+    invalid_columns = [col for col in spec["by"] + (spec["columns"] or []) if col not in df_columns]
+    if invalid_columns:
+        raise ValueError(f"The following columns of the aggregation are not valid: {', '.join(invalid_columns)}")
+    invalid_functions = [function for function in spec["functions"] if function not in AGGREGATE_FUNCTIONS]
+    if invalid_functions or not spec["functions"]:
+        raise ValueError(f"Unsupported aggregate functions: {', '.join(invalid_functions) or 'none given'}. Choose from {', '.join(AGGREGATE_FUNCTIONS)}.")
+    if spec["every"] is not None:
+        if len(spec["by"]) != 1:
+            raise ValueError("Time buckets ('every') need a single time column in 'by'.")
+        try:
+            pd.Timestamp(0).floor(spec["every"])
+        except ValueError:
+            raise ValueError(f"Invalid time bucket '{spec['every']}', use a fixed frequency such as '1min', '15s' or '1h'.") from None
+
+class Aggregator:
+    """
+  This is a helper class to aggregate a table chunk by chunk: every chunk is reduced to partial aggregates per group
+  (sum, count, min and max, as far as the functions need them), and partials are merged by summing or taking the
+  min/max of them, so only one row per group is kept whatever the number of rows. result() turns them into the
+  aggregated table with one <column>_<function> column per aggregated column and function, sorted by the groups.
+  """
+    def __init__(self, aggregate):
+        self.spec = aggregation_spec(aggregate)
+        self.partial_names = list(dict.fromkeys(partial for function in self.spec["functions"] for partial in PARTIALS[function]))
+        self.columns = self.spec["columns"]
+        self.partials = []
+        self.rows_in = 0
+
+    def _keys(self, chunk):
+        if self.spec["every"] is None:
+            return [chunk[column] for column in self.spec["by"]]
+        column = chunk[self.spec["by"][0]]
+        if not pd.api.types.is_datetime64_any_dtype(column.dtype):
+            column = pd.to_datetime(column, errors="coerce", format="ISO8601")
+        return [column.dt.floor(self.spec["every"])]
+
+    def add(self, chunk):
+        """
+      This method reduces a chunk to partial aggregates per group and keeps them.
+      """
+        self.rows_in += len(chunk)
+        if self.columns is None:
+            self.columns = [col for col in chunk.columns if col not in self.spec["by"] and pd.api.types.is_numeric_dtype(chunk[col].dtype)
+                            and not pd.api.types.is_bool_dtype(chunk[col].dtype)]
+        if chunk.empty:
+            return
+        grouped = chunk[self.columns].groupby(self._keys(chunk), sort=False)
+        self.partials.append({name: getattr(grouped, name)() for name in self.partial_names})
+        if len(self.partials) > MAX_PARTIALS:
+            self.partials = [self._merge(self.partials)]
+
+    def _merge(self, partials):
+        if len(partials) == 1:
+            return partials[0]
+        merged = {}
+        for name in self.partial_names:
+            frames = pd.concat([partial[name] for partial in partials])
+            merged[name] = getattr(frames.groupby(level=list(range(frames.index.nlevels)), sort=False), MERGE_PARTIALS[name])()
+        return merged
+
+    def result(self):
+        """
+      This method returns the aggregated table, with the group keys as the first columns.
+      """
+        names = [f"{column}_{function}" for column in self.columns or [] for function in self.spec["functions"]]
+        if not self.partials:
+            return pd.DataFrame(columns=self.spec["by"] + names)
+
+        partial = self._merge(self.partials)
+        results = {}
+        for column in self.columns:
+            for function in self.spec["functions"]:
+                if function == "mean":
+                    counts = partial["count"][column]
+                    values = partial["sum"][column] / counts.where(counts > 0, np.nan)
+                else:
+                    values = partial[function][column]
+                results[f"{column}_{function}"] = values
+        result = pd.DataFrame(results).sort_index()
+        result.index.names = self.spec["by"]
+        return result.reset_index()
@@ -0,0 +1,189 @@
+import sys
+import json
+import logging
+import argparse
+
+# the job modules (and pandas with them) are only imported once a command runs, so --help and argument errors stay instant
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+def load_file(path):
+    """
+  This function loads a JSON or YAML (.yaml/.yml, needs PyYAML) file.
+  """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("YAML files require PyYAML. Install it with 'pip install pyyaml'.") from None
+            try:
+                return yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"{path} is not valid YAML: {e}") from None
+        return json.load(f)
+
+def load_conditions(conditions_file):
+    """
+  This function loads filter conditions from a JSON or YAML file. The file holds either the conditions dict used by
+  filter_file, or a list of [column, condition_type, value] / [special_key, [columns]] items as built by the GUI.
+  """
+    conditions = load_file(conditions_file)
+
+    if isinstance(conditions, list):
+        try:
+            from .filter_combined_file import conditions_from_list
+        except ImportError:
+            from filter_combined_file import conditions_from_list
+        conditions = conditions_from_list(conditions)
+    if not isinstance(conditions, dict):
+        raise ValueError(f"{conditions_file} must contain a dict or a list of conditions.")
+    return conditions
+
+def load_schema(schema_file):
+    """
+  This function loads a schema spec from a JSON or YAML file: a dict of column names or patterns to dtypes, e.g. {"tempSen*": "float32", "time": "datetime"}.
+  """
+    schema = load_file(schema_file)
+    if not isinstance(schema, dict) or not all(isinstance(dtype, str) for dtype in schema.values()):
+        raise ValueError(f"{schema_file} must contain a dict of column names or patterns to dtypes.")
+    return schema
+
+def load_aggregation(aggregation_file):
+    """
+  This function loads an aggregation spec from a JSON or YAML file, e.g. {"by": "time", "every": "1min", "functions": ["mean", "min", "max", "count"]}.
+  """
+    aggregate = load_file(aggregation_file)
+    if not isinstance(aggregate, dict):
+        raise ValueError(f"{aggregation_file} must contain a dict with 'by', 'every', 'functions' and 'columns'.")
+    return aggregate
+
+def build_parser():
+    """
+  This function builds the argument parser with the combine, filter and pipeline commands.
+  """
+    parser = argparse.ArgumentParser(prog="combine_filter", description="Combine and filter CSV, Excel, Parquet and Feather files without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    job_options = argparse.ArgumentParser(add_help=False)
+    job_options.add_argument("--chunk-size", type=int, help="stream the data this many rows at a time instead of loading whole files")
+    job_options.add_argument("--no-cache", action="store_true", help="don't use the on-disk cache of parsed Excel files")
+    job_options.add_argument("--metrics-file", help="write the job's stage metrics to this file (.json, or .prom for Prometheus)")
+    job_options.add_argument("--schema", help="JSON or YAML file mapping column names or patterns to dtypes, e.g. {\"tempSen*\": \"float32\"}")
+    job_options.add_argument("--csv-engine", choices=["c", "pyarrow"], help="parser for CSV files (pyarrow is faster, not used with --chunk-size)")
+    job_options.add_argument("--memory-map", action="store_true",
+                             help="memory map CSV, Parquet and Feather inputs; Parquet and Feather ones stay in Arrow buffers")
+    job_options.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="logging level (default: INFO)")
+
+    combine_options = argparse.ArgumentParser(add_help=False)
+    combine_options.add_argument("input_dir", help="directory with the files to combine")
+    combine_options.add_argument("output_file", help="combined output file (.csv, .xlsx, .parquet, .feather or .arrow, CSV optionally compressed, e.g. .csv.gz)")
+    combine_options.add_argument("--file-type", default="both", choices=["csv", "excel", "parquet", "feather", "both", "all"],
+                                 help="type of the files to combine (default: both)")
+    combine_options.add_argument("--workers", type=int, help="number of files parsed in parallel")
+    combine_options.add_argument("--incremental", action="store_true", help="only append files that were not combined into the output yet")
+    combine_options.add_argument("--no-preflight", action="store_true", help="don't check the headers of all files before combining")
+    combine_options.add_argument("--recursive", action="store_true", help="also combine the files in the subdirectories of input_dir")
+    combine_options.add_argument("--include", action="append", help="only combine files matching this glob pattern (file name, or path relative to input_dir if it has a /), repeatable")
+    combine_options.add_argument("--exclude", action="append", help="skip files matching this glob pattern, repeatable")
+    combine_options.add_argument("--min-mtime", help="skip files modified before this ISO date/time, e.g. 2024-01-31 or 2024-01-31T12:00")
+    combine_options.add_argument("--max-mtime", help="skip files modified after this ISO date/time")
+    combine_options.add_argument("--min-size", type=int, help="skip files smaller than this many bytes")
+    combine_options.add_argument("--max-size", type=int, help="skip files larger than this many bytes")
+    combine_options.add_argument("--sort-by", default="name", choices=["name", "mtime", "timestamp"],
+                                 help="combination order: path, modification time or the date in the path (default: name)")
+    combine_options.add_argument("--reconcile", choices=["union", "intersection"],
+                                 help="align files with differing columns to the union or intersection of their columns instead of aborting")
+    combine_options.add_argument("--merge-on", metavar="COLUMN",
+                                 help="merge files that are each sorted by COLUMN (e.g. time) into an output sorted by it")
+    combine_options.add_argument("--dedup", nargs="*", metavar="COLUMN",
+                                 help="drop rows that were already combined, compared on the given columns or the whole row if none are given")
+    combine_options.add_argument("--infer-schema", action="store_true", help="infer the dtypes from the first file and read every file with them")
+
+    combine = commands.add_parser("combine", parents=[combine_options, job_options], help="combine the files of a directory")
+    combine.add_argument("--conditions", help="JSON or YAML file with filter conditions applied before combining")
+
+    filter_parser = commands.add_parser("filter", parents=[job_options], help="filter a single file")
+    filter_parser.add_argument("input_file", help="file to filter")
+    filter_parser.add_argument("output_file", help="filtered output file")
+    filter_parser.add_argument("--conditions", help="JSON or YAML file with the filter conditions (default: no conditions)")
+    filter_parser.add_argument("--aggregate", help="JSON or YAML file with an aggregation spec, to write one row of aggregates per group (e.g. per minute)")
+
+    pipeline = commands.add_parser("pipeline", parents=[combine_options, job_options], help="combine the files of a directory and filter them in one pass")
+    pipeline.add_argument("--conditions", required=True, help="JSON or YAML file with the filter conditions")
+    return parser
+
+def run_command(args, conditions, schema=None, aggregate=None):
+    """
+  This function runs the job of the parsed command and returns its JobMetrics.
+  """
+    if args.command == "filter":
+        try:
+            from .filter_combined_file import filter_file
+        except ImportError:
+            from filter_combined_file import filter_file
+        return filter_file(args.input_file, args.output_file, conditions or {}, chunk_size=args.chunk_size,
+                           use_cache=not args.no_cache, metrics_file=args.metrics_file, schema=schema, csv_engine=args.csv_engine,
+                           memory_map=args.memory_map, aggregate=aggregate)
+
+    try:
+        from .combine_files import combine_files
+    except ImportError:
+        from combine_files import combine_files
+    discovery = {
+        "recursive": args.recursive, "include": args.include, "exclude": args.exclude, "min_mtime": args.min_mtime,
+        "max_mtime": args.max_mtime, "min_size": args.min_size, "max_size": args.max_size, "sort_by": args.sort_by,
+    }
+    return combine_files(args.input_dir, args.output_file, file_type=args.file_type, chunk_size=args.chunk_size, workers=args.workers,
+                         preflight=not args.no_preflight, conditions=conditions, incremental=args.incremental,
+                         use_cache=not args.no_cache, metrics_file=args.metrics_file, schema=schema,
+                         infer_schema_from_first=args.infer_schema, csv_engine=args.csv_engine, memory_map=args.memory_map,
+                         discovery=discovery, reconcile=args.reconcile, merge_on=args.merge_on,
+                         dedup=True if args.dedup == [] else args.dedup)
+
+def main(argv=None):
+    """
+  This is the main function of the command line interface. It returns 0 on success, 1 if the job failed
+  (the reason is logged) and 2 for invalid arguments, conditions, schema or aggregation files.
+  """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # configured before the job modules are imported, so their own basicConfig calls don't apply
+    logging.basicConfig(level=args.log_level, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    conditions = None
+    if args.conditions:
+        try:
+            conditions = load_conditions(args.conditions)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not load the conditions: {e}")
+            return EXIT_USAGE
+
+    schema = None
+    if args.schema:
+        try:
+            schema = load_schema(args.schema)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not load the schema: {e}")
+            return EXIT_USAGE
+
+    aggregate = None
+    if getattr(args, "aggregate", None):
+        try:
+            aggregate = load_aggregation(args.aggregate)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not load the aggregation: {e}")
+            return EXIT_USAGE
+
+    try:
+        metrics = run_command(args, conditions, schema, aggregate)
+    except KeyboardInterrupt:
+        logging.warning("Interrupted.")
+        return 130
+    return EXIT_OK if metrics.succeeded else EXIT_FAILED
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,55 @@
 import os
+import heapq
 import logging
+import multiprocessing
+import numpy as np
 import pandas as pd
+from collections import deque
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    from .file_io import COMPRESSIONS, FILE_FORMATS, ChunkWriter, get_file_format, iter_file_chunks, read_file_sample, read_frame, write_frame
+    from .dedup import SeenRows
+    from .discovery import discover_files
+    from .expressions import DATE_PATTERN
+    from .filter_combined_file import apply_conditions, log_conditions, select_columns, validate_conditions
+    from .job_progress import JobCancelled, ProgressTracker
+    from .manifest import file_entry, load_manifest, manifest_outdated_reason, new_manifest, save_manifest
+    from .metrics import JobMetrics
+    from .parse_cache import ParseCache
+    from .schema import align_frame, apply_schema, common_dtype, dtype_name, infer_schema, resolve_schema
+except ImportError:
+    from file_io import COMPRESSIONS, FILE_FORMATS, ChunkWriter, get_file_format, iter_file_chunks, read_file_sample, read_frame, write_frame
+    from dedup import SeenRows
+    from discovery import discover_files
+    from expressions import DATE_PATTERN
+    from filter_combined_file import apply_conditions, log_conditions, select_columns, validate_conditions
+    from job_progress import JobCancelled, ProgressTracker
+    from manifest import file_entry, load_manifest, manifest_outdated_reason, new_manifest, save_manifest
+    from metrics import JobMetrics
+    from parse_cache import ParseCache
+    from schema import align_frame, apply_schema, common_dtype, dtype_name, infer_schema, resolve_schema
 
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# CSV files may be compressed (.csv.gz, .csv.bz2, .csv.xz, .csv.zst)
+CSV_EXTENSIONS = (".csv",) + tuple(f".csv{extension}" for extension in COMPRESSIONS)
+
+FILE_TYPE_EXTENSIONS = {
+    "csv": CSV_EXTENSIONS,
+    "excel": (".xlsx",),
+    "parquet": (".parquet",),
+    "feather": (".feather", ".arrow"),
+    "both": CSV_EXTENSIONS + (".xlsx",),
+    "all": tuple(FILE_FORMATS) + CSV_EXTENSIONS[1:],
+}
+
+RECONCILE_MODES = ("union", "intersection")
+
+# rows read at a time from every input of a merge (see merge_and_save) if no chunk_size is given
+MERGE_CHUNK_ROWS = 50000
+
 def validate_directory(input_dir, output_file):
     """
   This function ensures that the input directory exists and create output directory if needed.
@@ -19,24 +65,28 @@ def validate_directory(input_dir, output_file):
 
     return True
 
-def get_files(input_dir, file_type, output_file):
+def get_files(input_dir, file_type, output_file, recursive=False, include=None, exclude=None, min_mtime=None, max_mtime=None,
+              min_size=None, max_size=None, sort_by="name"):
     """
   This function gets files of specified type from input directory and validate output file extension.
+  The files are returned as paths relative to input_dir, found, filtered and sorted as described in discover_files.
+  The output file is never part of them, even if it is inside input_dir.
   """
-    if file_type == "csv":
-        files = [f for f in os.listdir(input_dir) if f.endswith(".csv")]
-        if not output_file.endswith(".csv"):
-            logging.error("Output file extension does not match the specified file_type 'csv'.")
-            return None
-    elif file_type == "excel":
-        files = [f for f in os.listdir(input_dir) if f.endswith(".xlsx")]
-        if not output_file.endswith(".xlsx"):
-            logging.error("Output file extension does not match the specified file_type 'excel'.")
-            return None
-    elif file_type == "both":
-        files = [f for f in os.listdir(input_dir) if f.endswith(".csv") or f.endswith(".xlsx")]
-    else:
-        logging.error("Invalid file_type specified. Choose 'csv', 'excel', or 'both'.")
+    if file_type not in FILE_TYPE_EXTENSIONS:
+        logging.error("Invalid file_type specified. Choose 'csv', 'excel', 'parquet', 'feather', 'both' or 'all'.")
+        return None
+
+    extensions = FILE_TYPE_EXTENSIONS[file_type]
+    try:
+        files = discover_files(input_dir, extensions, recursive, include, exclude, min_mtime, max_mtime, min_size, max_size, sort_by,
+                               skip=[output_file])
+    except ValueError as e:
+        logging.error(f"Invalid file discovery options: {e}")
+        return None
+
+    # a single file type has to be written back in the same format
+    if file_type not in {"both", "all"} and not output_file.endswith(extensions):
+        logging.error(f"Output file extension does not match the specified file_type '{file_type}'.")
         return None
 
     if not files:
@@ -45,29 +95,146 @@ def get_files(input_dir, file_type, output_file):
 
     return files
 
-def check_column_consistency(df, columns_list, dtypes_list=None):
+def check_column_consistency(df, columns_list, dtypes_list=None, target=None):
     """
   This function checks if the DataFrame's columns are consistent with the initial columns in both names and order.
+  Dtypes are compared by name (see dtype_name), so Arrow backed and NumPy backed files can be combined.
+  In a reconciled combination, the DataFrame is already aligned to the target (see align_frame), which widens the target
+  for values its sampled rows didn't show, so only the columns are checked and the target's dtypes are returned.
   """
+    if target is not None:
+        columns_list, dtypes_list = columns_list or list(target), list(target.values())
     if columns_list is None:
         return list(df.columns), list(df.dtypes)
-    elif list(df.columns) != columns_list or (dtypes_list and list(df.dtypes) != dtypes_list):
+    elif list(df.columns) != columns_list or (target is None and dtypes_list and list(map(dtype_name, df.dtypes)) != list(map(dtype_name, dtypes_list))):
         logging.error("Files have inconsistent columns or data types. Aborting combination.")
         return None, None
     return columns_list, dtypes_list
 
-def read_file(file_path):
+def _dtype_family(dtype):
+    # samples only see the first rows, so ints and floats (NaN further down) are treated as the same kind
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    return "text"
+
+def _sample_schema(sample):
+    # columns that are empty in the sample don't tell anything about their type
+    return {column: _dtype_family(sample[column].dtype) for column in sample.columns if sample[column].notna().any()}
+
+def _probe_samples(input_dir, files, sample_rows=100, workers=None):
+    # the header and first rows of every file, or None for the files that are empty or can't be read
+    def probe(file):
+        try:
+            return read_file_sample(os.path.join(input_dir, file), sample_rows)
+        except Exception as e:
+            # unreadable files are reported (and skipped) by the full read later on
+            logging.debug(f"Could not probe {file}: {e}")
+            return None
+
+    if workers and workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(probe, files))
+    return [probe(file) for file in files]
+
+def probe_files(input_dir, files, sample_rows=100, workers=None):
     """
-  This function reads a file into a DataFrame, handling CSV and Excel formats and logging any errors.
+  This function checks the columns, column order and dtypes of all files using only their header and first rows.
+  Every inconsistent file is logged at once and False is returned, so the combination can abort before any file is fully parsed.
+  """
+    samples = _probe_samples(input_dir, files, sample_rows, workers)
+
+    reference_file = None
+    problems = []
+    for file, sample in zip(files, samples):
+        if sample is None:
+            continue
+        if reference_file is None:
+            reference_file, reference_columns, reference_schema = file, list(sample.columns), _sample_schema(sample)
+            continue
+
+        columns = list(sample.columns)
+        if columns != reference_columns:
+            if sorted(map(str, columns)) == sorted(map(str, reference_columns)):
+                problems.append(f"File {file} has the columns in a different order: {columns} (expected {reference_columns}).")
+            else:
+                problems.append(f"File {file} has the columns {columns} (expected {reference_columns}).")
+            continue
+
+        schema = _sample_schema(sample)
+        mismatched = [
+            f"{column} ({schema[column]}, expected {reference_schema[column]})"
+            for column in columns if column in schema and column in reference_schema and schema[column] != reference_schema[column]
+        ]
+        if mismatched:
+            problems.append(f"File {file} has inconsistent data types: {', '.join(mismatched)}.")
+
+    if problems:
+        logging.error("Files have inconsistent columns or data types. Aborting combination.")
+        for problem in problems:
+            logging.error(f"{problem} Reference file: {reference_file}.")
+        return False
+    return True
+
+def reconcile_files(input_dir, files, mode="union", sample_rows=100, workers=None):
+    """
+  This function builds the target schema of a reconciled combination from the header and first rows of every file:
+  the union (or intersection, with mode="intersection") of their columns in the order they first appear, each with
+  a dtype all of the files can be cast to (see common_dtype). Every file is then aligned to it (see align_frame).
+  It returns the target as a dict of column to dtype, or None if the files can't be reconciled.
+  """
+    if mode not in RECONCILE_MODES:
+        logging.error(f"Invalid reconcile mode '{mode}'. Choose {' or '.join(RECONCILE_MODES)}.")
+        return None
+
+    samples = [sample for sample in _probe_samples(input_dir, files, sample_rows, workers) if sample is not None]
+    if not samples:
+        logging.warning("No valid files to combine after processing.")
+        return None
+
+    columns = list(dict.fromkeys(column for sample in samples for column in sample.columns))
+    partial = [column for column in columns if not all(column in sample.columns for sample in samples)]
+    if mode == "intersection":
+        columns = [column for column in columns if column not in partial]
+        if not columns:
+            logging.error("The files have no columns in common. Aborting combination.")
+            return None
+        if partial:
+            logging.info(f"Columns not in every file are left out: {', '.join(map(str, partial))}.")
+    elif partial:
+        logging.info(f"Columns not in every file are filled with nulls: {', '.join(map(str, partial))}.")
+
+    target = {}
+    for column in columns:
+        present = [sample[column] for sample in samples if column in sample.columns]
+        # columns that are empty in the sample don't tell anything about their type
+        dtypes = [values.dtype for values in present if values.notna().any()] or [values.dtype for values in present]
+        target[column] = common_dtype(dtypes, nullable=len(present) < len(samples))
+    return target
+
+def read_file(file_path, cache=None, schema=None, csv_engine=None, memory_map=False):
+    """
+  This function reads a file into a DataFrame, handling CSV, Excel, Parquet and Feather formats and logging any errors.
+  If a ParseCache is given, Excel files are loaded from (and stored in) the cache instead of being parsed every time.
+  The schema spec, csv_engine and memory_map are passed on to read_frame.
   """
     try:
-        if file_path.endswith(".csv"):
-            return pd.read_csv(file_path)
-        elif file_path.endswith(".xlsx"):
-            return pd.read_excel(file_path)
-        else:
+        file_format = get_file_format(file_path)
+        if file_format is None:
             logging.warning(f"Skipping unsupported file format for {file_path}.")
             return None
+        if cache is None or file_format != "excel":
+            return read_frame(file_path, schema=schema, csv_engine=csv_engine, memory_map=memory_map)
+
+        # the cache keeps the file as parsed, the schema is applied on top
+        df = cache.get(file_path)
+        if df is None:
+            df = read_frame(file_path)
+            cache.put(file_path, df)
+        return apply_schema(df, resolve_schema(schema, df.columns)) if schema else df
     except pd.errors.EmptyDataError:
         logging.warning(f"File {file_path} is empty. Skipping.")
     except pd.errors.ParserError:
@@ -78,62 +245,673 @@ def read_file(file_path):
         logging.error(f"An error occurred while processing {file_path}: {e}")
     return None
 
-def combine_and_save(df_list, output_file):
+class _LogCollector(logging.Handler):
+    """
+  This is a helper class to collect the log records of a worker process so they can be re-emitted by the main process.
+  """
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+def _read_file_in_subprocess(file_path, cache=None, schema=None, csv_engine=None, memory_map=False):
     """
-  This function combines DataFrames and save to the specified output file.
+  This function runs read_file in a worker process and returns the DataFrame along with the log records it produced.
   """
+    collector = _LogCollector()
+    root_logger = logging.getLogger()
+    saved_handlers = root_logger.handlers[:]
+    root_logger.handlers = [collector]
+    try:
+        df = read_file(file_path, cache, schema, csv_engine, memory_map)
+    finally:
+        root_logger.handlers = saved_handlers
+    return df, collector.records
+
+def read_files(file_paths, workers=None, cache=None, schema=None, csv_engine=None, memory_map=False):
+    """
+  This function reads the files with read_file and yields the DataFrames in the order of file_paths.
+  With workers > 1, Excel files are parsed in a process pool and CSV files in a thread pool. Only a bounded number
+  of files is in flight at a time, and any work still pending is cancelled when the caller stops iterating.
+  If a worker fails itself (e.g. a worker process dies), the error is logged, the pending work is cancelled and no
+  more files are yielded, so the caller has to check that it got all of them.
+  """
+    if not workers or workers <= 1:
+        for file_path in file_paths:
+            yield read_file(file_path, cache, schema, csv_engine, memory_map)
+        return
+
+    thread_pool = ThreadPoolExecutor(max_workers=workers)
+    process_pool = None
+    pending = deque()
+    remaining = iter(file_paths)
+
+    def submit(file_path):
+        nonlocal process_pool
+        if file_path.endswith(".xlsx"):
+            # openpyxl parsing holds the GIL, so Excel files go to separate processes
+            if process_pool is None:
+                process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            pending.append((process_pool.submit(_read_file_in_subprocess, file_path, cache, schema, csv_engine, memory_map), file_path, True))
+        else:
+            pending.append((thread_pool.submit(read_file, file_path, cache, schema, csv_engine, memory_map), file_path, False))
+
+    try:
+        for _ in range(workers * 2):
+            file_path = next(remaining, None)
+            if file_path is None:
+                break
+            submit(file_path)
+
+        while pending:
+            future, file_path, in_subprocess = pending.popleft()
+            next_path = next(remaining, None)
+            if next_path is not None:
+                submit(next_path)
+
+            try:
+                result = future.result()
+            except Exception as e:
+                # read_file handles the errors of the file itself, this is the worker failing (e.g. BrokenProcessPool)
+                logging.error(f"Reading {file_path} failed in a worker: {e!r}. Aborting combination.")
+                return
+            if in_subprocess:
+                df, records = result
+                for record in records:
+                    logging.getLogger().handle(record)
+                yield df
+            else:
+                yield result
+    finally:
+        thread_pool.shutdown(wait=False, cancel_futures=True)
+        if process_pool is not None:
+            process_pool.shutdown(wait=False, cancel_futures=True)
+
+def prepare_conditions(conditions, columns_list):
+    """
+  This function validates the filter conditions against the combined columns and returns the columns left in the output.
+  It returns None (and logs the error) if the conditions are invalid.
+  """
+    try:
+        validate_conditions(conditions, columns_list)
+    except ValueError as ve:
+        logging.error(f"Value error: {ve}")
+        return None
+    except TypeError as te:
+        logging.error(f"Type error: {te}")
+        return None
+    return select_columns(columns_list, conditions)
+
+def combine_and_save(df_list, output_file, append=False, metrics=None):
+    """
+  This function combines DataFrames and save to the specified output file (or appends them to it).
+  It returns True if the output file was written.
+  """
+    metrics = metrics or JobMetrics()
     if not df_list:
         logging.warning("No valid files to combine after processing.")
-        return
+        return False
 
-    combined_df = pd.concat(df_list, ignore_index=True)
+    with metrics.stage("concat") as stats:
+        combined_df = pd.concat(df_list, ignore_index=True)
+        stats.add(rows_in=len(combined_df), rows_out=len(combined_df))
     logging.info("DataFrames combined successfully.")
 
     try:
-        if output_file.endswith(".csv"):
-            combined_df.to_csv(output_file, index=False, float_format="%.15g")
-        elif output_file.endswith(".xlsx"):
-            combined_df.to_excel(output_file, index=False)
-        else:
-            logging.error("Output file must be either .csv or .xlsx")
-            return
-
+        with metrics.stage("write") as stats:
+            if append:
+                with ChunkWriter(output_file, append=True) as writer:
+                    writer.write(combined_df)
+            else:
+                write_frame(combined_df, output_file)
+            stats.add(rows_in=len(combined_df), bytes_written=os.path.getsize(output_file))
         logging.info(f"Files combined and saved successfully into {output_file}.")
+        return True
+    except ValueError as ve:
+        logging.error(ve)
     except PermissionError:
         logging.error(f"Permission denied. Unable to write to {output_file}.")
     except Exception as e:
         logging.error(f"An unexpected error occurred while writing the file: {e}")
+    return False
 
-
-def combine_files(input_dir, output_file, file_type="both"):
+def check_dedup_columns(dedup, columns_list):
     """
-  This is the main function to combine files based on file type and save to output file.
+  This function checks that the key columns of the deduplication (see SeenRows) are in the combined columns.
+  It returns False (and logs the error) if some are missing.
   """
-    if not validate_directory(input_dir, output_file):
-        return
+    missing = dedup.missing_columns(columns_list)
+    if missing:
+        logging.error(f"The deduplication key columns {', '.join(missing)} are not in the files. Aborting combination.")
+        return False
+    return True
 
-    files = get_files(input_dir, file_type, output_file)
-    if files is None:
-        return
+def drop_duplicate_rows(df, dedup, metrics):
+    """
+  This function drops the rows of df that were already combined (see SeenRows), timed as the dedup stage.
+  """
+    with metrics.stage("dedup") as stats:
+        result = dedup.drop_duplicates(df)
+        stats.add(rows_in=len(df), rows_out=len(result))
+    return result
 
+def read_and_save(input_dir, files, output_file, workers=None, conditions=None, columns_list=None, dtypes_list=None, append=False, cache=None, tracker=None,
+                  metrics=None, schema=None, csv_engine=None, memory_map=False, target=None, dedup=None):
+    """
+  This function reads the files (in parallel if workers > 1), checks their columns, filters them if conditions are given
+  and combines them into the output file. columns_list and dtypes_list can be given to check the files against a known schema.
+  The tracker (see ProgressTracker) is updated after every file and may cancel the job before anything is written,
+  and the stages are recorded in metrics (see JobMetrics). The files are read with the schema spec, csv_engine and memory_map (see read_frame),
+  and aligned to the target schema of a reconciled combination (see reconcile_files) if it is given.
+  With dedup (see SeenRows), rows that were already combined are dropped before the conditions are applied.
+  It returns the columns and dtypes of the combined files, or None if nothing was written.
+  """
+    tracker = tracker or ProgressTracker()
+    metrics = metrics or JobMetrics()
     df_list = []
-    columns_list = None
-    dtypes_list = None
+    output_columns = None
+    files_read = 0
 
-    for file in files:
-        file_path = os.path.join(input_dir, file)
-        df = read_file(file_path)
+    file_paths = [os.path.join(input_dir, file) for file in files]
+    with closing(read_files(file_paths, workers, cache, schema, csv_engine, memory_map)) as frames:
+        # with workers, the read stage only counts the time spent waiting for the next file
+        for file, file_path, df in zip(files, file_paths, metrics.timed(frames, "read")):
+            files_read += 1
+            metrics.count("read", bytes_read=os.path.getsize(file_path))
+            tracker.file_done(file_path)
+            if df is not None:
+                tracker.add_rows(len(df))
+                if df.empty:
+                    logging.warning(f"File {file_path} is empty after reading. Skipping.")
+                    continue
+
+                with metrics.stage("validate"):
+                    if target is not None:
+                        df = align_frame(df, target)
+                    columns_list, dtypes_list = check_column_consistency(df, columns_list, dtypes_list, target)
+                    if columns_list is None:
+                        return None
+                    if dedup is not None and not df_list and not check_dedup_columns(dedup, columns_list):
+                        return None
 
-        if df is not None:
-            if df.empty:
+                    if conditions is not None and output_columns is None:
+                        output_columns = prepare_conditions(conditions, columns_list)
+                        if output_columns is None:
+                            return None
+                if dedup is not None:
+                    df = drop_duplicate_rows(df, dedup, metrics)
+                if conditions is not None:
+                    df = apply_conditions(df, conditions, output_columns, metrics)
+
+                df_list.append(df)
+                logging.info(f"File {file} successfully read and appended.")
+
+    # read_files stops early (and logs why) if a worker failed
+    if files_read < len(files):
+        return None
+    if conditions is not None and output_columns is not None:
+        log_conditions(conditions)
+    if not combine_and_save(df_list, output_file, append, metrics):
+        return None
+    # the output is already written, so the job can't be cancelled anymore
+    tracker.rows_written += sum(len(df) for df in df_list)
+    tracker.emit()
+    return columns_list, dtypes_list
+
+def stream_and_save(input_dir, files, output_file, chunk_size, conditions=None, columns_list=None, dtypes_list=None, append=False, tracker=None,
+                    metrics=None, schema=None, memory_map=False, target=None, dedup=None):
+    """
+  This function streams the files chunk by chunk straight into the output file, so at most one chunk is held in memory.
+  The schema of every file is checked on its first chunk only: the dtypes of its later chunks may differ (e.g. a column of
+  ints with decimals further down, which the writer widens), while read_and_save compares whole files and rejects a file
+  whose decimals make it differ from the first one. Nothing is written to output_file if the combination is aborted
+  (or cancelled through the tracker, which is updated after every chunk). If conditions are given, every chunk is filtered before it is written.
+  The stages are recorded in metrics (see JobMetrics), and every chunk is read with the schema spec and memory_map (see iter_file_chunks).
+  With the target schema of a reconciled combination (see reconcile_files), every chunk is aligned to it on its own.
+  With dedup (see SeenRows), rows that were already written are dropped from every chunk, keeping only their hashes.
+  It returns the columns and dtypes of the combined files, or None if nothing was written.
+  """
+    tracker = tracker or ProgressTracker()
+    metrics = metrics or JobMetrics()
+    try:
+        writer = ChunkWriter(output_file, append=append)
+    except ValueError as ve:
+        logging.error(ve)
+        return None
+    except PermissionError:
+        logging.error(f"Permission denied. Unable to write to {output_file}.")
+        return None
+
+    output_columns = None
+
+    with writer:
+        for file in files:
+            file_path = os.path.join(input_dir, file)
+            rows_before = writer.rows_written
+            file_rows = 0
+            failed = False
+
+            try:
+                for chunk in metrics.timed(iter_file_chunks(file_path, chunk_size, schema=schema, memory_map=memory_map), "read"):
+                    if target is not None:
+                        with metrics.stage("validate"):
+                            chunk = align_frame(chunk, target)
+                    if file_rows == 0:
+                        with metrics.stage("validate"):
+                            columns_list, dtypes_list = check_column_consistency(chunk, columns_list, dtypes_list, target)
+                            if columns_list is None:
+                                writer.abort()
+                                return None
+                            if dedup is not None and not check_dedup_columns(dedup, columns_list):
+                                writer.abort()
+                                return None
+                            if conditions is not None and output_columns is None:
+                                output_columns = prepare_conditions(conditions, columns_list)
+                                if output_columns is None:
+                                    writer.abort()
+                                    return None
+                    rows_read = len(chunk)
+                    file_rows += rows_read
+                    if dedup is not None:
+                        chunk = drop_duplicate_rows(chunk, dedup, metrics)
+                    if conditions is not None:
+                        chunk = apply_conditions(chunk, conditions, output_columns, metrics)
+                    with metrics.stage("write") as stats:
+                        writer.write(chunk)
+                        stats.add(rows_in=len(chunk))
+                    tracker.add_rows(rows_read, len(chunk))
+            except JobCancelled:
+                raise
+            except pd.errors.EmptyDataError:
+                logging.warning(f"File {file_path} is empty. Skipping.")
+                tracker.file_done(file_path)
+                continue
+            except pd.errors.ParserError:
+                logging.error(f"File {file_path} could not be parsed. Skipping.")
+                failed = True
+            except PermissionError:
+                logging.error(f"Permission denied while reading {file_path}. Skipping.")
+                failed = True
+            except Exception as e:
+                logging.error(f"An error occurred while processing {file_path}: {e}")
+                failed = True
+            metrics.count("read", bytes_read=os.path.getsize(file_path))
+            tracker.file_done(file_path)
+
+            # a file failing halfway through can't be skipped anymore since its first chunks are already written
+            if failed and writer.rows_written > rows_before:
+                logging.error(f"File {file_path} failed after part of it was written. Aborting combination.")
+                writer.abort()
+                return None
+            if failed:
+                continue
+            if file_rows == 0:
                 logging.warning(f"File {file_path} is empty after reading. Skipping.")
                 continue
+            logging.info(f"File {file} successfully streamed into the output.")
 
-            columns_list, dtypes_list = check_column_consistency(df, columns_list, dtypes_list)
-            if columns_list is None:
-                return
+        if conditions is not None and output_columns is not None:
+            log_conditions(conditions)
+
+        try:
+            with metrics.stage("write"):
+                saved = writer.close()
+        except PermissionError:
+            logging.error(f"Permission denied. Unable to write to {output_file}.")
+            return None
+        if not saved:
+            logging.warning("No valid files to combine after processing.")
+            return None
+
+    metrics.count("write", bytes_written=os.path.getsize(output_file))
+    logging.info(f"Files combined and saved successfully into {output_file}.")
+    return columns_list, dtypes_list
+
+def merge_keys(column, dates):
+    """
+  This function returns the values of a merge key column as a NumPy array that sorts the way the rows are merged:
+  numbers as they are, datetimes as UTC timestamps and text as strings, or as timestamps if dates is True (ISO 8601 times).
+  """
+    if column.isna().any():
+        raise ValueError(f"the merge key '{column.name}' has missing values")
+    if dates or pd.api.types.is_datetime64_any_dtype(column.dtype):
+        return pd.to_datetime(column, utc=True, format="ISO8601").dt.tz_localize(None).to_numpy()
+    if pd.api.types.is_numeric_dtype(column.dtype):
+        return column.to_numpy()
+    return column.to_numpy(dtype=object)
+
+class MergeInput:
+    """
+  This is a helper class for merge_and_save that holds the current chunk of one sorted input file and its merge keys,
+  and checks that the keys never go down, within a chunk or from one chunk to the next.
+  """
+    def __init__(self, file_path, chunks, key, dates):
+        self.file_path = file_path
+        self.chunks = chunks
+        self.key = key
+        self.dates = dates
+        self.chunk = None
+        self.keys = None
+        self.last_key = None
+
+    def advance(self):
+        """
+      This method loads the next non-empty chunk, and returns False once the file is exhausted.
+      """
+        for chunk in self.chunks:
+            if len(chunk) == 0:
+                continue
+            keys = merge_keys(chunk[self.key], self.dates)
+            if (keys[1:] < keys[:-1]).any() or (self.last_key is not None and keys[0] < self.last_key):
+                raise ValueError(f"it is not sorted by '{self.key}'")
+            self.chunk, self.keys, self.last_key = chunk, keys, keys[-1]
+            return True
+        self.chunk = self.keys = None
+        return False
+
+    def take(self, bound):
+        """
+      This method removes the rows with a key up to bound from the current chunk and returns them with their keys.
+      """
+        stop = int(np.searchsorted(self.keys, bound, side="right"))
+        rows, keys = self.chunk.iloc[:stop], self.keys[:stop]
+        self.chunk, self.keys = self.chunk.iloc[stop:], self.keys[stop:]
+        return rows, keys
+
+def merge_and_save(input_dir, files, output_file, key, chunk_size=None, conditions=None, tracker=None, metrics=None, schema=None,
+                   memory_map=False, target=None, dedup=None):
+    """
+  This function combines files that are each sorted by the key column into one output sorted by it, without a global sort.
+  All files are streamed at once, chunk_size rows at a time (MERGE_CHUNK_ROWS by default), so at most one chunk per file is
+  held in memory. A heap of the last key of every current chunk gives the smallest of them: every row up to that key can be
+  written, since no later chunk has a smaller one. Those rows are merged with a stable sort (rows with the same key keep
+  the file order), filtered if conditions are given, and written out before the exhausted chunks are replaced.
+  With dedup (see SeenRows), rows that were already written are dropped from every merged batch.
+  Text keys that look like ISO 8601 dates are compared as timestamps. The combination is aborted, leaving output_file
+  untouched, if a file isn't sorted or fails halfway through. It returns the columns and dtypes of the merged files, or None.
+  """
+    tracker = tracker or ProgressTracker()
+    metrics = metrics or JobMetrics()
+    chunk_size = chunk_size or MERGE_CHUNK_ROWS
+    try:
+        writer = ChunkWriter(output_file)
+    except ValueError as ve:
+        logging.error(ve)
+        return None
+    except PermissionError:
+        logging.error(f"Permission denied. Unable to write to {output_file}.")
+        return None
+
+    def read_chunks(file_path):
+        for chunk in metrics.timed(iter_file_chunks(file_path, chunk_size, schema=schema, memory_map=memory_map), "read"):
+            if target is not None:
+                with metrics.stage("validate"):
+                    chunk = align_frame(chunk, target)
+            tracker.add_rows(len(chunk))
+            yield chunk
+
+    columns_list, dtypes_list, output_columns, dates = None, None, None, None
+    inputs = []
+    with writer:
+        file_path = None
+        try:
+            # open every file on its first chunk, which is also where its columns are checked
+            for file in files:
+                file_path = os.path.join(input_dir, file)
+                chunks = read_chunks(file_path)
+                try:
+                    first_chunk = next(chunks, None)
+                except pd.errors.EmptyDataError:
+                    first_chunk = None
+                except JobCancelled:
+                    raise
+                except Exception as e:
+                    # nothing of the file is written yet, so it can still be skipped
+                    logging.error(f"An error occurred while processing {file_path}: {e}. Skipping.")
+                    tracker.file_done(file_path)
+                    continue
+                if first_chunk is None or first_chunk.empty:
+                    logging.warning(f"File {file_path} is empty. Skipping.")
+                    tracker.file_done(file_path)
+                    continue
+
+                with metrics.stage("validate"):
+                    columns_list, dtypes_list = check_column_consistency(first_chunk, columns_list, dtypes_list, target)
+                    if columns_list is None:
+                        writer.abort()
+                        return None
+                    if key not in columns_list:
+                        logging.error(f"The merge key column '{key}' is not in {file_path}. Aborting combination.")
+                        writer.abort()
+                        return None
+                    if dedup is not None and not check_dedup_columns(dedup, columns_list):
+                        writer.abort()
+                        return None
+                    if conditions is not None and output_columns is None:
+                        output_columns = prepare_conditions(conditions, columns_list)
+                        if output_columns is None:
+                            writer.abort()
+                            return None
+                if dates is None:
+                    column = first_chunk[key]
+                    dates = pd.api.types.is_string_dtype(column.dtype) and DATE_PATTERN.match(str(column.iloc[0])) is not None
+
+                merge_input = MergeInput(file_path, _prepend(first_chunk, chunks), key, dates)
+                merge_input.advance()
+                inputs.append(merge_input)
+
+            heap = [(merge_input.last_key, index) for index, merge_input in enumerate(inputs)]
+            heapq.heapify(heap)
+            while heap:
+                bound, index = heapq.heappop(heap)
+                exhausted = [index]
+                while heap and heap[0][0] == bound:
+                    exhausted.append(heapq.heappop(heap)[1])
+
+                with metrics.stage("merge") as stats:
+                    pieces = [merge_input.take(bound) for merge_input in inputs if merge_input.chunk is not None]
+                    pieces = [(rows, keys) for rows, keys in pieces if len(rows)]
+                    if len(pieces) == 1:
+                        batch = pieces[0][0]
+                    else:
+                        order = np.argsort(np.concatenate([keys for _, keys in pieces]), kind="stable")
+                        batch = pd.concat([rows for rows, _ in pieces], ignore_index=True).take(order)
+                    stats.add(rows_in=len(batch), rows_out=len(batch))
+                if dedup is not None:
+                    batch = drop_duplicate_rows(batch, dedup, metrics)
+                if conditions is not None:
+                    batch = apply_conditions(batch, conditions, output_columns, metrics)
+                with metrics.stage("write") as stats:
+                    writer.write(batch)
+                    stats.add(rows_in=len(batch))
+                tracker.add_rows(0, len(batch))
+
+                for index in exhausted:
+                    file_path = inputs[index].file_path
+                    if inputs[index].advance():
+                        heapq.heappush(heap, (inputs[index].last_key, index))
+                    else:
+                        metrics.count("read", bytes_read=os.path.getsize(file_path))
+                        tracker.file_done(file_path)
+                        logging.info(f"File {os.path.relpath(file_path, input_dir)} successfully merged into the output.")
+        except JobCancelled:
+            raise
+        except Exception as e:
+            logging.error(f"An error occurred while merging {file_path}: {e}. Aborting combination.")
+            writer.abort()
+            return None
+
+        if conditions is not None and output_columns is not None:
+            log_conditions(conditions)
 
-            df_list.append(df)
-            logging.info(f"File {file} successfully read and appended.")
+        try:
+            with metrics.stage("write"):
+                saved = writer.close()
+        except PermissionError:
+            logging.error(f"Permission denied. Unable to write to {output_file}.")
+            return None
+        if not saved:
+            logging.warning("No valid files to combine after processing.")
+            return None
+
+    metrics.count("write", bytes_written=os.path.getsize(output_file))
+    logging.info(f"Files merged by '{key}' and saved successfully into {output_file}.")
+    return columns_list, dtypes_list
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+def incremental_combine(input_dir, files, output_file, file_type, chunk_size=None, workers=None, conditions=None, cache=None, tracker=None,
+                        metrics=None, schema=None, csv_engine=None, memory_map=False, target=None, options=None):
+    """
+  This function only ingests the files that are not listed in the manifest of the output file yet and appends them to it.
+  The output is rebuilt from all files if there is no usable manifest, or if an already ingested file changed or was deleted.
+  New files are appended after the existing rows, whatever their name. It returns True if the output is up to date afterwards.
+  It is also rebuilt when the combination options stored in the manifest changed (options, see new_manifest),
+  and in a reconciled combination when new files change the target columns.
+  """
+    manifest = load_manifest(output_file)
+    reason = manifest_outdated_reason(manifest, input_dir, files, output_file, file_type, conditions, options)
+    if reason is None and target is not None and list(target) != manifest["columns"]:
+        reason = "the reconciled columns changed."
+
+    if reason is None:
+        new_files = [file for file in files if file not in manifest["files"]]
+        if not new_files:
+            logging.info(f"{output_file} is up to date, no new files to combine.")
+            save_manifest(output_file, manifest)
+            return True
+        logging.info(f"Appending {len(new_files)} new file(s) to {output_file}.")
+        columns_list, dtypes_list = manifest["columns"], manifest["dtypes"]
+        append = True
+    else:
+        logging.info(f"Rebuilding {output_file}: {reason}")
+        new_files = files
+        manifest = new_manifest(input_dir, file_type, conditions, options)
+        columns_list, dtypes_list = None, None
+        append = False
 
-    combine_and_save(df_list, output_file)
+    if chunk_size:
+        combined = stream_and_save(input_dir, new_files, output_file, chunk_size, conditions, columns_list, dtypes_list, append, tracker, metrics, schema,
+                                   memory_map, target)
+    else:
+        combined = read_and_save(input_dir, new_files, output_file, workers, conditions, columns_list, dtypes_list, append, cache, tracker, metrics,
+                                 schema, csv_engine, memory_map, target)
+    if combined is None:
+        return False
+
+    manifest["columns"] = list(combined[0])
+    manifest["dtypes"] = [dtype_name(dtype) for dtype in combined[1]]
+    for file in new_files:
+        manifest["files"][file] = file_entry(os.path.join(input_dir, file))
+    save_manifest(output_file, manifest)
+    return True
+
+def infer_first_schema(input_dir, files, sample_rows=1000):
+    """
+  This function infers the schema spec from the first rows of the first readable file, so every file is parsed into the same dtypes.
+  """
+    for file in files:
+        try:
+            sample = read_file_sample(os.path.join(input_dir, file), sample_rows)
+        except Exception as e:
+            logging.debug(f"Could not infer the schema from {file}: {e}")
+            continue
+        if sample is not None:
+            schema = infer_schema(sample)
+            logging.info(f"Inferred the schema from {file}: {schema}")
+            return schema
+    return None
+
+def combine_files(input_dir, output_file, file_type="both", chunk_size=None, workers=None, preflight=True, conditions=None, incremental=False, use_cache=True,
+                  progress=None, cancel_event=None, metrics_file=None, schema=None, infer_schema_from_first=False, csv_engine=None,
+                  memory_map=False, discovery=None, reconcile=None, merge_on=None, dedup=None):
+    """
+  This is the main function to combine files based on file type and save to output file.
+  discovery holds the options of get_files, e.g. {"recursive": True, "include": ["2024/*/*/*.csv"], "sort_by": "timestamp"}.
+  With reconcile="union" (or "intersection"), files with differing columns or dtypes are aligned to a common schema
+  instead of aborting the combination (see reconcile_files). The preflight check is not needed then.
+  With merge_on (a column name, e.g. "time"), files that are each sorted by that column are merged into an output sorted
+  by it, streaming all files at once chunk_size rows at a time (see merge_and_save). It can't be combined with incremental.
+  dedup drops rows that were already combined: dedup=True compares whole rows, a list of columns (e.g. ["time", "tempSen1"])
+  only those. Only 64-bit hashes of the rows are kept (see SeenRows), and the number of dropped rows is reported in the metrics.
+  If chunk_size is given, the files are streamed into the output chunk_size rows at a time instead of being loaded at once;
+  their dtypes are then only checked on the first chunk of every file (see stream_and_save).
+  Otherwise, workers > 1 parses the files in parallel while keeping the combination order.
+  With preflight, the headers of all files are checked before any file is fully parsed.
+  If conditions are given, every file (or chunk) is filtered before it is combined, see combine_and_filter.
+  With incremental, a manifest next to the output file keeps track of the ingested files so re-runs only add new files.
+  The output is rebuilt when the conditions, schema, reconcile, dedup or discovery options differ from the previous run.
+  With use_cache, parsed Excel files are kept in an on-disk cache (see ParseCache) and loaded from there while they don't change.
+  progress is called with the job's counters as the files are processed (see ProgressTracker), and setting cancel_event
+  (a threading.Event) stops the job without leaving a partial output file.
+  It returns the JobMetrics of the job, which are also written to metrics_file (JSON, or Prometheus text for .prom files) if it is given.
+  A schema spec (column names or patterns to dtypes, e.g. {"tempSen*": "float32", "time": "datetime"}) makes every file
+  parse into the same dtypes. With infer_schema_from_first, the spec is inferred from the first file instead (when none is given).
+  csv_engine="pyarrow" parses CSV files with pyarrow's faster reader (not used for chunked reads).
+  With memory_map, CSV, Parquet and Feather inputs are memory mapped, and Parquet and Feather ones kept in Arrow buffers until they are written (see read_frame).
+  """
+    metrics = JobMetrics("combine")
+    try:
+        with metrics.stage("discover") as stats:
+            files = get_files(input_dir, file_type, output_file, **(discovery or {})) if validate_directory(input_dir, output_file) else None
+            stats.add(rows_out=len(files or []))
+        if files is None:
+            return metrics
+        if merge_on and incremental:
+            logging.error("A merged output can't be combined incrementally, new files would have to be merged into the existing rows.")
+            return metrics
+        if dedup and incremental:
+            logging.error("A deduplicated output can't be combined incrementally, the rows of earlier runs are not known.")
+            return metrics
+
+        target = None
+        if reconcile:
+            with metrics.stage("validate"):
+                target = reconcile_files(input_dir, files, reconcile, workers=workers)
+            if target is None:
+                return metrics
+        elif preflight:
+            with metrics.stage("validate"):
+                consistent = probe_files(input_dir, files, workers=workers)
+            if not consistent:
+                return metrics
+
+        if infer_schema_from_first and not schema:
+            with metrics.stage("validate"):
+                schema = infer_first_schema(input_dir, files)
+
+        seen = SeenRows(None if dedup is True else dedup) if dedup else None
+        cache = ParseCache() if use_cache else None
+        tracker = ProgressTracker(progress, cancel_event, [os.path.join(input_dir, file) for file in files])
+        try:
+            tracker.check_cancelled()
+            if merge_on:
+                metrics.succeeded = merge_and_save(input_dir, files, output_file, merge_on, chunk_size, conditions, tracker, metrics, schema,
+                                                   memory_map, target, seen) is not None
+            elif incremental:
+                metrics.succeeded = incremental_combine(input_dir, files, output_file, file_type, chunk_size, workers, conditions, cache, tracker, metrics,
+                                                        schema, csv_engine, memory_map, target,
+                                                        {"schema": schema, "reconcile": reconcile, "dedup": dedup, "discovery": discovery})
+            elif chunk_size:
+                metrics.succeeded = stream_and_save(input_dir, files, output_file, chunk_size, conditions, tracker=tracker, metrics=metrics,
+                                                    schema=schema, memory_map=memory_map, target=target, dedup=seen) is not None
+            else:
+                metrics.succeeded = read_and_save(input_dir, files, output_file, workers, conditions, cache=cache, tracker=tracker, metrics=metrics,
+                                                  schema=schema, csv_engine=csv_engine, memory_map=memory_map, target=target, dedup=seen) is not None
+        except JobCancelled:
+            logging.warning(f"Combination cancelled, {output_file} was not written.")
+        return metrics
+    finally:
+        metrics.finish(metrics_file)
+
+def combine_and_filter(input_dir, output_file, conditions, file_type="both", **kwargs):
+    """
+  This function combines the files and filters them in one pass: the conditions are applied to every file (or chunk)
+  before the combination, so the output is written only once instead of being written, read back and rewritten.
+  Any other keyword argument is passed on to combine_files.
+  """
+    return combine_files(input_dir, output_file, file_type=file_type, conditions=conditions, **kwargs)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# the hash of a missing value, whatever the dtype of its column (NaN, None, NA or NaT)
+MISSING_HASH = pd.util.hash_array(np.array([None], dtype=object))[0]
+
+def hash_values(column):
+    """
+  This function returns a 64-bit hash of every value of a column that depends on the value only, not on the dtype of the
+  column, since the same column can be read with other dtypes from other files or chunks: whole numbers are hashed as
+  int64 (1, 1.0, True and int64[pyarrow] 1 are the same), other numbers as float64, datetimes as nanoseconds and
+  everything else as text. Missing values all get MISSING_HASH.
+  """
+    missing = column.isna().to_numpy()
+    dtype = column.dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        hashes = pd.util.hash_array(pd.DatetimeIndex(column).as_unit("ns").asi8)
+    elif pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        hashes = pd.util.hash_array(column.to_numpy(dtype="int64", na_value=0))
+    elif pd.api.types.is_numeric_dtype(dtype):
+        floats = column.to_numpy(dtype="float64", na_value=np.nan)
+        # floats beyond int64 can't be whole numbers of an int64 column
+        whole = (np.trunc(floats) == floats) & (np.abs(floats) < 2.0 ** 63)
+        hashes = pd.util.hash_array(floats)
+        if whole.any():
+            hashes[whole] = pd.util.hash_array(floats[whole].astype(np.int64))
+    else:
+        hashes = pd.util.hash_array(column.astype(pd.StringDtype(na_value=np.nan)).to_numpy(dtype=object))
+    hashes[missing] = MISSING_HASH
+    return hashes
+
+class SeenRows:
+    """
+  This is a helper class to drop rows that were already seen, in the same chunk or in an earlier one, without keeping them:
+  every row is reduced to a 64-bit hash of the values (see hash_values) of all its columns, or of the key columns if given.
+  The hashes are kept in sorted runs of unique uint64 values (8 bytes per distinct row), which are merged like a binary
+  counter so there are at most log2(rows) of them to binary search. Two different rows get the same hash with a
+  probability of about rows^2 / 2^65, e.g. 3 in 10,000 for 100 million distinct rows.
+  """
+    def __init__(self, columns=None):
+        self.columns = list(columns) if columns else None
+        self.runs = []
+        self.rows_in = 0
+        self.duplicates = 0
+
+    def missing_columns(self, df_columns):
+        """
+      This method returns the key columns that are not in df_columns.
+      """
+        return [column for column in self.columns or [] if column not in df_columns]
+
+    def drop_duplicates(self, df):
+        """
+      This method returns the rows of df that were not seen yet, in their order, and remembers them.
+      """
+        self.rows_in += len(df)
+        if df.empty:
+            return df
+        hashes = self.hash_rows(df[self.columns] if self.columns else df)
+        # the first of the rows with the same hash in this chunk
+        unique, first = np.unique(hashes, return_index=True)
+        new = np.ones(len(unique), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, unique), len(run) - 1)
+            new &= run[positions] != unique
+        self._add(unique[new])
+
+        self.duplicates += len(df) - int(np.count_nonzero(new))
+        if new.all() and len(unique) == len(df):
+            return df
+        return df.iloc[np.sort(first[new])]
+
+    def hash_rows(self, df):
+        """
+      This method returns a 64-bit hash of every row of df, combining the hashes of its values (see hash_values).
+      """
+        columns = {position: hash_values(df.iloc[:, position]) for position in range(df.shape[1])}
+        if len(columns) == 1:
+            return columns[0]
+        return pd.util.hash_pandas_object(pd.DataFrame(columns, copy=False), index=False).to_numpy()
+
+    def _add(self, hashes):
+        if not len(hashes):
+            return
+        self.runs.append(hashes)
+        while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+            # the runs never share a hash, and a stable sort of two sorted runs is a linear merge
+            merged = np.concatenate([self.runs[-2], self.runs.pop()])
+            merged.sort(kind="stable")
+            self.runs[-1] = merged
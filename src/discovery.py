@@ -0,0 +1,111 @@
+import os
+import re
+import fnmatch
+from datetime import datetime
+
+SORT_KEYS = ("name", "mtime", "timestamp")
+
+# a date with an optional time in a file name or path, e.g. 2024-01-31, 20240131_1200 or 2024/01/31/
+TIMESTAMP_PATTERN = re.compile(r"(?<!\d)(\d{4})[-_./]?(\d{2})[-_./]?(\d{2})(?:[T _./-]?(\d{2})[-_:.]?(\d{2})(?:[-_:.]?(\d{2}))?)?(?!\d)")
+
+def parse_timestamp(path):
+    """
+  This function returns the first valid date (and time) found in a file name or path as a datetime, or None if there is none.
+  """
+    for match in TIMESTAMP_PATTERN.finditer(path):
+        try:
+            return datetime(*(int(part) for part in match.groups() if part is not None))
+        except ValueError:
+            # digits that only look like a date, e.g. a sensor id
+            continue
+    return None
+
+def to_epoch(value):
+    """
+  This function turns a datetime, an ISO 8601 string (e.g. "2024-01-31" or "2024-01-31T12:00") or a number of seconds since the epoch into seconds since the epoch.
+  """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+def _matcher(patterns):
+    # patterns with a "/" are matched against the path relative to the input directory, the others against the file name
+    if not patterns:
+        return None
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    path_patterns = [pattern for pattern in patterns if "/" in pattern]
+    name_patterns = [pattern for pattern in patterns if "/" not in pattern]
+    path_regex = re.compile("|".join(map(fnmatch.translate, path_patterns))) if path_patterns else None
+    name_regex = re.compile("|".join(map(fnmatch.translate, name_patterns))) if name_patterns else None
+
+    def matches(relative_path, name):
+        return bool(path_regex and path_regex.match(relative_path)) or bool(name_regex and name_regex.match(name))
+    return matches
+
+def discover_files(input_dir, extensions, recursive=False, include=None, exclude=None, min_mtime=None, max_mtime=None,
+                   min_size=None, max_size=None, sort_by="name", skip=()):
+    """
+  This function lists the files of input_dir (and its subdirectories with recursive) ending with one of the extensions,
+  as "/" separated paths relative to input_dir. include and exclude take glob patterns (a pattern or a list of them):
+  patterns with a "/" match the relative path (e.g. "2024/*/*.csv"), the others the file name (e.g. "sensor_*.csv").
+  min_mtime/max_mtime (see to_epoch) and min_size/max_size (bytes) filter by the modification time and size of the files.
+  The files are sorted by sort_by: "name" (the relative path), "mtime", or "timestamp", the date parsed from the
+  relative path (see parse_timestamp; files without one come last). Files in skip (e.g. the output file) are left out.
+  Directories are scanned with os.scandir, and files are only stat'ed if a time or size filter or sorting by mtime needs it.
+  """
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"Invalid sort_by '{sort_by}'. Choose {', '.join(SORT_KEYS)}.")
+
+    include_matches, exclude_matches = _matcher(include), _matcher(exclude)
+    min_mtime, max_mtime = to_epoch(min_mtime), to_epoch(max_mtime)
+    needs_stat = sort_by == "mtime" or any(value is not None for value in (min_mtime, max_mtime, min_size, max_size))
+
+    # files to skip by directory, so only the names in the same directory have to be compared
+    skipped = {}
+    for path in skip:
+        path = os.path.normcase(os.path.abspath(path))
+        skipped.setdefault(os.path.dirname(path), set()).add(os.path.basename(path))
+
+    found = []
+    directories = [("", input_dir)]
+    while directories:
+        prefix, directory = directories.pop()
+        skipped_names = skipped.get(os.path.normcase(os.path.abspath(directory)), ()) if skipped else ()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                relative_path = prefix + name
+                # symlinked directories are not followed, they could loop
+                if recursive and entry.is_dir(follow_symlinks=False):
+                    directories.append((relative_path + "/", entry.path))
+                    continue
+                if not name.endswith(extensions) or not entry.is_file():
+                    continue
+                if include_matches and not include_matches(relative_path, name):
+                    continue
+                if exclude_matches and exclude_matches(relative_path, name):
+                    continue
+                if skipped_names and os.path.normcase(name) in skipped_names:
+                    continue
+
+                mtime = None
+                if needs_stat:
+                    stat = entry.stat()
+                    mtime = stat.st_mtime
+                    if (min_mtime is not None and mtime < min_mtime) or (max_mtime is not None and mtime > max_mtime):
+                        continue
+                    if (min_size is not None and stat.st_size < min_size) or (max_size is not None and stat.st_size > max_size):
+                        continue
+                found.append((relative_path, mtime))
+
+    if sort_by == "mtime":
+        found.sort(key=lambda item: (item[1], item[0]))
+        return [relative_path for relative_path, _ in found]
+    files = sorted(relative_path for relative_path, _ in found)
+    if sort_by == "timestamp":
+        timestamps = {relative_path: parse_timestamp(relative_path) for relative_path in files}
+        files.sort(key=lambda relative_path: (timestamps[relative_path] is None, timestamps[relative_path] or datetime.min))
+    return files
@@ -0,0 +1,317 @@
+import re
+import operator
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# the small filter expression language, e.g.
+#   20 < tempSen1 < 30 AND (humSen1 IS NULL OR humSen1 BETWEEN 40 AND 60)
+#   time >= '2024-01-01' AND time < '2024-02-01' AND NOT sensor IN ('s1', 's2')
+#   name STARTSWITH 'lab_' OR `room name` CONTAINS 'hall'
+# Keywords are case insensitive, strings are quoted with ' or ", and column names that aren't plain identifiers
+# (or are keywords) are quoted with backticks. Rows with a missing value never match a comparison, so NOT a < 5
+# keeps them, as does a != 5.
+
+COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+OPERATOR_ALIASES = {"=": "==", "<>": "!="}
+STRING_MATCHES = {"STARTSWITH", "ENDSWITH", "CONTAINS"}
+KEYWORDS = {"AND", "OR", "NOT", "BETWEEN", "IN", "IS", "NULL", "TRUE", "FALSE"} | STRING_MATCHES
+
+# the comparisons pyarrow can use to skip Parquet row groups (see expression_filters)
+PUSHDOWN_COMPARISONS = {"==", "<", "<=", ">", ">="}
+
+TOKEN_PATTERN = re.compile(r"""
+    (?P<number>(?<![\w.])[-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<column>`[^`]+`)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_.]*)
+  | (?P<operator><=|>=|==|!=|<>|[<>=(),])
+""", re.VERBOSE)
+
+DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    while True:
+        while position < len(text) and text[position].isspace():
+            position += 1
+        if position == len(text):
+            return tokens
+        match = TOKEN_PATTERN.match(text, position)
+        if match is None:
+            raise ValueError(f"Invalid filter expression '{text}': unexpected '{text[position]}' at position {position}.")
+        kind, value = match.lastgroup, match.group()
+        if kind == "name" and value.upper() in KEYWORDS:
+            kind, value = "keyword", value.upper()
+        elif kind == "operator":
+            value = OPERATOR_ALIASES.get(value, value)
+        tokens.append((kind, value, position))
+        position = match.end()
+
+class _Parser:
+    # a recursive descent parser, from the loosest to the tightest binding: OR, AND, NOT, then a single condition
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def error(self, message):
+        if self.position < len(self.tokens):
+            message += f" at position {self.tokens[self.position][2]}"
+        return ValueError(f"Invalid filter expression '{self.text}': {message}.")
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None, len(self.text))
+
+    def accept(self, kind, value=None):
+        token_kind, token_value, _ = self.peek()
+        if token_kind == kind and (value is None or token_value == value):
+            self.position += 1
+            return token_value
+        return None
+
+    def expect(self, kind, value):
+        if self.accept(kind, value) is None:
+            raise self.error(f"expected {value}")
+
+    def parse(self):
+        if not self.tokens:
+            raise self.error("the expression is empty")
+        node = self.parse_or()
+        if self.position < len(self.tokens):
+            raise self.error(f"unexpected '{self.tokens[self.position][1]}'")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.accept("keyword", "OR"):
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ("or", tuple(children))
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.accept("keyword", "AND"):
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else ("and", tuple(children))
+
+    def parse_not(self):
+        if self.accept("keyword", "NOT"):
+            return ("not", self.parse_not())
+        return self.parse_condition()
+
+    def parse_condition(self):
+        if self.accept("operator", "("):
+            node = self.parse_or()
+            self.expect("operator", ")")
+            return node
+
+        left = self.parse_operand()
+        if left[0] == "column":
+            column = left[1]
+            if self.accept("keyword", "IS"):
+                negated = self.accept("keyword", "NOT")
+                self.expect("keyword", "NULL")
+                return ("not", ("is_null", column)) if negated else ("is_null", column)
+
+            negated = self.accept("keyword", "NOT")
+            node = None
+            if self.accept("keyword", "BETWEEN"):
+                low = self.parse_value()
+                self.expect("keyword", "AND")
+                node = ("between", column, low, self.parse_value())
+            elif self.accept("keyword", "IN"):
+                self.expect("operator", "(")
+                values = [self.parse_value()]
+                while self.accept("operator", ","):
+                    values.append(self.parse_value())
+                self.expect("operator", ")")
+                node = ("in", column, tuple(values))
+            elif self.peek()[1] in STRING_MATCHES:
+                match = self.tokens[self.position][1]
+                self.position += 1
+                value = self.parse_value()
+                if not isinstance(value, str):
+                    raise self.error(f"{match} needs a quoted string")
+                node = (match.lower(), column, value)
+            elif negated:
+                raise self.error("expected BETWEEN, IN, STARTSWITH, ENDSWITH or CONTAINS after NOT")
+            if node is not None:
+                return ("not", node) if negated else node
+
+        # a comparison, which can be chained like 20 < tempSen1 < 30
+        comparisons = []
+        while self.peek()[1] in COMPARISONS and self.peek()[0] == "operator":
+            comparison = self.tokens[self.position][1]
+            self.position += 1
+            right = self.parse_operand()
+            if left[0] != "column" and right[0] != "column":
+                raise self.error("a comparison needs a column")
+            comparisons.append(("compare", comparison, left, right))
+            left = right
+        if not comparisons:
+            raise self.error("expected a comparison")
+        return comparisons[0] if len(comparisons) == 1 else ("and", tuple(comparisons))
+
+    def parse_operand(self):
+        column = self.accept("name") or self.accept("column")
+        if column is not None:
+            return ("column", column.strip("`"))
+        return ("value", self.parse_value())
+
+    def parse_value(self):
+        kind, value, _ = self.peek()
+        if kind == "number":
+            self.position += 1
+            return float(value) if any(char in value for char in ".eE") else int(value)
+        if kind == "string":
+            self.position += 1
+            return re.sub(r"\\(.)", r"\1", value[1:-1])
+        if kind == "keyword" and value in {"TRUE", "FALSE"}:
+            self.position += 1
+            return value == "TRUE"
+        raise self.error("expected a number, a quoted string, TRUE or FALSE")
+
+@lru_cache(maxsize=256)
+def parse_expression(text):
+    """
+  This function parses a filter expression into a tree of tuples, e.g. ("and", (("compare", "<", ("value", 20), ("column", "tempSen1")), ...)).
+  Expressions are parsed once and cached, so filtering every chunk of a file doesn't parse them again.
+  It raises a ValueError pointing at the position of a syntax error.
+  """
+    if not isinstance(text, str):
+        raise ValueError(f"A filter expression must be a string, not {type(text).__name__}.")
+    return _Parser(text).parse()
+
+def expression_columns(node):
+    """
+  This function returns the columns a parsed expression uses, in the order they appear.
+  """
+    kind = node[0]
+    if kind in {"and", "or"}:
+        columns = [column for child in node[1] for column in expression_columns(child)]
+        return list(dict.fromkeys(columns))
+    if kind == "not":
+        return expression_columns(node[1])
+    if kind == "compare":
+        return list(dict.fromkeys(operand[1] for operand in node[2:] if operand[0] == "column"))
+    return [node[1]]
+
+def _is_date(value):
+    return isinstance(value, str) and DATE_PATTERN.match(value) is not None
+
+def to_timestamp(value, dtype):
+    """
+  This function turns a date literal (a string, datetime or Timestamp) into a Timestamp that compares with a column
+  of the given dtype, in the time zone of the column if it has one.
+  """
+    timestamp = pd.Timestamp(value)
+    tz = getattr(dtype, "tz", None) or getattr(getattr(dtype, "pyarrow_dtype", None), "tz", None)
+    if tz is not None and timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize(tz)
+    return timestamp
+
+class _Evaluator:
+    # evaluates a parsed expression over one DataFrame; columns are converted at most once per evaluation
+    def __init__(self, df):
+        self.df = df
+        self.dates = {}
+
+    def column(self, name, values=()):
+        column = self.df[name]
+        if any(_is_date(value) for value in values) and not pd.api.types.is_datetime64_any_dtype(column.dtype):
+            # date literals compare text columns (e.g. a time column read without a schema) as timestamps
+            if name not in self.dates:
+                self.dates[name] = pd.to_datetime(column, errors="coerce", format="ISO8601")
+            column = self.dates[name]
+        return column
+
+    def literal(self, column, value):
+        if _is_date(value) and pd.api.types.is_datetime64_any_dtype(column.dtype):
+            return to_timestamp(value, column.dtype)
+        return value
+
+    def mask(self, node):
+        kind = node[0]
+        if kind == "and" or kind == "or":
+            combine = np.logical_and if kind == "and" else np.logical_or
+            # the first combination allocates the mask (the masks of the children can be read-only views), the others reuse it
+            mask = combine(self.mask(node[1][0]), self.mask(node[1][1]))
+            for child in node[1][2:]:
+                combine(mask, self.mask(child), out=mask)
+            return mask
+        if kind == "not":
+            return ~self.mask(node[1])
+        if kind == "compare":
+            return self.compare(*node[1:])
+        if kind == "between":
+            column = self.column(node[1], node[2:])
+            return _to_mask(column.between(self.literal(column, node[2]), self.literal(column, node[3])))
+        if kind == "in":
+            column = self.column(node[1], node[2])
+            return _to_mask(column.isin([self.literal(column, value) for value in node[2]]))
+        if kind == "is_null":
+            return self.df[node[1]].isna().to_numpy()
+
+        column = self.df[node[1]]
+        text = column.astype("str") if not pd.api.types.is_string_dtype(column.dtype) else column
+        return _to_mask(getattr(text.str, kind)(node[2], **({"regex": False} if kind == "contains" else {})))
+
+    def compare(self, comparison, left, right):
+        if left[0] == "column" and right[0] == "column":
+            return _to_mask(COMPARISONS[comparison](self.df[left[1]], self.df[right[1]]))
+        if left[0] == "value":
+            # a literal on the left, as in 20 < tempSen1: flip it around
+            comparison = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}.get(comparison, comparison)
+            left, right = right, left
+
+        column = self.column(left[1], (right[1],))
+        value = self.literal(column, right[1])
+        if isinstance(column.dtype, np.dtype) and column.dtype.kind in "iufb" and isinstance(value, (int, float)):
+            return COMPARISONS[comparison](column.to_numpy(), value)
+        return _to_mask(COMPARISONS[comparison](column, value))
+
+def _to_mask(result):
+    # missing values never match
+    if isinstance(result, np.ndarray):
+        return result.astype(bool, copy=False)
+    return result.to_numpy(dtype=bool, na_value=False)
+
+def evaluate_expression(node, df):
+    """
+  This function evaluates a parsed expression over a DataFrame into a single boolean NumPy mask.
+  Every condition is a vectorized comparison and the conditions are combined in place, so no intermediate
+  DataFrame is built. Date literals (e.g. '2024-01-31' or '2024-01-31 12:00') are compared as timestamps
+  against datetime columns and against text columns, which are parsed once for the whole expression.
+  """
+    return _Evaluator(df).mask(node)
+
+def expression_filters(node):
+    """
+  This function translates the parts of a parsed expression that every row has to match (the top level AND terms)
+  into pyarrow filters, so Parquet reads can skip row groups whose statistics rule them out.
+  Only numeric, bool and non-date string literals are pushed down; the rows are still filtered by the full expression.
+  """
+    terms = node[1] if node[0] == "and" else (node,)
+    filters = []
+    for term in terms:
+        kind = term[0]
+        if kind == "compare" and term[1] in PUSHDOWN_COMPARISONS:
+            comparison, left, right = term[1:]
+            if left[0] == "value":
+                comparison = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}.get(comparison, comparison)
+                left, right = right, left
+            if left[0] == "column" and right[0] == "value" and not _is_date(right[1]):
+                filters.append((left[1], comparison, right[1]))
+        elif kind == "between" and not any(map(_is_date, term[2:])):
+            filters.extend([(term[1], ">=", term[2]), (term[1], "<=", term[3])])
+        elif kind == "in" and not any(map(_is_date, term[2])):
+            filters.append((term[1], "in", list(term[2])))
+    return filters
@@ -0,0 +1,677 @@
+import io
+import os
+import bz2
+import gzip
+import lzma
+import queue
+import tempfile
+import threading
+import pandas as pd
+from contextlib import closing, contextmanager
+
+try:
+    from .schema import apply_schema, csv_schema_options, resolve_schema, widen_float32
+except ImportError:
+    from schema import apply_schema, csv_schema_options, resolve_schema, widen_float32
+
+# rows an Excel sheet can hold, the header row included
+EXCEL_MAX_ROWS = 1048576
+# rows converted at a time when a whole DataFrame is written to an Excel file
+EXCEL_WRITE_ROWS = 100000
+
+# compressed files are decompressed on a separate thread, this many bytes at a time and at most this many blocks ahead of the parser
+READ_AHEAD_BYTES = 1024 * 1024
+READ_AHEAD_BLOCKS = 8
+
+# only CSV files are compressed as a whole, the other formats compress their data themselves
+COMPRESSIONS = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".zst": "zstd",
+}
+
+FILE_FORMATS = {
+    ".csv": "csv",
+    ".xlsx": "excel",
+    ".parquet": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+}
+
+def create_temp_file(directory, prefix=".", suffix=".part"):
+    """
+  This function creates a new, empty temporary file in directory and returns its descriptor and path, like tempfile.mkstemp.
+  Unlike mkstemp (owner only), the file gets the default permissions of new files (0o666 minus the umask), so it can
+  replace an output file as it is.
+  """
+    flags = os.O_RDWR | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    for _ in range(tempfile.TMP_MAX):
+        path = os.path.join(directory, f"{prefix}{os.urandom(6).hex()}{suffix}")
+        try:
+            return os.open(path, flags, 0o666), path
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"No unused temporary file name found in {directory}.")
+
+def get_compression(file_path):
+    """
+  This function returns the compression ("gzip", "bz2", "xz" or "zstd") of a file based on its extension, or None if it is not compressed.
+  """
+    for extension, compression in COMPRESSIONS.items():
+        if file_path.endswith(extension):
+            return compression
+    return None
+
+def get_file_format(file_path):
+    """
+  This function returns the format ("csv", "excel", "parquet" or "feather") of a file based on its extension, or None if it is not supported.
+  Compressed CSV files (e.g. .csv.gz or .csv.zst) are CSV files as well.
+  """
+    if get_compression(file_path) is not None:
+        return "csv" if os.path.splitext(file_path)[0].endswith(".csv") else None
+    for extension, file_format in FILE_FORMATS.items():
+        if file_path.endswith(extension):
+            return file_format
+    return None
+
+def _import_pyarrow():
+    # pyarrow is only needed for Parquet and Feather files, so it is an optional dependency
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Parquet and Feather files require pyarrow. Install it with 'pip install pyarrow'.") from None
+    return pyarrow
+
+def _import_zstandard():
+    # zstd isn't in the standard library (before Python 3.14), so it is an optional dependency like pyarrow
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Zstandard compressed files require zstandard. Install it with 'pip install zstandard'.") from None
+    return zstandard
+
+def open_compressed(file_path, mode="rb", compression="infer"):
+    """
+  This function opens a file as a binary stream, decompressing ("rb") or compressing ("wb", "ab") it with the given
+  compression, or the one of its extension ("infer"). Appending adds a new compressed stream after the existing ones,
+  which all of the formats read back as one.
+  """
+    if compression == "infer":
+        compression = get_compression(file_path)
+    if compression == "gzip":
+        # level 6 (zlib's default) is several times faster than gzip's default 9 for about the same size
+        return gzip.open(file_path, mode, compresslevel=6)
+    elif compression == "bz2":
+        return bz2.open(file_path, mode)
+    elif compression == "xz":
+        return lzma.open(file_path, mode)
+    elif compression == "zstd":
+        zstandard = _import_zstandard()
+        if "r" in mode:
+            return zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb"), read_across_frames=True, closefd=True)
+        return zstandard.ZstdCompressor().stream_writer(open(file_path, mode), closefd=True)
+    return open(file_path, mode)
+
+class ReadAheadReader(io.RawIOBase):
+    """
+  This is a helper class to decompress a file on a separate thread while it is being parsed. The decompressed data is read
+  ahead in blocks of READ_AHEAD_BYTES into a queue of at most READ_AHEAD_BLOCKS blocks, which the parser takes them from.
+  The decompressors release the GIL, so decompression and parsing run at the same time.
+  """
+    def __init__(self, file_path):
+        self._source = open_compressed(file_path)
+        self._blocks = queue.Queue(maxsize=READ_AHEAD_BLOCKS)
+        self._pending = memoryview(b"")
+        self._eof = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._read_ahead, daemon=True)
+        self._thread.start()
+
+    def _read_ahead(self):
+        try:
+            while not self._stop.is_set():
+                block = self._source.read(READ_AHEAD_BYTES)
+                self._put(block)
+                if not block:
+                    return
+        except Exception as e:
+            # handed to the parser, which raises it on its next read
+            self._put(e)
+
+    def _put(self, item):
+        # gives up once the reader is closed, nobody takes the blocks anymore
+        while not self._stop.is_set():
+            try:
+                self._blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            if self._eof:
+                return 0
+            block = self._blocks.get()
+            if isinstance(block, Exception):
+                raise block
+            if not block:
+                self._eof = True
+                return 0
+            self._pending = memoryview(block)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._source.close()
+        super().close()
+
+@contextmanager
+def _csv_source(file_path, read_ahead=True):
+    # plain CSV files are left to pandas, compressed ones are decompressed on a separate thread (or inline when only the start is read)
+    if get_compression(file_path) is None:
+        yield file_path
+    elif read_ahead:
+        with io.BufferedReader(ReadAheadReader(file_path), READ_AHEAD_BYTES) as source:
+            yield source
+    else:
+        with open_compressed(file_path) as source:
+            yield source
+
+def _arrow_columns(schema):
+    # leave out the index columns pandas may have stored along with the data
+    return [name for name in schema.names if not name.startswith("__index_level_")]
+
+def _open_feather(file_path, memory_map=False):
+    pa = _import_pyarrow()
+    # batches read from a memory map point into the mapped file instead of being copied into memory
+    return pa.ipc.open_file(pa.memory_map(file_path) if memory_map else file_path)
+
+def _arrow_to_pandas(data, memory_map=False):
+    # memory mapped reads keep the Arrow buffers (ArrowDtype columns) rather than converting them to NumPy arrays
+    return data.to_pandas(types_mapper=pd.ArrowDtype) if memory_map else data.to_pandas()
+
+def _csv_options(file_path, schema=None, csv_engine=None, chunked=False, columns=None, memory_map=False):
+    # the schema is resolved against the columns read, so its patterns can be handed to read_csv as plain column dtypes
+    options = csv_schema_options(resolve_schema(schema, columns or read_columns(file_path))) if schema else {}
+    # the pyarrow engine can't read in chunks, chunked reads always use the C engine
+    if csv_engine == "pyarrow" and not chunked:
+        _import_pyarrow()
+        options["engine"] = "pyarrow"
+    # the C engine parses into NumPy arrays, asking it for Arrow dtypes would only add a copy of every column. The pyarrow
+    # engine reads the file with its own (multi-threaded) reader and doesn't take memory_map, and compressed files have to be
+    # decompressed anyway
+    if memory_map and options.get("engine") != "pyarrow" and get_compression(file_path) is None:
+        options["memory_map"] = True
+    return options
+
+def read_frame(file_path, columns=None, schema=None, csv_engine=None, memory_map=False):
+    """
+  This function reads a whole file into a DataFrame. If columns is given, only those columns are read.
+  If a schema spec is given (see resolve_schema), the columns it covers are read as its dtypes; CSV files are parsed
+  straight into them, optionally with the faster pyarrow engine (csv_engine="pyarrow").
+  With memory_map, CSV, Parquet and Feather files are memory mapped instead of read through buffered file I/O. Parquet
+  and Feather DataFrames keep the Arrow buffers (ArrowDtype columns) so they are not copied again until the rows are
+  written; CSV files are still parsed into NumPy columns, as the text has to be converted anyway.
+  """
+    file_format = get_file_format(file_path)
+    if file_format == "csv":
+        options = _csv_options(file_path, schema, csv_engine, columns=columns, memory_map=memory_map)
+        with _csv_source(file_path) as source:
+            df = pd.read_csv(source, usecols=columns, **options)
+    elif file_format == "excel":
+        df = read_excel_frame(file_path, columns)
+    elif file_format == "parquet":
+        _import_pyarrow()
+        if memory_map:
+            df = pd.read_parquet(file_path, columns=columns, memory_map=True, dtype_backend="pyarrow")
+        else:
+            df = pd.read_parquet(file_path, columns=columns)
+    elif file_format == "feather":
+        _import_pyarrow()
+        if memory_map:
+            table = _open_feather(file_path, memory_map=True).read_all()
+            df = _arrow_to_pandas(table.select(columns) if columns is not None else table, memory_map=True)
+        else:
+            df = pd.read_feather(file_path, columns=columns)
+    else:
+        raise ValueError(f"Unsupported file format for {file_path}.")
+    return apply_schema(df, resolve_schema(schema, df.columns)) if schema else df
+
+def read_columns(file_path):
+    """
+  This function returns the column names of a file without reading its data.
+  """
+    file_format = get_file_format(file_path)
+    if file_format == "csv":
+        with _csv_source(file_path, read_ahead=False) as source:
+            return list(pd.read_csv(source, nrows=0).columns)
+    elif file_format == "excel":
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            header = next(workbook.active.iter_rows(values_only=True), None)
+        finally:
+            workbook.close()
+        if header is None:
+            raise pd.errors.EmptyDataError(f"No columns to parse from {file_path}.")
+        return list(header)
+    elif file_format == "parquet":
+        _import_pyarrow()
+        import pyarrow.parquet as pq
+
+        return _arrow_columns(pq.read_schema(file_path))
+    elif file_format == "feather":
+        return _arrow_columns(_open_feather(file_path).schema)
+    raise ValueError(f"Unsupported file format for {file_path}.")
+
+def iter_file_chunks(file_path, chunk_size, columns=None, filters=None, schema=None, memory_map=False):
+    """
+  This function reads a file in chunks of at most chunk_size rows and yields each chunk as a DataFrame.
+  If columns is given, only those columns are parsed (in file order).
+  For Parquet files, filters (pyarrow's [(column, op, value), ...] form) are pushed down to the reader, which skips
+  row groups based on their statistics. Other formats ignore them, so the rows still have to be filtered afterwards.
+  If a schema spec is given (see resolve_schema), every chunk gets the same dtypes.
+  With memory_map, CSV, Parquet and Feather files are memory mapped, and Parquet and Feather chunks keep their Arrow buffers (see read_frame).
+  """
+    chunks = _iter_raw_chunks(file_path, chunk_size, columns, filters, schema, memory_map)
+    if not schema:
+        yield from chunks
+        return
+
+    resolved = None
+    for chunk in chunks:
+        if resolved is None:
+            resolved = resolve_schema(schema, chunk.columns)
+        yield apply_schema(chunk, resolved)
+
+def _iter_raw_chunks(file_path, chunk_size, columns=None, filters=None, schema=None, memory_map=False):
+    file_format = get_file_format(file_path)
+    if file_format == "csv":
+        options = _csv_options(file_path, schema, chunked=True, columns=columns, memory_map=memory_map)
+        with _csv_source(file_path) as source, pd.read_csv(source, chunksize=chunk_size, usecols=columns, **options) as reader:
+            yield from reader
+    elif file_format == "excel":
+        yield from iter_excel_chunks(file_path, chunk_size, columns)
+    elif file_format == "parquet":
+        _import_pyarrow()
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        import pyarrow.fs as fs
+
+        dataset = ds.dataset(file_path, format="parquet", filesystem=fs.LocalFileSystem(use_mmap=memory_map))
+        expression = pq.filters_to_expression(filters) if filters else None
+        for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=chunk_size):
+            if batch.num_rows:
+                yield _arrow_to_pandas(batch, memory_map)
+    elif file_format == "feather":
+        reader = _open_feather(file_path, memory_map)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select([name for name in batch.schema.names if name in set(columns)])
+            # record batches can be as large as the whole file, slicing them is zero-copy
+            for offset in range(0, batch.num_rows, chunk_size):
+                yield _arrow_to_pandas(batch.slice(offset, chunk_size), memory_map)
+    else:
+        raise ValueError(f"Unsupported file format for {file_path}.")
+
+def read_file_sample(file_path, sample_rows=100, sample_bytes=64 * 1024):
+    """
+  This function reads only the header and the first sample_rows rows of a file.
+  For CSV files at most sample_bytes are read, Excel files are opened in read-only mode and left after the first rows.
+  It returns None if the file has no data rows.
+  """
+    file_format = get_file_format(file_path)
+    if file_format == "csv":
+        with open_compressed(file_path) as f:
+            data = f.read(sample_bytes)
+            truncated = f.read(1) != b""
+        if truncated:
+            # drop the last (probably incomplete) line
+            data = data[:data.rfind(b"\n") + 1]
+        try:
+            sample = pd.read_csv(io.BytesIO(data), nrows=sample_rows)
+        except pd.errors.ParserError:
+            # a quoted field spanning the cut, let pandas read just enough of the file itself
+            with _csv_source(file_path, read_ahead=False) as source:
+                sample = pd.read_csv(source, nrows=sample_rows)
+    elif file_format is not None:
+        with closing(iter_file_chunks(file_path, sample_rows)) as chunks:
+            sample = next(chunks, None)
+    else:
+        raise ValueError(f"Unsupported file format for {file_path}.")
+
+    if sample is None or sample.empty:
+        return None
+    return sample
+
+def iter_excel_chunks(file_path, chunk_size, columns=None):
+    """
+  This function streams the rows of an Excel file using openpyxl's read-only mode (see _iter_excel_rows).
+  """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        header, rows = _iter_excel_rows(workbook, file_path, columns)
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=header)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header)
+    finally:
+        workbook.close()
+
+def read_excel_frame(file_path, columns=None):
+    """
+  This function reads a whole Excel file using openpyxl's read-only mode (see _iter_excel_rows), without loading the workbook itself into memory.
+  """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        header, rows = _iter_excel_rows(workbook, file_path, columns)
+        return pd.DataFrame(list(rows), columns=header)
+    finally:
+        workbook.close()
+
+def _excel_header(cells):
+    # the column names read_excel gives: blank cells become "Unnamed: <position>" and repeated names get .1, .2, ... appended
+    names = [f"Unnamed: {i}" if cell is None or cell == "" else cell for i, cell in enumerate(cells)]
+    counts = {}
+    for i, name in enumerate(names):
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+def _iter_excel_rows(workbook, file_path, columns=None):
+    """
+  This function returns the header and an iterator over the data rows of the active sheet of a read-only workbook.
+  Like read_excel, blank rows are kept as rows of missing values, except at the end of the sheet, and the header cells
+  are named the same way (see _excel_header). Rows shorter than the header (sheets without a dimension element don't
+  pad them) are filled up with missing values.
+  Like read_excel, other sheets are ignored, unless the sheet is filled up to the Excel row limit: the rows then continue
+  on the following sheets with the same header, as written by ChunkWriter.
+  """
+    sheets = workbook.worksheets
+    index = sheets.index(workbook.active)
+    sheet_rows = sheets[index].iter_rows(values_only=True)
+    header_cells = next(sheet_rows, None)
+    if header_cells is None:
+        raise pd.errors.EmptyDataError(f"No columns to parse from {file_path}.")
+
+    full_header = _excel_header(header_cells)
+    positions = range(len(full_header))
+    if columns is not None:
+        wanted = set(columns)
+        positions = [i for i, column in enumerate(full_header) if column in wanted]
+    header = [full_header[i] for i in positions]
+
+    def rows():
+        nonlocal index, sheet_rows
+        # blank rows are held back until a row with values follows them
+        blank_rows = 0
+        while True:
+            sheet_size = 1
+            for row in sheet_rows:
+                sheet_size += 1
+                if all(value is None for value in row):
+                    blank_rows += 1
+                    continue
+                for _ in range(blank_rows):
+                    yield [None] * len(positions)
+                blank_rows = 0
+                yield [_convert_excel_value(row[i]) if i < len(row) else None for i in positions]
+            if sheet_size < EXCEL_MAX_ROWS or index + 1 >= len(sheets):
+                return
+            index += 1
+            sheet_rows = sheets[index].iter_rows(values_only=True)
+            if next(sheet_rows, None) != header_cells:
+                return
+
+    return header, rows()
+
+def _convert_excel_value(value):
+    # read_excel turns integral floats into ints, do the same so dtypes match between both readers
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def write_frame(df, output_file):
+    """
+  This function writes a whole DataFrame to a CSV, Excel, Parquet or Feather file.
+  CSV and Excel files are written through a ChunkWriter, so a failed write leaves the previous output file untouched.
+  """
+    file_format = get_file_format(output_file)
+    if file_format == "csv":
+        with ChunkWriter(output_file) as writer:
+            writer.write(df)
+    elif file_format == "excel":
+        # written in write-only mode a slice at a time, the whole workbook is never built in memory
+        with ChunkWriter(output_file) as writer:
+            # an empty DataFrame still writes its header
+            for start in range(0, max(len(df), 1), EXCEL_WRITE_ROWS):
+                writer.write(df.iloc[start:start + EXCEL_WRITE_ROWS])
+    elif file_format == "parquet":
+        _import_pyarrow()
+        df.to_parquet(output_file, index=False)
+    elif file_format == "feather":
+        _import_pyarrow()
+        df.reset_index(drop=True).to_feather(output_file)
+    else:
+        raise ValueError("Output file must be a .csv, .xlsx, .parquet, .feather or .arrow file.")
+
+class ChunkWriter:
+    """
+  This is a helper class to write DataFrames chunk by chunk into a CSV, Excel, Parquet or Feather file.
+  The data goes to a temporary file next to the output file, which only replaces the output file once close() succeeds.
+  With append, the chunks are added after the rows already in the output file. CSV files are appended to in place
+  (and truncated back on abort), other formats are rewritten with the existing rows first. CSV outputs are compressed
+  if their extension asks for it (e.g. .csv.gz, see open_compressed).
+  Parquet and Feather files take the column types of the first chunk; if a later chunk needs wider ones (e.g. floats in
+  a column of ints), the rows written so far are rewritten once with the wider types.
+  Excel files are written in openpyxl's write-only mode. When a sheet reaches the Excel row limit, the rows continue on
+  a new sheet (Sheet2, Sheet3, ...) with the header repeated.
+  """
+    def __init__(self, output_file, append=False):
+        self.file_format = get_file_format(output_file)
+        if self.file_format is None:
+            raise ValueError("Output file must be a .csv, .xlsx, .parquet, .feather or .arrow file.")
+
+        self.output_file = output_file
+        self.append = append
+        self.rows_written = 0
+        self.closed = False
+        self.saved = False
+        self._started = False
+        self._handle = None
+        self._workbook = None
+        self._sheet = None
+        self._sheet_rows = 0
+        self._header = None
+        self._arrow_writer = None
+        self._arrow_schema = None
+        self._original_size = None
+
+        if append and self.file_format == "csv":
+            self.temp_file = None
+            self._original_size = os.path.getsize(output_file)
+            return
+
+        output_dir = os.path.dirname(output_file) or "."
+        fd, self.temp_file = create_temp_file(output_dir)
+        os.close(fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def write(self, df):
+        """
+      This method appends a DataFrame to the output, writing the header only with the first chunk.
+      """
+        if self.append and self.file_format != "csv":
+            self._copy_existing_rows()
+
+        if self.file_format == "csv":
+            if not self._started:
+                # compressed by the extension of the output file, the temporary file has none
+                compression = get_compression(self.output_file)
+                if self.append:
+                    stream = open_compressed(self.output_file, "ab", compression)
+                else:
+                    stream = open_compressed(self.temp_file, "wb", compression)
+                self._handle = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+            widen_float32(df).to_csv(self._handle, header=not (self._started or self.append), index=False, float_format="%.15g")
+        elif self.file_format == "excel":
+            if not self._started:
+                from openpyxl import Workbook
+
+                self._workbook = Workbook(write_only=True)
+                self._header = [str(column) for column in df.columns]
+                self._new_sheet()
+            values = widen_float32(df).astype(object).where(df.notna(), None)
+            for row in values.itertuples(index=False, name=None):
+                if self._sheet_rows >= EXCEL_MAX_ROWS:
+                    self._new_sheet()
+                self._sheet.append(row)
+                self._sheet_rows += 1
+        else:
+            pa = _import_pyarrow()
+            if not self._started:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._arrow_schema = table.schema
+                self._arrow_writer = self._new_arrow_writer()
+            else:
+                table = self._arrow_table(df)
+            self._arrow_writer.write_table(table)
+        self._started = True
+        self.rows_written += len(df)
+
+    def _new_arrow_writer(self):
+        pa = _import_pyarrow()
+        if self.file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            return pq.ParquetWriter(self.temp_file, self._arrow_schema)
+        return pa.ipc.new_file(self.temp_file, self._arrow_schema)
+
+    def _arrow_table(self, df):
+        # every chunk is cast to the schema of the first one, unless it needs a wider one (e.g. decimals in a column of ints so far)
+        pa = _import_pyarrow()
+        try:
+            return pa.Table.from_pandas(df, schema=self._arrow_schema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            try:
+                schema = pa.unify_schemas([self._arrow_schema, table.schema], promote_options="permissive")
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                raise ValueError(f"The columns of a chunk don't fit the columns written so far: {table.schema.to_string(show_schema_metadata=False)}") from None
+        self._promote_schema(schema.with_metadata(table.schema.metadata))
+        return table.cast(self._arrow_schema)
+
+    def _promote_schema(self, schema):
+        # Arrow files can't change their schema midway, so the rows written so far are copied into a new file with the wider one
+        pa = _import_pyarrow()
+        self._arrow_writer.close()
+        written = self.temp_file
+        fd, self.temp_file = create_temp_file(os.path.dirname(self.output_file) or ".")
+        os.close(fd)
+        self._arrow_schema = schema
+        self._arrow_writer = self._new_arrow_writer()
+        try:
+            if self.file_format == "parquet":
+                import pyarrow.parquet as pq
+
+                with pq.ParquetFile(written) as source:
+                    for batch in source.iter_batches():
+                        self._arrow_writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+            else:
+                with pa.memory_map(written) as source:
+                    reader = pa.ipc.open_file(source)
+                    for i in range(reader.num_record_batches):
+                        self._arrow_writer.write_table(pa.Table.from_batches([reader.get_batch(i)]).cast(schema))
+        finally:
+            os.remove(written)
+
+    def _new_sheet(self):
+        self._sheet = self._workbook.create_sheet(f"Sheet{len(self._workbook.worksheets) + 1}")
+        self._sheet.append(self._header)
+        self._sheet_rows = 1
+
+    def _copy_existing_rows(self):
+        # the other formats can't be appended to, so the rows already in the output are written first
+        self.append = False
+        for chunk in iter_file_chunks(self.output_file, 100000):
+            self.write(chunk)
+        self.rows_written = 0
+
+    def close(self):
+        """
+      This method finalizes the output file. It returns False (and leaves no file behind) if nothing was written.
+      """
+        if self.closed:
+            return self.saved
+        if not self._started:
+            self.abort()
+            return False
+
+        try:
+            if self._handle is not None:
+                self._handle.close()
+            elif self._workbook is not None:
+                self._workbook.save(self.temp_file)
+            else:
+                self._arrow_writer.close()
+            if self.temp_file is not None:
+                os.replace(self.temp_file, self.output_file)
+        except Exception:
+            self.abort()
+            raise
+        self.closed = True
+        self.saved = True
+        return True
+
+    def abort(self):
+        """
+      This method discards everything written so far and removes the temporary file.
+      """
+        if self._handle is not None:
+            self._handle.close()
+        if self._arrow_writer is not None:
+            try:
+                self._arrow_writer.close()
+            except Exception:
+                pass
+        if self.temp_file is None:
+            # appended CSV rows are cut off again
+            with open(self.output_file, "r+b") as f:
+                f.truncate(self._original_size)
+        elif os.path.exists(self.temp_file):
+            os.remove(self.temp_file)
+        self.closed = True
@@ -1,17 +1,108 @@
 import os
+import bisect
 import logging
+import operator
+import numpy as np
 import pandas as pd
 
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+try:
+    from .aggregate import Aggregator, validate_aggregation
+    from .expressions import evaluate_expression, expression_columns, expression_filters, parse_expression, to_timestamp
+    from .file_io import ChunkWriter, get_file_format, iter_file_chunks, read_columns, read_frame, write_frame
+    from .job_progress import JobCancelled, ProgressTracker
+    from .metrics import JobMetrics
+    from .parse_cache import ParseCache
+    from .schema import apply_schema, resolve_schema
+except ImportError:
+    from aggregate import Aggregator, validate_aggregation
+    from expressions import evaluate_expression, expression_columns, expression_filters, parse_expression, to_timestamp
+    from file_io import ChunkWriter, get_file_format, iter_file_chunks, read_columns, read_frame, write_frame
+    from job_progress import JobCancelled, ProgressTracker
+    from metrics import JobMetrics
+    from parse_cache import ParseCache
+    from schema import apply_schema, resolve_schema
+
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 
+SPECIAL_KEYS = {"columns_to_keep", "columns_to_remove"}
+
+# the key of filter expressions (see parse_expression) in the conditions dict, e.g. {"expression": "20 < tempSen1 < 30 OR humSen1 IS NULL"}
+EXPRESSION_KEY = "expression"
+
+# the key of the time range filter (see time_window), e.g. {"time_range": {"start": "2024-01-01", "end": "2024-02-01", "sorted": True}}
+TIME_RANGE_KEY = "time_range"
+TIME_RANGE_DEFAULTS = {"column": "time", "start": None, "end": None, "sorted": None}
+
+CONDITION_OPERATORS = {
+    "greater_than": (operator.gt, ">"),
+    "less_than": (operator.lt, "<"),
+    "equals": (operator.eq, "=="),
+    "not_equals": (operator.ne, "!="),
+}
+
+# "not_equals" keeps rows with missing values in pandas but not in pyarrow, so it is never pushed down
+PUSHDOWN_CONDITION_TYPES = {"greater_than", "less_than", "equals"}
+
+def conditions_from_list(condition_list):
+    """
+  This function converts a list of conditions, as built by the GUI, to the conditions dict used for filtering.
+  Every item is either (column, condition_type, value), (special_key, [columns]) for 'columns_to_keep' / 'columns_to_remove'
+  or ('expression', text). Several conditions on one column, or several expressions, are all applied (a list in the dict).
+  """
+    conditions = {}
+    for item in condition_list:
+        if isinstance(item[1], list):
+            conditions[item[0]] = item[1]
+            continue
+        if item[0] == EXPRESSION_KEY and len(item) == 2:
+            key, condition = item
+        else:
+            column, condition_type, value = item
+            key, condition = column, {"type": condition_type, "value": value}
+        if key not in conditions:
+            conditions[key] = condition
+        elif isinstance(conditions[key], list):
+            conditions[key].append(condition)
+        else:
+            conditions[key] = [conditions[key], condition]
+    return conditions
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+def row_conditions(conditions):
+    """
+  This function returns the (column, condition) pairs of the column conditions, one pair for every condition
+  if a column has a list of them.
+  """
+    return [(key, condition) for key, value in conditions.items() if key not in SPECIAL_KEYS and key not in {EXPRESSION_KEY, TIME_RANGE_KEY}
+            for condition in _as_list(value)]
+
+def time_range(conditions):
+    """
+  This function returns the time range condition with its defaults filled in (see TIME_RANGE_DEFAULTS), or None if there is none.
+  """
+    if conditions.get(TIME_RANGE_KEY) is None:
+        return None
+    return {**TIME_RANGE_DEFAULTS, **conditions[TIME_RANGE_KEY]}
+
+def expressions(conditions):
+    """
+  This function returns the parsed filter expressions of the conditions (see parse_expression).
+  """
+    return [parse_expression(text) for text in _as_list(conditions.get(EXPRESSION_KEY, []))]
+
 def validate_conditions(conditions, df_columns):
     """
   This function validates conditions for filtering to ensure they are properly formed.
   """
-    special_keys = {"columns_to_keep", "columns_to_remove"}
-
     for key, condition in conditions.items():
-        if key in special_keys:
+        if key in SPECIAL_KEYS:
             # validate that the condition is a list
             if not isinstance(condition, list):
                 raise ValueError(f"'{key}' should be a list of columns.")
@@ -20,93 +111,388 @@ def validate_conditions(conditions, df_columns):
             invalid_columns = [col for col in condition if col not in df_columns]
             if invalid_columns:
                 raise ValueError(f"The following columns in '{key}' are not valid: {', '.join(invalid_columns)}")
+        elif key == TIME_RANGE_KEY:
+            if not isinstance(condition, dict) or not set(condition) <= set(TIME_RANGE_DEFAULTS):
+                raise ValueError(f"'{key}' should be a dict with {', '.join(TIME_RANGE_DEFAULTS)}.")
+            window = time_range(conditions)
+            if window["column"] not in df_columns:
+                raise ValueError(f"Column '{window['column']}' of the time range not found in the data. Please check the column names.")
+            if window["start"] is None and window["end"] is None:
+                raise ValueError(f"'{key}' needs a start, an end or both.")
+            bounds = [pd.Timestamp(bound) for bound in (window["start"], window["end"]) if bound is not None]
+            if len(bounds) == 2 and bounds[0] >= bounds[1]:
+                raise ValueError(f"The start of the time range ({window['start']}) has to be before its end ({window['end']}).")
+        elif key == EXPRESSION_KEY:
+            # parse every expression once here, so syntax errors and unknown columns stop the job before any row is read
+            for node in expressions(conditions):
+                invalid_columns = [col for col in expression_columns(node) if col not in df_columns]
+                if invalid_columns:
+                    raise ValueError(f"The following columns in the filter expression are not valid: {', '.join(invalid_columns)}")
         else:
             if key not in df_columns:
                 raise ValueError(f"Column '{key}' not found in the data. Please check the column names.")
-            
-            condition_type = condition.get("type")
-            value = condition.get("value")
 
-            # validate condition type
-            if condition_type not in {"greater_than", "less_than", "equals", "not_equals"}:
-                raise ValueError(f"Unsupported condition type '{condition_type}' for column '{key}'.")
+            for single_condition in _as_list(condition):
+                if not isinstance(single_condition, dict):
+                    raise ValueError(f"The condition for column '{key}' should be a dict with a type and a value, or a list of them.")
+                condition_type = single_condition.get("type")
+                value = single_condition.get("value")
+
+                # validate condition type
+                if condition_type not in CONDITION_OPERATORS:
+                    raise ValueError(f"Unsupported condition type '{condition_type}' for column '{key}'.")
+
+                # validate value type for each condition type
+                if condition_type in {"greater_than", "less_than"} and not isinstance(value, (int, float)):
+                    raise TypeError(f"Condition '{condition_type}' for column '{key}' requires a numeric value.")
+                if condition_type in {"equals", "not_equals"} and not isinstance(value, (int, float)):
+                    raise TypeError(f"Condition '{condition_type}' for column '{key}' requires a numeric value.")
 
-            # validate value type for each condition type
-            if condition_type in {"greater_than", "less_than"} and not isinstance(value, (int, float)):
-                raise TypeError(f"Condition '{condition_type}' for column '{key}' requires a numeric value.")
-            if condition_type in {"equals", "not_equals"} and not isinstance(value, (int, float)):
-                raise TypeError(f"Condition '{condition_type}' for column '{key}' requires a numeric value.")
+def _is_numpy_numeric(column):
+    # bools are left to pandas, numexpr can't compare them with < and >
+    return isinstance(column.dtype, np.dtype) and column.dtype.kind in "iuf"
 
-def filter_file(file_path, output_file, conditions):
+def build_mask(df, conditions, metrics=None):
     """
-  This function filters data in a CSV or Excel file based on specified conditions.
+  This function evaluates all row conditions into a single boolean mask, without filtering the DataFrame in between.
+  If numexpr is installed and all conditioned columns are plain numeric columns, the whole mask is computed in one numexpr pass.
+  The filter expressions are ANDed into the same mask (see evaluate_expression).
+  If metrics (see JobMetrics) are given, every condition is timed as a filter:<column> stage (the numexpr pass as filter:numexpr,
+  the expressions as filter:expression).
   """
-    try:
-        # load the file based on its extension
-        if file_path.endswith(".xlsx"):
-            df = pd.read_excel(file_path)
-            logging.info(f"Excel file '{file_path}' loaded successfully.")
-        elif file_path.endswith(".csv"):
-            df = pd.read_csv(file_path)
-            logging.info(f"CSV file '{file_path}' loaded successfully.")
+    metrics = metrics or JobMetrics()
+    column_conditions = row_conditions(conditions)
+    mask = np.ones(len(df), dtype=bool)
+
+    if numexpr is not None and column_conditions and all(_is_numpy_numeric(df[key]) for key, _ in column_conditions):
+        with metrics.stage("filter:numexpr") as stats:
+            local_dict = {}
+            terms = []
+            for i, (key, condition) in enumerate(column_conditions):
+                local_dict[f"c{i}"] = df[key].to_numpy()
+                local_dict[f"v{i}"] = condition.get("value")
+                terms.append(f"(c{i} {CONDITION_OPERATORS[condition.get('type')][1]} v{i})")
+            mask = numexpr.evaluate(" & ".join(terms), local_dict=local_dict)
+            stats.add(rows_in=len(df), rows_out=int(np.count_nonzero(mask)))
+    else:
+        for key, condition in column_conditions:
+            with metrics.stage(f"filter:{key}") as stats:
+                rows_in = int(np.count_nonzero(mask))
+                compare = CONDITION_OPERATORS[condition.get("type")][0]
+                column = df[key]
+                if _is_numpy_numeric(column):
+                    mask &= compare(column.to_numpy(), condition.get("value"))
+                else:
+                    mask &= compare(column, condition.get("value")).to_numpy(dtype=bool, na_value=False)
+                stats.add(rows_in=rows_in, rows_out=int(np.count_nonzero(mask)))
+
+    for node in expressions(conditions):
+        with metrics.stage("filter:expression") as stats:
+            rows_in = int(np.count_nonzero(mask))
+            mask &= evaluate_expression(node, df)
+            stats.add(rows_in=rows_in, rows_out=int(np.count_nonzero(mask)))
+    return mask
+
+def time_window(df, window):
+    """
+  This function finds the rows of df inside a time range (see time_range): start <= time < end.
+  If the time column is sorted (window["sorted"] is True, or it is found to be when it is None), the rows are found by
+  binary search in O(log n) and returned as a slice; otherwise a boolean mask of the rows is returned.
+  Text columns that are known to be sorted are searched by parsing only the values the binary search looks at.
+  A sorted column must not have missing times.
+  """
+    column = df[window["column"]]
+    if window["sorted"] and not pd.api.types.is_datetime64_any_dtype(column.dtype):
+        values = column.array
+        def search(bound, default):
+            return default if bound is None else bisect.bisect_left(values, pd.Timestamp(bound), key=pd.Timestamp)
+        return slice(search(window["start"], 0), search(window["end"], len(values)))
+
+    if not pd.api.types.is_datetime64_any_dtype(column.dtype):
+        column = pd.to_datetime(column, errors="coerce", format="ISO8601")
+    start, end = [to_timestamp(bound, column.dtype) if bound is not None else None for bound in (window["start"], window["end"])]
+    if window["sorted"] or (window["sorted"] is None and column.is_monotonic_increasing):
+        return slice(int(column.searchsorted(start)) if start is not None else 0,
+                     int(column.searchsorted(end)) if end is not None else len(column))
+
+    mask = np.ones(len(column), dtype=bool)
+    if start is not None:
+        mask &= (column >= start).to_numpy(dtype=bool, na_value=False)
+    if end is not None:
+        mask &= (column < end).to_numpy(dtype=bool, na_value=False)
+    return mask
+
+def chunk_time_position(chunk, window):
+    """
+  This function compares the times of a chunk with a time range (see time_range) without filtering it. It returns
+  (outside, past_end): whether all of the times are outside the range, and whether the last one is at or past its end.
+  The first and last time are used if the time column is known to be sorted (only those two values are parsed), and the
+  minimum and maximum otherwise; text columns are parsed for them the same way time_window parses them. (False, False)
+  is returned if the chunk has no valid times to compare.
+  """
+    column = chunk[window["column"]]
+    if window["sorted"]:
+        first, last = pd.Timestamp(column.iloc[0]), pd.Timestamp(column.iloc[-1])
+    else:
+        if not pd.api.types.is_datetime64_any_dtype(column.dtype):
+            column = pd.to_datetime(column, errors="coerce", format="ISO8601")
+        first, last = column.min(), column.max()
+    if pd.isna(first) or pd.isna(last):
+        return False, False
+
+    start, end = [to_timestamp(bound, column.dtype) if bound is not None else None for bound in (window["start"], window["end"])]
+    past_end = end is not None and last >= end
+    outside = (start is not None and last < start) or (end is not None and first >= end)
+    return outside, past_end
+
+def log_conditions(conditions):
+    for key, condition in row_conditions(conditions):
+        logging.info(f"Applied '{condition.get('type')}' condition on column '{key}' with value {condition.get('value')}.")
+    if time_range(conditions) is not None:
+        window = time_range(conditions)
+        logging.info(f"Applied time range [{window['start']}, {window['end']}) on column '{window['column']}'.")
+    for text in _as_list(conditions.get(EXPRESSION_KEY, [])):
+        logging.info(f"Applied filter expression '{text}'.")
+
+def select_columns(df_columns, conditions):
+    """
+  This function returns the columns left after applying 'columns_to_keep' or 'columns_to_remove'.
+  """
+    columns_to_keep = conditions.get("columns_to_keep", None)
+    columns_to_remove = conditions.get("columns_to_remove", None)
+
+    if columns_to_keep and columns_to_remove:
+        logging.warning("Both 'columns_to_keep' and 'columns_to_remove' are specified. 'columns_to_keep' will take precedence.")
+        columns_to_remove = None
+
+    if columns_to_keep:
+        logging.info(f"Kept only specified columns: {', '.join(columns_to_keep)}.")
+        return list(columns_to_keep)
+    elif columns_to_remove:
+        logging.info(f"Removed specified columns: {', '.join(columns_to_remove)}.")
+        return [col for col in df_columns if col not in columns_to_remove]
+    return list(df_columns)
+
+def apply_conditions(df, conditions, columns=None, metrics=None):
+    """
+  This function applies validated conditions to a DataFrame. The row mask is computed once and a single take
+  of only the selected columns builds the result, so removed columns are never copied.
+  A time range on a sorted time column is sliced out first (see time_window), so the other conditions only look at its rows.
+  If metrics (see JobMetrics) are given, the whole call is timed as the filter stage (the time range as filter:time_range).
+  """
+    metrics = metrics or JobMetrics()
+    with metrics.stage("filter") as stats:
+        rows_in = len(df)
+        window = time_range(conditions)
+        window_mask = None
+        if window is not None:
+            with metrics.stage("filter:time_range") as window_stats:
+                rows = time_window(df, window)
+                if isinstance(rows, slice):
+                    df = df.iloc[rows]
+                else:
+                    window_mask = rows
+                window_stats.add(rows_in=rows_in, rows_out=len(df) if window_mask is None else int(np.count_nonzero(window_mask)))
+
+        mask = build_mask(df, conditions, metrics)
+        if window_mask is not None:
+            mask &= window_mask
+        if columns is None:
+            columns = select_columns(df.columns, conditions)
+
+        rows = slice(None) if mask.all() else np.flatnonzero(mask)
+        if isinstance(rows, slice) and columns == list(df.columns):
+            result = df
         else:
-            raise ValueError("Unsupported file format. Please select a CSV or Excel file.")
+            result = df.iloc[rows, df.columns.get_indexer(columns)]
+        stats.add(rows_in=rows_in, rows_out=len(result))
+    return result
+
+def needed_columns(df_columns, conditions, output_columns):
+    """
+  This function returns the columns (in file order) that have to be read to produce output_columns and evaluate the conditions.
+  """
+    needed = set(output_columns) | {key for key, _ in row_conditions(conditions)}
+    needed.update(column for node in expressions(conditions) for column in expression_columns(node))
+    if time_range(conditions) is not None:
+        needed.add(time_range(conditions)["column"])
+    return [col for col in df_columns if col in needed]
+
+def parquet_filters(conditions):
+    """
+  This function translates the row conditions into pyarrow filters, so Parquet reads can skip row groups
+  whose statistics rule them out (see expression_filters for the filter expressions). The rows are still filtered by apply_conditions afterwards.
+  """
+    filters = []
+    for key, condition in row_conditions(conditions):
+        if condition.get("type") in PUSHDOWN_CONDITION_TYPES:
+            filters.append((key, CONDITION_OPERATORS[condition.get("type")][1], condition.get("value")))
+    for node in expressions(conditions):
+        filters.extend(expression_filters(node))
+    return filters or None
+
+def stream_filter(file_path, output_file, conditions, output_columns, usecols, chunk_size, tracker=None, metrics=None, schema=None, memory_map=False,
+                  aggregator=None):
+    """
+  This function filters a file chunk by chunk, writing the surviving rows of every chunk out right away.
+  The tracker (see ProgressTracker) is updated after every chunk, and nothing is left behind if the job is cancelled.
+  Every chunk is read with the schema spec and memory_map (see iter_file_chunks). It returns the number of rows read and written.
+  With a time range, chunks whose times are all outside of it are skipped without filtering them, and if the time column
+  is known to be sorted, reading stops at the first chunk that reaches the end of the range.
+  With an aggregator (see Aggregator), the surviving rows of every chunk are folded into it instead, and only its result is written at the end.
+  """
+    tracker = tracker or ProgressTracker()
+    metrics = metrics or JobMetrics()
+    window = time_range(conditions)
+    rows_read = 0
+    with ChunkWriter(output_file) as writer:
+        chunks = iter_file_chunks(file_path, chunk_size, columns=usecols, filters=parquet_filters(conditions), schema=schema,
+                                  memory_map=memory_map)
+        try:
+            for chunk in metrics.timed(chunks, "read"):
+                rows_read += len(chunk)
+                outside, past_end = chunk_time_position(chunk, window) if window is not None and len(chunk) else (False, False)
+                # the rest of the file is past the end of the time range once a sorted chunk reaches it
+                stop = past_end and window["sorted"]
+                if outside:
+                    metrics.count("filter:time_range", rows_in=len(chunk))
+                    tracker.add_rows(len(chunk), 0)
+                    if stop:
+                        break
+                    continue
+
+                filtered = apply_conditions(chunk, conditions, output_columns, metrics)
+                if aggregator is not None:
+                    with metrics.stage("aggregate") as stats:
+                        aggregator.add(filtered)
+                        stats.add(rows_in=len(filtered))
+                else:
+                    with metrics.stage("write") as stats:
+                        writer.write(filtered)
+                        stats.add(rows_in=len(filtered))
+                tracker.add_rows(len(chunk), len(filtered) if aggregator is None else 0)
+                if stop:
+                    break
+        finally:
+            chunks.close()
+
+        if aggregator is not None:
+            with metrics.stage("aggregate") as stats:
+                aggregated = aggregator.result()
+                stats.add(rows_out=len(aggregated))
+            with metrics.stage("write") as stats:
+                writer.write(aggregated)
+                stats.add(rows_in=len(aggregated))
+            tracker.rows_written = len(aggregated)
+        # still write the header if the file has no rows at all
+        elif rows_read == 0:
+            writer.write(pd.DataFrame(columns=output_columns))
+        with metrics.stage("write"):
+            writer.close()
+    return rows_read, writer.rows_written
+
+def filter_file(file_path, output_file, conditions, chunk_size=None, use_cache=True, progress=None, cancel_event=None, metrics_file=None,
+                schema=None, csv_engine=None, memory_map=False, aggregate=None):
+    """
+  This function filters data in a CSV, Excel, Parquet or Feather file based on specified conditions.
+  Only the columns needed for the output and the conditions are read from the file. If chunk_size is given,
+  the file is read chunk_size rows at a time and the surviving rows of every chunk are written out right away.
+  With use_cache, a parsed Excel file is kept in an on-disk cache (see ParseCache) and loaded from there while it doesn't change.
+  progress is called with the job's counters as the file is processed (see ProgressTracker), and setting cancel_event
+  (a threading.Event) stops the job without leaving a partial output file.
+  It returns the JobMetrics of the job, which are also written to metrics_file (JSON, or Prometheus text for .prom files) if it is given.
+  A schema spec (see resolve_schema) sets the dtypes of the columns it covers, and csv_engine="pyarrow" parses CSV files
+  with pyarrow's faster reader (not used for chunked reads). With memory_map, CSV, Parquet and Feather files are memory mapped,
+  and Parquet and Feather ones kept in Arrow buffers until the filtered rows are written (see read_frame).
+  With an aggregation spec (see aggregation_spec), e.g. {"by": "time", "every": "1min", "functions": ["mean", "max"]},
+  the filtered rows are grouped and only one row of aggregates per group is written; chunked reads keep partial
+  aggregates per group (see Aggregator), so the summary is made in one pass without holding the rows.
+  """
+    metrics = JobMetrics("filter")
+    try:
+        file_format = get_file_format(file_path)
+        if file_format is None:
+            raise ValueError("Unsupported file format. Please select a CSV, Excel, Parquet or Feather file.")
 
         # ensure the output directory exists
-        output_dir = os.path.dirname(output_file)
+        output_dir = os.path.dirname(output_file) or "."
         if not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
             logging.info(f"Created directory for output file at: {output_dir}")
 
-        # validate conditions
-        validate_conditions(conditions, df.columns)
-
-        # apply filtering conditions
-        for key, condition in conditions.items():
-            if key in {"columns_to_keep", "columns_to_remove"}:
-                continue  # skip special keys
-
-            condition_type = condition.get("type")
-            value = condition.get("value")
-
-            if condition_type == "greater_than":
-                df = df[df[key] > value]
-                logging.info(f"Applied 'greater_than' condition on column '{key}' with value {value}.")
-            elif condition_type == "less_than":
-                df = df[df[key] < value]
-                logging.info(f"Applied 'less_than' condition on column '{key}' with value {value}.")
-            elif condition_type == "equals":
-                df = df[df[key] == value]
-                logging.info(f"Applied 'equals' condition on column '{key}' with value {value}.")
-            elif condition_type == "not_equals":
-                df = df[df[key] != value]
-                logging.info(f"Applied 'not_equals' condition on column '{key}' with value {value}.")
-
-        # process columns to keep or remove
-        columns_to_keep = conditions.get("columns_to_keep", None)
-        columns_to_remove = conditions.get("columns_to_remove", None)
-
-        if columns_to_keep and columns_to_remove:
-            logging.warning("Both 'columns_to_keep' and 'columns_to_remove' are specified. 'columns_to_keep' will take precedence.")
-            columns_to_remove = None
-
-        if columns_to_keep:
-            df = df[columns_to_keep]
-            logging.info(f"Kept only specified columns: {', '.join(columns_to_keep)}.")
-        elif columns_to_remove:
-            df = df.drop(columns=columns_to_remove)
-            logging.info(f"Removed specified columns: {', '.join(columns_to_remove)}.")
-
-        # save the filtered data
-        if output_file.endswith(".csv"):
-            df.to_csv(output_file, index=False, float_format="%.15g")
-            logging.info(f"Filtered data saved to '{output_file}' as CSV.")
-        elif output_file.endswith(".xlsx"):
-            df.to_excel(output_file, index=False)
-            logging.info(f"Filtered data saved to '{output_file}' as Excel.")
+        # validate conditions against the header and work out which columns have to be read
+        with metrics.stage("validate"):
+            df_columns = read_columns(file_path)
+            validate_conditions(conditions, df_columns)
+            output_columns = select_columns(df_columns, conditions)
+            usecols = needed_columns(df_columns, conditions, output_columns)
+            if aggregate is not None:
+                validate_aggregation(aggregate, output_columns)
+        tracker = ProgressTracker(progress, cancel_event, [file_path])
+
+        if chunk_size:
+            aggregator = Aggregator(aggregate) if aggregate is not None else None
+            rows_read, rows_written = stream_filter(file_path, output_file, conditions, output_columns, usecols, chunk_size, tracker, metrics, schema,
+                                                     memory_map, aggregator)
+            tracker.files_done, tracker.bytes_done = 1, tracker.bytes_total
+            tracker.emit()
+            log_conditions(conditions)
+            if aggregator is not None:
+                logging.info(f"Aggregated {aggregator.rows_in} rows into {rows_written} groups.")
+            logging.info(f"Filtered {rows_read} rows of '{file_path}' in chunks, {rows_written} rows saved to '{output_file}'.")
         else:
-            raise ValueError("Output file must be either .csv or .xlsx.")
+            # load only the needed columns of the file based on its extension
+            with metrics.stage("read") as stats:
+                if file_format == "excel":
+                    cache = ParseCache() if use_cache else None
+                    df = cache.get(file_path, usecols) if cache is not None else None
+                    if df is None:
+                        df = read_frame(file_path, usecols)
+                        if cache is not None:
+                            cache.put(file_path, df, usecols)
+                    logging.info(f"Excel file '{file_path}' loaded successfully.")
+                elif file_format == "csv":
+                    df = read_frame(file_path, usecols, schema, csv_engine, memory_map)
+                    logging.info(f"CSV file '{file_path}' loaded successfully.")
+                elif file_format == "parquet":
+                    arrow_options = {"memory_map": True, "dtype_backend": "pyarrow"} if memory_map else {}
+                    df = pd.read_parquet(file_path, columns=usecols, filters=parquet_filters(conditions), **arrow_options)
+                    logging.info(f"Parquet file '{file_path}' loaded successfully.")
+                else:
+                    df = read_frame(file_path, usecols, memory_map=memory_map)
+                    logging.info(f"Feather file '{file_path}' loaded successfully.")
+                if schema and file_format != "csv":
+                    df = apply_schema(df, resolve_schema(schema, df.columns))
+                stats.add(rows_out=len(df))
+
+            # apply filtering conditions and process columns to keep or remove
+            rows_read = len(df)
+            df = apply_conditions(df, conditions, output_columns, metrics)
+            log_conditions(conditions)
+            tracker.add_rows(rows_read)
+            if aggregate is not None:
+                with metrics.stage("aggregate") as stats:
+                    aggregator = Aggregator(aggregate)
+                    aggregator.add(df)
+                    rows_filtered, df = len(df), aggregator.result()
+                    stats.add(rows_in=rows_filtered, rows_out=len(df))
+                logging.info(f"Aggregated {rows_filtered} rows into {len(df)} groups.")
+
+            # save the filtered data
+            with metrics.stage("write") as stats:
+                write_frame(df, output_file)
+                stats.add(rows_in=len(df))
+            tracker.rows_written = len(df)
+            tracker.files_done, tracker.bytes_done = 1, tracker.bytes_total
+            tracker.emit()
+            logging.info(f"Filtered data saved to '{output_file}'.")
+
+        metrics.count("read", bytes_read=os.path.getsize(file_path))
+        metrics.count("write", bytes_written=os.path.getsize(output_file))
+        metrics.succeeded = True
 
+    except JobCancelled:
+        logging.warning(f"Filtering cancelled, '{output_file}' was not written.")
     except FileNotFoundError:
         logging.error("The specified file was not found. Please check the file path.")
     except PermissionError:
@@ -119,3 +505,6 @@ def filter_file(file_path, output_file, conditions):
         logging.error(f"Type error: {te}")
     except Exception as e:
         logging.error(f"An unexpected error occurred: {e}")
+    finally:
+        metrics.finish(metrics_file)
+    return metrics
@@ -15,6 +15,23 @@ class FilterHandler:
         condition_type_display = condition_type_var.get()
         condition_type = self.condition_type_map.get(condition_type_display)
 
+        # handle filter expressions, which name their columns themselves
+        if condition_type == "expression":
+            expression = value_entry.get().strip()
+            if not expression:
+                return "Please enter a filter expression, e.g. 20 < tempSen1 < 30 OR humSen1 IS NULL."
+            # imported here, the expression module pulls in pandas (see prewarm_job_modules)
+            from expressions import parse_expression
+
+            try:
+                parse_expression(expression)
+            except ValueError as e:
+                return str(e)
+            conditions_list.append((condition_type, expression))
+            listbox.insert("end", f"{condition_type_display}: {expression}")
+            value_entry.delete(0, "end")
+            return None
+
         # get columns from the Entry field
         columns_text = columns_entry.get()
         if not columns_text:
@@ -97,3 +114,5 @@ class FilterHandler:
         else:
             value_label.grid()
             value_entry.grid()
+            # expressions need more room than a single value
+            value_entry.configure(width=40 if condition_type == "expression" else 15)
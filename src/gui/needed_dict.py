@@ -8,6 +8,7 @@ CONDITION_TYPE_MAP = {
     "less than": "less_than",
     "equals": "equals",
     "not equals": "not_equals",
+    "Expression": "expression",
     "Columns to Keep": "columns_to_keep",
     "Columns to Remove": "columns_to_remove"
 }
\ No newline at end of file
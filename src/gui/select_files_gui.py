@@ -1,5 +1,8 @@
 import os
 import sys
+import time
+import queue
+import threading
 import tkinter as tk
 import ttkbootstrap as ttkb
 from filter_handler import FilterHandler
@@ -9,8 +12,27 @@ from needed_dict import ALLOWED_COLUMNS, CONDITION_TYPE_MAP
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from logging_config import clear_log_buffer, get_log_messages
-from filter_combined_file import filter_file
-from combine_files import combine_files
+
+# the job modules (combine_files, filter_combined_file) pull in pandas and openpyxl, which take seconds to import on
+# slow desktops, so they are only imported by the Run handlers and pre-warmed on a background thread once the window is shown
+
+# how often (in ms) the UI checks the queue of a running job for progress events
+JOB_POLL_MS = 100
+
+# how long (in ms) after the window is shown the job modules are pre-warmed
+PREWARM_DELAY_MS = 200
+
+def prewarm_job_modules():
+    """
+  This function imports the job modules and their heavy dependencies, so the first Run doesn't have to wait for them.
+  """
+    try:
+        import combine_files
+        import filter_combined_file
+        import openpyxl
+    except ImportError:
+        # reported when a job actually needs them
+        pass
 
 class FileOperationTool:
     def __init__(self, root):
@@ -21,13 +43,20 @@ class FileOperationTool:
         self.condition_type_var_combine = tk.StringVar(value="greater than")
         self.condition_type_var_filter = tk.StringVar(value="greater than")
         self.filter_handler = FilterHandler(ALLOWED_COLUMNS, CONDITION_TYPE_MAP)
+        self.job_queue = None
+        self.cancel_event = None
+        self.job_started = None
 
         self.create_widgets()
+        self.root.after(PREWARM_DELAY_MS, lambda: threading.Thread(target=prewarm_job_modules, daemon=True).start())
 
     def create_widgets(self):
         """
       This method creates the main UI components of the application, including tabs for combining files and filtering files.
       """
+        # packed first so the status bar stays visible below the tabs
+        self.build_status_bar()
+
         self.notebook = ttkb.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
@@ -51,6 +80,11 @@ class FileOperationTool:
         self.combine_output_directory = tk.StringVar()
         self.combine_output_filename = tk.StringVar()
         self.combine_file_type = tk.StringVar(value="both")
+        self.combine_workers = tk.IntVar(value=1)
+        self.combine_recursive = tk.BooleanVar(value=False)
+        self.combine_reconcile = tk.BooleanVar(value=False)
+        self.combine_merge_by_time = tk.BooleanVar(value=False)
+        self.combine_dedup = tk.BooleanVar(value=False)
         self.combine_apply_filter = tk.BooleanVar(value=False)
         self.combine_filter_conditions = []
 
@@ -71,53 +105,60 @@ class FileOperationTool:
         ttkb.Radiobutton(file_type_frame, text="CSV", variable=self.combine_file_type, value="csv").pack(side=tk.LEFT, padx=10)
         ttkb.Radiobutton(file_type_frame, text="Excel", variable=self.combine_file_type, value="excel").pack(side=tk.LEFT, padx=10)
         ttkb.Radiobutton(file_type_frame, text="Both", variable=self.combine_file_type, value="both").pack(side=tk.LEFT, padx=10)
+        ttkb.Radiobutton(file_type_frame, text="Parquet", variable=self.combine_file_type, value="parquet").pack(side=tk.LEFT, padx=10)
+        ttkb.Radiobutton(file_type_frame, text="Feather", variable=self.combine_file_type, value="feather").pack(side=tk.LEFT, padx=10)
+        ttkb.Radiobutton(file_type_frame, text="All", variable=self.combine_file_type, value="all").pack(side=tk.LEFT, padx=10)
+
+        ttkb.Label(self.combine_tab, text="Parallel Workers:").grid(row=4, column=0, sticky=tk.W, padx=5, pady=5)
+        options_frame = ttkb.Frame(self.combine_tab)
+        options_frame.grid(row=4, column=1, sticky=tk.W, padx=5, pady=5)
+        ttkb.Spinbox(options_frame, textvariable=self.combine_workers, from_=1, to=os.cpu_count() or 1, width=5).pack(side=tk.LEFT)
+        ttkb.Checkbutton(options_frame, text="Include Subfolders", variable=self.combine_recursive).pack(side=tk.LEFT, padx=20)
+        ttkb.Checkbutton(options_frame, text="Align Differing Columns", variable=self.combine_reconcile).pack(side=tk.LEFT)
+        ttkb.Checkbutton(options_frame, text="Merge by Time", variable=self.combine_merge_by_time).pack(side=tk.LEFT, padx=20)
+        ttkb.Checkbutton(options_frame, text="Drop Duplicate Rows", variable=self.combine_dedup).pack(side=tk.LEFT)
 
         ttkb.Checkbutton(
             self.combine_tab, text="Apply Filter",
             variable=self.combine_apply_filter,
             command=lambda: self.filter_handler.toggle_filter_section(self.combine_apply_filter, self.filter_conditions_frame_combine)
-        ).grid(row=4, column=0, sticky=tk.W, padx=5, pady=5)
+        ).grid(row=5, column=0, sticky=tk.W, padx=5, pady=5)
 
         self.filter_conditions_frame_combine = self.create_filter_conditions_section(self.combine_tab, "combine")
-        self.filter_conditions_frame_combine.grid(row=5, column=0, columnspan=3, sticky=tk.W, padx=5, pady=5)
+        self.filter_conditions_frame_combine.grid(row=6, column=0, columnspan=3, sticky=tk.W, padx=5, pady=5)
         self.filter_conditions_frame_combine.grid_remove()
 
-        ttkb.Button(self.combine_tab, text="Run", command=self.run_combine).grid(row=6, column=0, columnspan=3, pady=20)
+        self.combine_run_button = ttkb.Button(self.combine_tab, text="Run", command=self.run_combine)
+        self.combine_run_button.grid(row=7, column=0, columnspan=3, pady=20)
 
     def run_combine(self):
         """
-      This method actually calls the combine_files function (if needed the filter_file function)
+      This method starts the combine_files function (or combine_and_filter if the filter is applied) in the background
       """
         if not self.combine_input_directory.get() or not self.combine_output_directory.get() or not self.combine_output_filename.get():
             messagebox.showwarning("Missing Information", "Please fill out all required fields.")
             return
 
-        clear_log_buffer()
+        from combine_files import combine_files, combine_and_filter
 
         output_file = os.path.join(self.combine_output_directory.get(), self.combine_output_filename.get())
-        try:
-            combine_files(
-                input_dir=self.combine_input_directory.get(),
-                output_file=output_file,
-                file_type=self.combine_file_type.get()
-            )
-
-            if self.combine_apply_filter.get():
-                conditions = self.convert_conditions_to_dict(self.combine_filter_conditions)
-                filter_file(output_file, output_file, conditions)
-
-            # check for logged warnings or errors
-            log_messages = get_log_messages()
-            if "ERROR" in log_messages or "WARNING" in log_messages:
-                messagebox.showwarning("Warning", log_messages)
-            else:
-                messagebox.showinfo("Success", "Files combined successfully!")
-                self.root.destroy()
-
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {e}")
-            log_messages = get_log_messages()
-            print(log_messages)
+        kwargs = {
+            "input_dir": self.combine_input_directory.get(),
+            "output_file": output_file,
+            "file_type": self.combine_file_type.get(),
+            "workers": self.combine_workers.get(),
+            "discovery": {"recursive": self.combine_recursive.get()},
+            "reconcile": "union" if self.combine_reconcile.get() else None,
+            # every file is sorted by time, so the combined output is too
+            "merge_on": "time" if self.combine_merge_by_time.get() else None,
+            "dedup": self.combine_dedup.get()
+        }
+        if self.combine_apply_filter.get():
+            # filter every file before combining, so the output is only written once
+            kwargs["conditions"] = self.convert_conditions_to_dict(self.combine_filter_conditions)
+            self.start_job(combine_and_filter, kwargs, "Files combined successfully!")
+        else:
+            self.start_job(combine_files, kwargs, "Files combined successfully!")
 
     ####################################
     # "Filter Existing File" tab's logic
@@ -153,35 +194,135 @@ class FileOperationTool:
         self.filter_conditions_frame_filter.grid(row=4, column=0, columnspan=3, sticky=tk.W, padx=5, pady=5)
         self.filter_conditions_frame_filter.grid_remove()
 
-        ttkb.Button(self.filter_tab, text="Run", command=self.run_filter).grid(row=5, column=0, columnspan=3, pady=20)
+        self.filter_run_button = ttkb.Button(self.filter_tab, text="Run", command=self.run_filter)
+        self.filter_run_button.grid(row=5, column=0, columnspan=3, pady=20)
 
     def run_filter(self):
         """
-      This method creates a filter conditions section in the specified tab.
+      This method starts the filter_file function in the background.
       """
         if not self.filter_input_file.get() or not self.filter_output_directory.get() or not self.filter_output_filename.get():
             messagebox.showwarning("Missing Information", "Please fill out all required fields.")
             return
 
-        clear_log_buffer()
+        from filter_combined_file import filter_file
 
         output_file = os.path.join(self.filter_output_directory.get(), self.filter_output_filename.get())
-        try:
-            conditions = self.convert_conditions_to_dict(self.filter_filter_conditions) if self.filter_apply_filter.get() else {}
-            filter_file(self.filter_input_file.get(), output_file, conditions)
+        conditions = self.convert_conditions_to_dict(self.filter_filter_conditions) if self.filter_apply_filter.get() else {}
+        kwargs = {"file_path": self.filter_input_file.get(), "output_file": output_file, "conditions": conditions}
+        self.start_job(filter_file, kwargs, "File filtered successfully!")
+
+    ##########################
+    # background job's logic
+    ##########################
+    def build_status_bar(self):
+        """
+      This method builds the status bar with the progress bar, the progress text and the Cancel button of running jobs.
+      """
+        status_frame = ttkb.Frame(self.root)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 10))
+
+        self.progress_bar = ttkb.Progressbar(status_frame, mode="determinate", maximum=1.0)
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.status_label = ttkb.Label(status_frame, text="Ready", width=50)
+        self.status_label.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttkb.Button(status_frame, text="Cancel", command=self.cancel_job, state="disabled")
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
 
-            log_messages = get_log_messages()
-            if "ERROR" in log_messages or "WARNING" in log_messages:
-                messagebox.showwarning("Warning", log_messages)
+    def start_job(self, job, kwargs, success_message):
+        """
+      This method runs job(**kwargs) on a worker thread so the window stays responsive. The job's progress events
+      are put on a queue, which the main thread polls with root.after (Tk widgets must only be touched from the main thread).
+      """
+        clear_log_buffer()
+        job_queue = queue.Queue()
+        cancel_event = threading.Event()
+        self.job_queue, self.cancel_event, self.job_started = job_queue, cancel_event, time.monotonic()
+        self.set_job_running(True)
+
+        def worker():
+            try:
+                job(progress=lambda event: job_queue.put(("progress", event)), cancel_event=cancel_event, **kwargs)
+                job_queue.put(("done", None))
+            except Exception as e:
+                job_queue.put(("error", e))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(JOB_POLL_MS, self.poll_job, success_message)
+
+    def poll_job(self, success_message):
+        """
+      This method shows the progress events queued by the running job and finishes the job once it is done.
+      """
+        finished = None
+        while finished is None:
+            try:
+                kind, payload = self.job_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                self.show_progress(payload)
             else:
-                if messagebox.showinfo("Success", "File filtered successfully!") == "ok":
-                    self.root.destroy()
+                finished = (kind, payload)
+
+        if finished is None:
+            self.root.after(JOB_POLL_MS, self.poll_job, success_message)
+        else:
+            self.finish_job(*finished, success_message)
+
+    def show_progress(self, event):
+        """
+      This method updates the progress bar and shows the throughput and the estimated time left.
+      """
+        elapsed = max(time.monotonic() - self.job_started, 1e-6)
+        fraction = event["bytes_done"] / event["bytes_total"] if event["bytes_total"] else 0
+        self.progress_bar["value"] = fraction
 
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {e}")
+        text = f"{event['files_done']}/{event['files_total']} files, {event['rows_read']:,} rows ({event['rows_read'] / elapsed:,.0f} rows/s)"
+        if 0 < fraction < 1:
+            eta = int(elapsed * (1 - fraction) / fraction)
+            text += f", ETA {eta // 60}:{eta % 60:02d}"
+        self.status_label["text"] = text
 
-            log_messages = get_log_messages()
+    def cancel_job(self):
+        """
+      This method asks the running job to stop. The job aborts its output at the next file or chunk.
+      """
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_button["state"] = "disabled"
+            self.status_label["text"] = "Cancelling..."
+
+    def set_job_running(self, running):
+        self.combine_run_button["state"] = "disabled" if running else "normal"
+        self.filter_run_button["state"] = "disabled" if running else "normal"
+        self.cancel_button["state"] = "normal" if running else "disabled"
+        if running:
+            self.progress_bar["value"] = 0
+            self.status_label["text"] = "Starting..."
+
+    def finish_job(self, kind, payload, success_message):
+        """
+      This method reports the outcome of the finished job based on its logged warnings or errors.
+      """
+        self.set_job_running(False)
+        log_messages = get_log_messages()
+
+        if kind == "error":
+            self.status_label["text"] = "Failed"
+            messagebox.showerror("Error", f"An error occurred: {payload}")
             print(log_messages)
+        elif self.cancel_event.is_set():
+            self.status_label["text"] = "Cancelled"
+            messagebox.showinfo("Cancelled", "The operation was cancelled, no output file was written.")
+        elif "ERROR" in log_messages or "WARNING" in log_messages:
+            self.status_label["text"] = "Finished with warnings"
+            messagebox.showwarning("Warning", log_messages)
+        else:
+            self.progress_bar["value"] = 1.0
+            self.status_label["text"] = "Done"
+            messagebox.showinfo("Success", success_message)
+            self.root.destroy()
 
     ###########################
     # condition section's logic
@@ -264,14 +405,9 @@ class FileOperationTool:
         """
       This method conversts the conditions added by the user to a dict.
       """
-        condition_dict = {}
-        for item in condition_list:
-            if isinstance(item[1], list):
-                condition_dict[item[0]] = item[1]
-            else:
-                column, condition_type, value = item
-                condition_dict[column] = {"type": condition_type, "value": value}
-        return condition_dict
+        from filter_combined_file import conditions_from_list
+
+        return conditions_from_list(condition_list)
 
     def add_condition(self, tab_type):
         """
@@ -322,7 +458,9 @@ class FileOperationTool:
             variable.set(directory)
 
     def browse_file(self, variable):
-        file_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv"), ("Excel Files", "*.xlsx")])
+        file_path = filedialog.askopenfilename(filetypes=[
+            ("CSV Files", "*.csv *.csv.gz *.csv.bz2 *.csv.xz *.csv.zst"), ("Excel Files", "*.xlsx"), ("Parquet Files", "*.parquet"), ("Feather Files", "*.feather *.arrow")
+        ])
         if file_path:
             variable.set(file_path)
 
@@ -0,0 +1,66 @@
+import os
+
+class JobCancelled(Exception):
+    """
+  This exception is raised inside a running job once its cancel event is set. Writers are aborted on the way out,
+  so a cancelled job never leaves a partial output file behind.
+  """
+
+class ProgressTracker:
+    """
+  This is a helper class to report the progress of a combine or filter job and to check whether it was cancelled.
+  Every update calls callback with a dict of the counters (files_done, files_total, rows_read, rows_written,
+  bytes_done, bytes_total). The callback runs on the job's thread, so a GUI should only queue the events.
+  Without a callback and a cancel event, the tracker does nothing.
+  """
+    def __init__(self, callback=None, cancel_event=None, file_paths=()):
+        self.callback = callback
+        self.cancel_event = cancel_event
+        self.files_total = len(file_paths)
+        self.files_done = 0
+        self.rows_read = 0
+        self.rows_written = 0
+        self.bytes_total = sum(_file_size(path) for path in file_paths) if callback is not None else 0
+        self.bytes_done = 0
+
+    def check_cancelled(self):
+        """
+      This method raises JobCancelled if the job was cancelled.
+      """
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def add_rows(self, rows_read, rows_written=0):
+        """
+      This method counts rows read (and written), reports the progress and checks for cancellation.
+      """
+        self.rows_read += rows_read
+        self.rows_written += rows_written
+        self.emit()
+        self.check_cancelled()
+
+    def file_done(self, file_path):
+        """
+      This method marks a file as processed, reports the progress and checks for cancellation.
+      """
+        self.files_done += 1
+        self.bytes_done += _file_size(file_path) if self.callback is not None else 0
+        self.emit()
+        self.check_cancelled()
+
+    def emit(self):
+        if self.callback is not None:
+            self.callback({
+                "files_done": self.files_done,
+                "files_total": self.files_total,
+                "rows_read": self.rows_read,
+                "rows_written": self.rows_written,
+                "bytes_done": self.bytes_done,
+                "bytes_total": self.bytes_total,
+            })
+
+def _file_size(file_path):
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
@@ -0,0 +1,131 @@
+import os
+import json
+import logging
+import hashlib
+
+MANIFEST_VERSION = 2
+
+# the combination options stored in the manifest; the output is rebuilt when one of them changes
+MANIFEST_OPTIONS = ("schema", "reconcile", "dedup", "discovery")
+
+def manifest_path(output_file):
+    """
+  This function returns the path of the manifest kept next to the output file.
+  """
+    return f"{output_file}.manifest.json"
+
+def file_hash(file_path, block_size=1024 * 1024):
+    """
+  This function returns the SHA-256 hash of a file's content, reading it block by block.
+  """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def file_entry(file_path):
+    """
+  This function returns the size, modification time and content hash of a file as stored in the manifest.
+  """
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_hash(file_path)}
+
+def new_manifest(input_dir, file_type, conditions=None, options=None):
+    """
+  This function returns an empty manifest for combining the files of input_dir.
+  options holds the combination options that change the output (see MANIFEST_OPTIONS), e.g. {"schema": {"time": "datetime"}, "reconcile": "union"}.
+  """
+    return {
+        "version": MANIFEST_VERSION,
+        "input_dir": os.path.abspath(input_dir),
+        "file_type": file_type,
+        "conditions": _normalize(conditions),
+        "options": _normalize_options(options),
+        "columns": None,
+        "dtypes": None,
+        "files": {},
+    }
+
+def load_manifest(output_file):
+    """
+  This function loads the manifest of the output file, or returns None if there is none (or it can't be read).
+  """
+    path = manifest_path(output_file)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Manifest {path} could not be read and will be rebuilt: {e}")
+        return None
+
+def save_manifest(output_file, manifest):
+    """
+  This function saves the manifest along with the size and modification time of the output file it describes.
+  """
+    stat = os.stat(output_file)
+    manifest["output"] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    path = manifest_path(output_file)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, path)
+
+def file_unchanged(file_path, entry):
+    """
+  This function checks a file against its manifest entry. The size and modification time are checked first,
+  and the content hash only if they differ (a touched but unchanged file still counts as unchanged).
+  """
+    stat = os.stat(file_path)
+    if stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]:
+        return True
+    if stat.st_size != entry["size"]:
+        return False
+    if file_hash(file_path) != entry["sha256"]:
+        return False
+    entry["mtime_ns"] = stat.st_mtime_ns
+    return True
+
+def manifest_outdated_reason(manifest, input_dir, files, output_file, file_type, conditions=None, options=None):
+    """
+  This function checks whether new files can simply be appended to the output file described by the manifest.
+  It returns None if they can, otherwise the reason why the output has to be rebuilt.
+  """
+    if manifest is None:
+        return "no manifest found."
+    if manifest.get("version") != MANIFEST_VERSION:
+        return "the manifest was written by another version."
+    if not os.path.exists(output_file):
+        return "the output file does not exist."
+
+    output = manifest.get("output", {})
+    stat = os.stat(output_file)
+    if stat.st_size != output.get("size") or stat.st_mtime_ns != output.get("mtime_ns"):
+        return "the output file was modified since the last run."
+    if manifest["input_dir"] != os.path.abspath(input_dir) or manifest["file_type"] != file_type:
+        return "the input directory or file type changed."
+    if manifest["conditions"] != _normalize(conditions):
+        return "the filter conditions changed."
+    current_options = _normalize_options(options)
+    changed_options = [option for option in MANIFEST_OPTIONS if manifest["options"].get(option) != current_options[option]]
+    if changed_options:
+        return f"the {', '.join(changed_options)} option(s) changed."
+
+    current_files = set(files)
+    for file, entry in manifest["files"].items():
+        if file not in current_files:
+            return f"the already combined file {file} was deleted."
+        if not file_unchanged(os.path.join(input_dir, file), entry):
+            return f"the already combined file {file} changed."
+    return None
+
+def _normalize(conditions):
+    # compare conditions the way they come back from JSON (tuples become lists and so on)
+    return json.loads(json.dumps(conditions, default=str)) if conditions is not None else None
+
+def _normalize_options(options):
+    options = options or {}
+    return {option: _normalize(options.get(option)) for option in MANIFEST_OPTIONS}
@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import time
+import logging
+from contextlib import contextmanager
+
+try:
+    from .file_io import create_temp_file
+except ImportError:
+    from file_io import create_temp_file
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, psutil is used there if it is installed
+    resource = None
+
+COUNTERS = ("rows_in", "rows_out", "bytes_read", "bytes_written")
+
+def peak_rss_bytes():
+    """
+  This function returns the peak resident memory of the current process in bytes, or None if it can't be measured.
+  Worker processes are not included.
+  """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, "peak_wset", info.rss)
+
+class StageStats:
+    """
+  This is a helper class to accumulate the wall time and row/byte counters of one stage over all of its calls.
+  """
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.peak_rss_bytes = None
+
+    def add(self, **counters):
+        for name, value in counters.items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "seconds": round(self.seconds, 6),
+            **{name: getattr(self, name) for name in COUNTERS},
+            "peak_rss_bytes": self.peak_rss_bytes,
+        }
+
+class JobMetrics:
+    """
+  This is a helper class to record per-stage metrics of a combine or filter job: wall time, rows in/out,
+  bytes read/written and the peak RSS of the process at the end of the stage. The stages used are
+  discover, read, validate, concat, dedup, filter (with one filter:<column> stage per condition) and write.
+  A stage called several times (e.g. read for every file) accumulates its calls. Stages can be nested,
+  filter includes the time of its filter:<column> stages.
+  """
+    def __init__(self, job=None):
+        self.job = job
+        self.stages = {}
+        self.succeeded = False
+        self.seconds = None
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        """
+      This method times the code inside the with block as one call of the stage and yields its StageStats to add counters to.
+      """
+        stats = self.stages.setdefault(name, StageStats())
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.seconds += time.perf_counter() - start
+            stats.calls += 1
+            stats.peak_rss_bytes = peak_rss_bytes()
+
+    def count(self, name, **counters):
+        """
+      This method adds counters to a stage without timing anything.
+      """
+        self.stages.setdefault(name, StageStats()).add(**counters)
+
+    def timed(self, iterable, name):
+        """
+      This method yields the items of iterable, timing every item as one call of the stage (the rows of DataFrames are counted as rows_out).
+      """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name) as stats:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    stats.calls -= 1
+                    return
+                stats.add(rows_out=len(item) if item is not None else 0)
+            yield item
+
+    @property
+    def duplicate_rows(self):
+        """
+      The number of rows dropped as duplicates by the dedup stage, or None if the job didn't deduplicate.
+      """
+        stats = self.stages.get("dedup")
+        return stats.rows_in - stats.rows_out if stats is not None else None
+
+    def to_dict(self):
+        data = {
+            "job": self.job,
+            "succeeded": self.succeeded,
+            "seconds": round(self.seconds if self.seconds is not None else time.perf_counter() - self._started, 6),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "stages": {name: stats.to_dict() for name, stats in self.stages.items()},
+        }
+        if self.duplicate_rows is not None:
+            data["duplicate_rows"] = self.duplicate_rows
+        return data
+
+    def to_prometheus(self, prefix="combine_filter"):
+        """
+      This method returns the metrics in the Prometheus text format (e.g. for the node exporter's textfile collector).
+      """
+        data = self.to_dict()
+        job = f'job="{self.job}"'
+        lines = [
+            f"# TYPE {prefix}_job_seconds gauge",
+            f"{prefix}_job_seconds{{{job}}} {data['seconds']}",
+            f"# TYPE {prefix}_job_succeeded gauge",
+            f"{prefix}_job_succeeded{{{job}}} {int(self.succeeded)}",
+        ]
+        if data["peak_rss_bytes"] is not None:
+            lines += [f"# TYPE {prefix}_peak_rss_bytes gauge", f"{prefix}_peak_rss_bytes{{{job}}} {data['peak_rss_bytes']}"]
+        if self.duplicate_rows is not None:
+            lines += [f"# TYPE {prefix}_duplicate_rows gauge", f"{prefix}_duplicate_rows{{{job}}} {self.duplicate_rows}"]
+        for field in ("calls", "seconds") + COUNTERS:
+            lines.append(f"# TYPE {prefix}_stage_{field} gauge")
+            for name, stats in data["stages"].items():
+                stage = name.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{prefix}_stage_{field}{{{job},stage="{stage}"}} {stats[field]}')
+        return "\n".join(lines) + "\n"
+
+    def finish(self, metrics_file=None):
+        """
+      This method stops the job's clock, logs a summary and writes the metrics to metrics_file if it is given:
+      Prometheus text format for .prom files, JSON otherwise. Failing to write the metrics never fails the job.
+      """
+        self.seconds = time.perf_counter() - self._started
+        summary = ", ".join(f"{name} {stats.seconds:.3f}s" for name, stats in self.stages.items())
+        logging.debug(f"Stage timings of the {self.job} job: {summary}.")
+        if self.duplicate_rows is not None:
+            logging.info(f"The {self.job} job dropped {self.duplicate_rows} duplicate rows.")
+        if metrics_file:
+            try:
+                self.write(metrics_file)
+            except OSError as e:
+                logging.error(f"Could not write the metrics to {metrics_file}: {e}")
+
+    def write(self, metrics_file):
+        content = self.to_prometheus() if metrics_file.endswith(".prom") else json.dumps(self.to_dict(), indent=2)
+        # written atomically so collectors never see a half written file
+        fd, temp_path = create_temp_file(os.path.dirname(metrics_file) or ".", prefix="", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(temp_path, metrics_file)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
@@ -0,0 +1,92 @@
+import os
+import logging
+import hashlib
+import tempfile
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "combine_filter_files")
+DEFAULT_MAX_MB = 2048
+
+# entries are Feather files, which (unlike pickles) can't run code when they are loaded and don't depend on the pandas version
+ENTRY_SUFFIX = ".feather"
+
+class ParseCache:
+    """
+  This is a helper class to keep parsed DataFrames on disk, so unchanged (Excel) files don't have to be parsed again.
+  Entries are keyed by the file's path, size and modification time (and the columns read), and the least recently used
+  entries are evicted once the cache grows past max_mb. The defaults can be changed with the COMBINE_FILTER_CACHE_DIR
+  and COMBINE_FILTER_CACHE_MAX_MB environment variables.
+  Entries are stored as Feather files, so the cache needs pyarrow; without it (or for frames Feather can't hold, e.g.
+  columns mixing numbers and text) files are simply parsed every time.
+  """
+    def __init__(self, cache_dir=None, max_mb=None):
+        self.cache_dir = cache_dir or os.environ.get("COMBINE_FILTER_CACHE_DIR") or DEFAULT_CACHE_DIR
+        self.max_bytes = int(float(max_mb or os.environ.get("COMBINE_FILTER_CACHE_MAX_MB") or DEFAULT_MAX_MB) * 1024 * 1024)
+
+    def _entry_path(self, file_path, columns=None):
+        stat = os.stat(file_path)
+        key = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{columns}"
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ENTRY_SUFFIX)
+
+    def get(self, file_path, columns=None):
+        """
+      This method returns the cached DataFrame of the file, or None if the file is not cached (or changed since).
+      """
+        entry_path = self._entry_path(file_path, columns)
+        try:
+            df = pd.read_feather(entry_path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.debug(f"Ignoring unreadable cache entry {entry_path}: {e}")
+            return None
+
+        # touching the entry marks it as recently used
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        logging.debug(f"Loaded {file_path} from the parse cache.")
+        return df
+
+    def put(self, file_path, df, columns=None):
+        """
+      This method stores the parsed DataFrame of the file and evicts old entries if the cache is too large.
+      Failing to write the cache is logged but never fails the job.
+      """
+        try:
+            entry_path = self._entry_path(file_path, columns)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            os.close(fd)
+            try:
+                df.reset_index(drop=True).to_feather(temp_path)
+                os.replace(temp_path, entry_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            self.evict()
+        except Exception as e:
+            logging.debug(f"Could not cache {file_path}: {e}")
+
+    def evict(self):
+        """
+      This method removes the least recently used entries until the cache fits into its size limit.
+      """
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as scan:
+            for entry in scan:
+                if entry.name.endswith(ENTRY_SUFFIX) and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,197 @@
+import fnmatch
+import numpy as np
+import pandas as pd
+
+# "datetime" in a schema stands for this dtype, which is what pandas parses date strings into
+DATETIME_DTYPE = "datetime64[us]"
+DATETIME_ALIASES = {"datetime", "datetime64", "timestamp", "date"}
+
+def is_datetime_dtype(dtype):
+    return str(dtype).lower() in DATETIME_ALIASES or str(dtype).startswith("datetime64")
+
+def _normalize_dtype(dtype):
+    return DATETIME_DTYPE if str(dtype).lower() in DATETIME_ALIASES else dtype
+
+def dtype_name(dtype):
+    """
+  This function returns the name of a dtype regardless of its backend, so Arrow backed columns (e.g. double[pyarrow] from
+  memory mapped reads) compare equal to their NumPy counterparts (float64). Text columns are all called "str".
+  """
+    dtype = pd.api.types.pandas_dtype(dtype)
+    if isinstance(dtype, pd.ArrowDtype):
+        import pyarrow as pa
+
+        if pa.types.is_string(dtype.pyarrow_dtype) or pa.types.is_large_string(dtype.pyarrow_dtype):
+            return "str"
+        return str(dtype.numpy_dtype)
+    return str(dtype)
+
+def resolve_schema(schema, columns):
+    """
+  This function matches a schema spec against the columns of a file and returns the dtype of every covered column.
+  The spec maps column names or fnmatch patterns (e.g. "tempSen*") to dtypes (e.g. "float32", or "datetime").
+  An exact name wins over patterns, and earlier patterns win over later ones.
+  """
+    if not schema:
+        return {}
+    resolved = {}
+    for column in columns:
+        name = str(column)
+        if name in schema:
+            resolved[column] = _normalize_dtype(schema[name])
+            continue
+        for pattern, dtype in schema.items():
+            if fnmatch.fnmatchcase(name, pattern):
+                resolved[column] = _normalize_dtype(dtype)
+                break
+    return resolved
+
+def csv_schema_options(resolved):
+    """
+  This function turns resolved dtypes into read_csv's dtype and parse_dates options, so the columns are parsed
+  straight into their dtypes instead of being inferred (and upcast) first.
+  """
+    options = {}
+    dtypes = {column: dtype for column, dtype in resolved.items() if not is_datetime_dtype(dtype)}
+    dates = [column for column, dtype in resolved.items() if is_datetime_dtype(dtype)]
+    if dtypes:
+        options["dtype"] = dtypes
+    if dates:
+        options["parse_dates"] = dates
+    return options
+
+def apply_schema(df, resolved):
+    """
+  This function casts the columns of a DataFrame to their resolved dtypes. Columns already of the right dtype are left alone.
+  """
+    changed = [column for column, dtype in resolved.items() if column in df.columns and df[column].dtype != dtype]
+    if not changed:
+        return df
+
+    df = df.copy(deep=False)
+    for column in changed:
+        dtype = resolved[column]
+        if is_datetime_dtype(dtype):
+            df[column] = pd.to_datetime(df[column]).astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+def infer_schema(df):
+    """
+  This function infers a schema spec from a DataFrame (usually the first file), so every later file is parsed the same way.
+  Integer columns become the nullable Int64 (later files may have gaps), text columns are left to pandas.
+  """
+    schema = {}
+    for column in df.columns:
+        dtype = df[column].dtype
+        if pd.api.types.is_bool_dtype(dtype):
+            schema[str(column)] = "boolean"
+        elif pd.api.types.is_integer_dtype(dtype):
+            schema[str(column)] = "Int64"
+        elif pd.api.types.is_float_dtype(dtype):
+            schema[str(column)] = str(dtype)
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            schema[str(column)] = DATETIME_DTYPE
+    return schema
+
+def shortest_float64(values):
+    """
+  This function turns a float32 array into float64 values with the fewest significant digits that still give back the
+  same float32 values, e.g. 22.3 instead of 22.299999237060547. Every value is rounded to 1, 2, ... 9 significant digits
+  (9 are always enough for float32) until it round-trips, so no value goes through its text form.
+  """
+    result = values.astype(np.float64)
+    positions = np.flatnonzero(np.isfinite(result) & (result != 0))
+    remaining, original = result[positions], values[positions]
+    exponents = np.floor(np.log10(np.abs(remaining)))
+    for digits in range(1, 10):
+        scale = 10.0 ** (digits - 1 - exponents)
+        rounded = np.round(remaining * scale) / scale
+        exact = rounded.astype(np.float32) == original
+        result[positions[exact]] = rounded[exact]
+        positions, remaining, original, exponents = positions[~exact], remaining[~exact], original[~exact], exponents[~exact]
+        if not len(positions):
+            break
+    return result
+
+def widen_float32(df):
+    """
+  This function turns float32 columns into float64 with their shortest digits (see shortest_float64), so text outputs
+  (CSV, Excel) show 22.3 instead of the float64 expansion 22.2999992370605 of the float32 value.
+  """
+    float32_columns = [column for column in df.columns if df[column].dtype == np.float32]
+    if not float32_columns:
+        return df
+
+    df = df.copy(deep=False)
+    for column in float32_columns:
+        df[column] = shortest_float64(df[column].to_numpy())
+    return df
+
+def _numpy_dtype(dtype):
+    # nullable (Int64, boolean) and Arrow backed dtypes know their NumPy counterpart
+    return np.dtype(getattr(dtype, "numpy_dtype", dtype))
+
+def common_dtype(dtypes, nullable=False):
+    """
+  This function returns the dtype that the dtypes of one column in several files can all be cast to: ints and floats
+  become the widest of them (e.g. int64 and float32 give float64), datetimes the finest unit, text mixed with numbers
+  or bools strings, and any other mix object.
+  With nullable (the column is missing in some files), integer and bool dtypes become Int64 and boolean so the nulls fit.
+  """
+    dtypes = [pd.api.types.pandas_dtype(dtype) for dtype in dtypes]
+    if not dtypes:
+        return np.dtype(object)
+
+    if len({dtype_name(dtype) for dtype in dtypes}) == 1:
+        dtype = dtypes[0]
+    elif all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in dtypes):
+        dtype = np.result_type(*map(_numpy_dtype, dtypes))
+    elif all(pd.api.types.is_datetime64_dtype(dtype) for dtype in dtypes):
+        dtype = np.result_type(*map(_numpy_dtype, dtypes))
+    elif all((pd.api.types.is_string_dtype(dtype) and dtype != object) or pd.api.types.is_numeric_dtype(dtype) for dtype in dtypes):
+        # numbers and bools that share a column with text are kept as their text
+        dtype = pd.StringDtype(na_value=np.nan)
+    else:
+        return np.dtype(object)
+
+    if nullable and pd.api.types.is_bool_dtype(dtype):
+        return pd.BooleanDtype()
+    if nullable and pd.api.types.is_integer_dtype(dtype):
+        return pd.Int64Dtype()
+    return dtype
+
+def _cast(series, dtype):
+    if dtype_name(series.dtype) == dtype_name(dtype):
+        return series
+    try:
+        if is_datetime_dtype(dtype):
+            return pd.to_datetime(series).astype(dtype)
+        # NumPy would cut the decimals off silently
+        if pd.api.types.is_integer_dtype(dtype) and pd.api.types.is_float_dtype(series.dtype) and not (series.dropna() % 1 == 0).all():
+            raise ValueError("Decimals in an integer column.")
+        return series.astype(dtype)
+    except (TypeError, ValueError):
+        # values the sampled rows didn't show, e.g. decimals in an integer column
+        return series.astype("float64" if pd.api.types.is_numeric_dtype(series.dtype) else object)
+
+def align_frame(df, target):
+    """
+  This function aligns a DataFrame to a target schema (a dict of column to dtype, see common_dtype): the columns are
+  ordered by name like the target, missing columns are added as typed nulls, extra columns are dropped and the others
+  are cast to their target dtype. A column that can't be cast (e.g. decimals in an integer column) is upcast to float64,
+  or object if it isn't numeric, and the target is widened to that dtype in place so later frames get it as well.
+  """
+    if list(df.columns) == list(target) and all(dtype_name(df[column].dtype) == dtype_name(dtype) for column, dtype in target.items()):
+        return df
+
+    columns = {}
+    for column, dtype in target.items():
+        if column in df.columns:
+            columns[column] = _cast(df[column], dtype)
+            if dtype_name(columns[column].dtype) != dtype_name(dtype):
+                target[column] = columns[column].dtype
+        else:
+            columns[column] = pd.Series(index=df.index, dtype=dtype)
+    return pd.DataFrame(columns, index=df.index, copy=False)
@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+import unittest
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from benchmarks.generate_dataset import generate_dataset
+from benchmarks.run_benchmarks import run_benchmarks
+
+class TestBenchmarks(unittest.TestCase):
+    def test_generate_dataset_is_deterministic(self):
+        """
+      In this test, we check that the generator writes the requested number of files, rows and columns, and the same data every time.
+      """
+        with tempfile.TemporaryDirectory() as first_dir, tempfile.TemporaryDirectory() as second_dir:
+            first = generate_dataset(first_dir, n_files=2, n_rows=50, n_columns=5)
+            second = generate_dataset(second_dir, n_files=2, n_rows=50, n_columns=5)
+
+            self.assertEqual(len(first), 2)
+            for first_path, second_path in zip(first, second):
+                df = pd.read_csv(first_path)
+                self.assertEqual(df.shape, (50, 5))
+                self.assertEqual(df.columns[0], "time")
+                pd.testing.assert_frame_equal(df, pd.read_csv(second_path))
+
+    def test_run_benchmarks_tiny(self):
+        """
+      In this test, we check that the benchmark suite runs on the tiny scale and reports a timing for every benchmark.
+      """
+        report = run_benchmarks(["tiny"], ["csv"], repeat=1, chunk_size=50, workers=2)
+
+        names = {result["benchmark"] for result in report["results"]}
+        self.assertIn("combine_files", names)
+        self.assertIn("combine_and_filter", names)
+        for result in report["results"]:
+            self.assertEqual(result["rows"], 200)
+            self.assertGreater(result["seconds_min"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
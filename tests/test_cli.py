@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import tempfile
+import unittest
+import subprocess
+from unittest import mock
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.cli import main
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        # parsed Excel files are cached in a temporary directory, not in the user's cache
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        cache_env = mock.patch.dict(os.environ, {"COMBINE_FILTER_CACHE_DIR": self.cache_dir.name})
+        cache_env.start()
+        self.addCleanup(cache_env.stop)
+        self.test_dir = os.path.join("tests_IO", "same_sized_files")
+        self.test_file = os.path.join("tests_IO", "input_test_filtering.csv")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.conditions_file = os.path.join(self.temp_dir.name, "conditions.json")
+        with open(self.conditions_file, "w", encoding="utf-8") as f:
+            json.dump({"A": {"type": "greater_than", "value": 1}, "columns_to_keep": ["A"]}, f)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_pipeline_command(self):
+        """
+      In this test, we check that the pipeline command combines and filters the files and exits with 0.
+      """
+        output_file = os.path.join(self.temp_dir.name, "pipeline.csv")
+        exit_code = main(["pipeline", self.test_dir, output_file, "--file-type", "csv", "--conditions", self.conditions_file])
+
+        self.assertEqual(exit_code, 0)
+        pd.testing.assert_frame_equal(pd.read_csv(output_file), pd.DataFrame({"A": [2, 5, 6]}))
+
+    def test_filter_command_with_condition_list(self):
+        """
+      In this test, we check that the filter command accepts conditions in the GUI's list form.
+      """
+        conditions_file = os.path.join(self.temp_dir.name, "conditions_list.json")
+        with open(conditions_file, "w", encoding="utf-8") as f:
+            json.dump([["A", "greater_than", 15], ["columns_to_keep", ["A"]]], f)
+        output_file = os.path.join(self.temp_dir.name, "filtered.csv")
+
+        exit_code = main(["filter", self.test_file, output_file, "--conditions", conditions_file])
+
+        self.assertEqual(exit_code, 0)
+        expected_df = pd.read_csv(self.test_file)[["A"]].query("A > 15").reset_index(drop=True)
+        pd.testing.assert_frame_equal(pd.read_csv(output_file), expected_df)
+
+    def test_error_exit_codes(self):
+        """
+      In this test, we check that failed jobs exit with 1 and unreadable conditions or schema files with 2.
+      """
+        output_file = os.path.join(self.temp_dir.name, "combined.csv")
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(main(["combine", "missing_dir", output_file]), 1)
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(main(["pipeline", self.test_dir, output_file, "--conditions", "missing.json"]), 2)
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(main(["combine", self.test_dir, output_file, "--schema", self.conditions_file]), 2)
+        self.assertFalse(os.path.exists(output_file))
+
+    def test_cli_does_not_import_tkinter(self):
+        """
+      In this test, we check that running a job from the command line never imports tkinter.
+      """
+        output_file = os.path.join(self.temp_dir.name, "combined.csv")
+        code = (
+            "import sys; sys.path.insert(0, sys.argv[1]); from src.cli import main; "
+            "code = main(['combine', sys.argv[2], sys.argv[3], '--file-type', 'csv', '--log-level', 'ERROR']); "
+            "print(code, 'tkinter' in sys.modules)"
+        )
+        repo_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        result = subprocess.run([sys.executable, "-c", code, repo_dir, self.test_dir, output_file], capture_output=True, text=True, check=True)
+
+        self.assertEqual(result.stdout.split(), ["0", "False"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,17 +1,39 @@
 import os
 import sys
+import json
+import shutil
+import tempfile
 import unittest
+import importlib.util
+from unittest import mock
+import numpy as np
 import pandas as pd
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from src.combine_files import combine_files
+from src import combine_files as combine_module
+from src import file_io
+from src.combine_files import combine_and_filter, combine_files
+from src.schema import shortest_float64
 
 class TestCombineFiles(unittest.TestCase):
     def setUp(self):
+        # parsed Excel files are cached in a temporary directory, not in the user's cache
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        cache_env = mock.patch.dict(os.environ, {"COMBINE_FILTER_CACHE_DIR": self.cache_dir.name})
+        cache_env.start()
+        self.addCleanup(cache_env.stop)
         self.test_dir = os.path.join("tests_IO", "same_sized_files")
         self.output_file_1 = os.path.join("tests_IO", "combined_only_csvs.csv")
         self.output_file_2 = os.path.join("tests_IO", "combined_only_excel.xlsx")
         self.output_file_3 = os.path.join("tests_IO", "combined_both.csv")
+        self.output_file_4 = os.path.join("tests_IO", "combined_streamed.csv")
+        self.output_file_5 = os.path.join("tests_IO", "combined_streamed.xlsx")
+        self.output_file_6 = os.path.join("tests_IO", "combined_parallel.csv")
+        self.output_file_7 = os.path.join("tests_IO", "combined_filtered.csv")
+        self.output_file_8 = os.path.join("tests_IO", "combined_filtered_streamed.csv")
+        self.output_file_9 = os.path.join("tests_IO", "combined_both.parquet")
+        self.output_file_10 = os.path.join("tests_IO", "combined_metrics.csv")
 
     def test_combine_csv_files_only(self):
         """
@@ -61,6 +83,583 @@ class TestCombineFiles(unittest.TestCase):
         # check that the combined output matches the expected DataFrame
         pd.testing.assert_frame_equal(combined_df, expected_df)
 
+    def test_streamed_combine_matches_regular_combine(self):
+        """
+      In this test, we check that streaming the files in chunks gives the same output as combining them in memory.
+      """
+        combine_files(input_dir=self.test_dir, output_file=self.output_file_4, file_type="both", chunk_size=1)
+
+        # read the combined output
+        combined_df = pd.read_csv(self.output_file_4)
+
+        # expected combined DataFrame (same order as the in-memory combination)
+        expected_df = pd.DataFrame({
+            "A": [1, 2, 9, 10, 5, 6, 13, 14],
+            "B": [3, 4, 11, 12, 7, 8, 15, 16]
+        })
+
+        # check that the combined output matches the expected DataFrame
+        pd.testing.assert_frame_equal(combined_df, expected_df)
+
+    def test_streamed_combine_to_excel(self):
+        """
+      In this test, we check that streamed chunks are correctly written into an Excel output file.
+      """
+        combine_files(input_dir=self.test_dir, output_file=self.output_file_5, file_type="excel", chunk_size=1)
+
+        # read the combined output
+        combined_df = pd.read_excel(self.output_file_5)
+
+        # expected combined DataFrame
+        expected_df = pd.DataFrame({"A": [9, 10, 13, 14], "B": [11, 12, 15, 16]})
+
+        # check that the combined output matches the expected DataFrame
+        pd.testing.assert_frame_equal(combined_df, expected_df)
+
+    def test_parallel_combine_keeps_file_order(self):
+        """
+      In this test, we check that parsing the files with several workers keeps the sorted file order in the output.
+      """
+        combine_files(input_dir=self.test_dir, output_file=self.output_file_6, file_type="both", workers=2)
+
+        # read the combined output
+        combined_df = pd.read_csv(self.output_file_6)
+
+        # expected combined DataFrame (same order as the sequential combination)
+        expected_df = pd.DataFrame({
+            "A": [1, 2, 9, 10, 5, 6, 13, 14],
+            "B": [3, 4, 11, 12, 7, 8, 15, 16]
+        })
+
+        # check that the combined output matches the expected DataFrame
+        pd.testing.assert_frame_equal(combined_df, expected_df)
+
+    def test_combine_and_filter(self):
+        """
+      In this test, we check that the conditions are applied to the files while they are combined.
+      """
+        conditions = {"A": {"type": "greater_than", "value": 5}, "columns_to_keep": ["B"]}
+        combine_and_filter(input_dir=self.test_dir, output_file=self.output_file_7, conditions=conditions, file_type="both")
+
+        # read the combined output
+        combined_df = pd.read_csv(self.output_file_7)
+
+        # expected combined and filtered DataFrame
+        expected_df = pd.DataFrame({"B": [11, 12, 8, 15, 16]})
+
+        # check that the combined output matches the expected DataFrame
+        pd.testing.assert_frame_equal(combined_df, expected_df)
+
+    def test_streamed_combine_and_filter(self):
+        """
+      In this test, we check that the conditions are applied to every chunk when the files are streamed.
+      """
+        conditions = {"A": {"type": "greater_than", "value": 5}, "columns_to_keep": ["B"]}
+        combine_and_filter(input_dir=self.test_dir, output_file=self.output_file_8, conditions=conditions, file_type="both", chunk_size=1)
+
+        # read the combined output
+        combined_df = pd.read_csv(self.output_file_8)
+
+        # expected combined and filtered DataFrame
+        expected_df = pd.DataFrame({"B": [11, 12, 8, 15, 16]})
+
+        # check that the combined output matches the expected DataFrame
+        pd.testing.assert_frame_equal(combined_df, expected_df)
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_combine_to_parquet(self):
+        """
+      In this test, we check that CSV and Excel files can be combined into a Parquet file.
+      """
+        combine_files(input_dir=self.test_dir, output_file=self.output_file_9, file_type="both")
+
+        # read the combined output
+        combined_df = pd.read_parquet(self.output_file_9)
+
+        # expected combined DataFrame (CSV + Excel data, one csv file then one excel file order)
+        expected_df = pd.DataFrame({
+            "A": [1, 2, 9, 10, 5, 6, 13, 14],
+            "B": [3, 4, 11, 12, 7, 8, 15, 16]
+        })
+
+        # check that the combined output matches the expected DataFrame
+        pd.testing.assert_frame_equal(combined_df, expected_df)
+
+    def test_incremental_combine(self):
+        """
+      In this test, we check that an incremental re-run only reads new files and rebuilds the output when a combined file changed.
+      """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = os.path.join(temp_dir, "input")
+            output_file = os.path.join(temp_dir, "combined.csv")
+            os.makedirs(input_dir)
+            shutil.copy(os.path.join(self.test_dir, "file1.csv"), input_dir)
+
+            combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", incremental=True)
+            self.assertTrue(os.path.exists(output_file + ".manifest.json"))
+
+            # a new file is read on its own and appended
+            shutil.copy(os.path.join(self.test_dir, "file2.csv"), input_dir)
+            with mock.patch.object(combine_module, "read_file", wraps=combine_module.read_file) as read_file:
+                combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", incremental=True)
+            self.assertEqual([call.args[0] for call in read_file.call_args_list], [os.path.join(input_dir, "file2.csv")])
+            pd.testing.assert_frame_equal(pd.read_csv(output_file), pd.DataFrame({"A": [1, 2, 5, 6], "B": [3, 4, 7, 8]}))
+
+            # changing an already combined file rebuilds the output from all files
+            pd.DataFrame({"A": [0], "B": [0]}).to_csv(os.path.join(input_dir, "file1.csv"), index=False)
+            with mock.patch.object(combine_module, "read_file", wraps=combine_module.read_file) as read_file:
+                combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", incremental=True)
+            self.assertEqual(read_file.call_count, 2)
+            pd.testing.assert_frame_equal(pd.read_csv(output_file), pd.DataFrame({"A": [0, 5, 6], "B": [0, 7, 8]}))
+
+    def test_incremental_combine_options_changed(self):
+        """
+      In this test, we check that an incremental re-run rebuilds the output when the schema, reconcile or discovery options changed.
+      """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = os.path.join(temp_dir, "input")
+            output_file = os.path.join(temp_dir, "combined.csv")
+            os.makedirs(input_dir)
+            shutil.copy(os.path.join(self.test_dir, "file1.csv"), input_dir)
+            combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", incremental=True)
+
+            runs = [({}, "is up to date"), ({"schema": {"B": "float64"}}, "the schema option(s) changed"),
+                    ({"schema": {"B": "float64"}, "reconcile": "union"}, "the reconcile option(s) changed"),
+                    ({"schema": {"B": "float64"}, "reconcile": "union", "discovery": {"recursive": True}}, "the discovery option(s) changed"),
+                    ({"schema": {"B": "float64"}, "reconcile": "union", "discovery": {"recursive": True}}, "is up to date")]
+            for options, message in runs:
+                with self.assertLogs(level="INFO") as logs:
+                    metrics = combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", incremental=True, **options)
+                self.assertTrue(metrics.succeeded)
+                self.assertTrue(any(message in line for line in logs.output), logs.output)
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_parse_cache_skips_excel_parsing(self):
+        """
+      In this test, we check that a second combination of unchanged Excel files loads them from the parse cache.
+      """
+        with tempfile.TemporaryDirectory() as cache_dir, mock.patch.dict(os.environ, {"COMBINE_FILTER_CACHE_DIR": cache_dir}):
+            combine_files(input_dir=self.test_dir, output_file=self.output_file_2, file_type="excel")
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+            with mock.patch.object(combine_module, "read_frame", wraps=combine_module.read_frame) as read_frame:
+                combine_files(input_dir=self.test_dir, output_file=self.output_file_2, file_type="excel")
+            read_frame.assert_not_called()
+
+            # the cached frames give the same output
+            combined_df = pd.read_excel(self.output_file_2)
+            expected_df = pd.DataFrame({"A": [9, 10, 13, 14], "B": [11, 12, 15, 16]})
+            pd.testing.assert_frame_equal(combined_df, expected_df)
+
+            # opting out parses the files again
+            with mock.patch.object(combine_module, "read_frame", wraps=combine_module.read_frame) as read_frame:
+                combine_files(input_dir=self.test_dir, output_file=self.output_file_2, file_type="excel", use_cache=False)
+            self.assertEqual(read_frame.call_count, 2)
+
+    def test_combine_reports_progress(self):
+        """
+      In this test, we check that the progress callback receives the file, row and byte counters of the combination.
+      """
+        events = []
+        combine_files(input_dir=self.test_dir, output_file=self.output_file_1, file_type="csv", progress=events.append)
+
+        # every file is reported, and the last event covers the whole combination
+        last = events[-1]
+        self.assertEqual(last["files_done"], 2)
+        self.assertEqual(last["files_total"], 2)
+        self.assertEqual(last["rows_read"], 4)
+        self.assertEqual(last["rows_written"], 4)
+        self.assertEqual(last["bytes_done"], last["bytes_total"])
+        self.assertGreater(last["bytes_total"], 0)
+
+    def test_combine_returns_stage_metrics(self):
+        """
+      In this test, we check that the combination returns per-stage metrics and writes them as JSON and Prometheus text.
+      """
+        conditions = {"A": {"type": "greater_than", "value": 1}}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            json_file = os.path.join(temp_dir, "metrics.json")
+            prom_file = os.path.join(temp_dir, "metrics.prom")
+            metrics = combine_and_filter(input_dir=self.test_dir, output_file=self.output_file_10, conditions=conditions,
+                                         file_type="csv", metrics_file=json_file)
+            combine_files(input_dir=self.test_dir, output_file=self.output_file_1, file_type="csv", metrics_file=prom_file)
+
+            with open(json_file, encoding="utf-8") as f:
+                written = json.load(f)
+            with open(prom_file, encoding="utf-8") as f:
+                prometheus = f.read()
+
+        # every stage is recorded with its row and byte counters
+        self.assertTrue(metrics.succeeded)
+        for stage in ["discover", "validate", "read", "filter", "filter:A", "concat", "write"]:
+            self.assertIn(stage, metrics.stages)
+        self.assertEqual(metrics.stages["read"].calls, 2)
+        self.assertEqual(metrics.stages["read"].rows_out, 4)
+        self.assertEqual(metrics.stages["filter"].rows_in, 4)
+        self.assertEqual(metrics.stages["filter"].rows_out, 3)
+        self.assertEqual(metrics.stages["write"].bytes_written, os.path.getsize(self.output_file_10))
+
+        # the same metrics end up in the files
+        self.assertEqual(written["job"], "combine")
+        self.assertEqual(written["stages"]["filter"]["rows_out"], 3)
+        self.assertIn('combine_filter_job_succeeded{job="combine"} 1', prometheus)
+        self.assertIn('combine_filter_stage_rows_out{job="combine",stage="read"} 4', prometheus)
+
+    def test_combine_with_schema(self):
+        """
+      In this test, we check that a schema spec parses every file into the same dtypes, and that float32 values are written without noise.
+      """
+        schema = {"tempSen*": "float32", "time": "datetime"}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = os.path.join(temp_dir, "input")
+            output_file = os.path.join(temp_dir, "combined.csv")
+            os.makedirs(input_dir)
+            pd.DataFrame({"time": ["2024-01-01 00:00:00", "2024-01-01 00:00:01"], "tempSen1": [22.3, 22.4]}).to_csv(
+                os.path.join(input_dir, "file1.csv"), index=False)
+            pd.DataFrame({"time": ["2024-01-01 00:00:02"], "tempSen1": [23]}).to_csv(os.path.join(input_dir, "file2.csv"), index=False)
+
+            # both files are read as float32 and datetime, although the second one looks like integers
+            for file in ["file1.csv", "file2.csv"]:
+                df = combine_module.read_file(os.path.join(input_dir, file), schema=schema)
+                self.assertEqual(df["tempSen1"].dtype, "float32")
+                self.assertEqual(df["time"].dtype, "datetime64[us]")
+
+            metrics = combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", schema=schema)
+            self.assertTrue(metrics.succeeded)
+            with open(output_file, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+
+        self.assertEqual(lines, ["time,tempSen1", "2024-01-01 00:00:00,22.3", "2024-01-01 00:00:01,22.4", "2024-01-01 00:00:02,23"])
+
+        # the shortest digits of float32 values of any magnitude, without going through their text form
+        values = np.concatenate([np.random.default_rng(0).normal(0, 1, 1000) * scale for scale in [1e-40, 1e-5, 1, 1e5, 1e30]]).astype("float32")
+        values[:3] = [0, np.nan, np.inf]
+        expected = np.array([float(str(value)) for value in values])
+        np.testing.assert_array_equal(np.array([f"{value:.15g}" for value in shortest_float64(values)]),
+                                      np.array([f"{value:.15g}" for value in expected]))
+
+    def test_infer_schema_from_first_file(self):
+        """
+      In this test, we check that the schema inferred from the first file is used to read the later files.
+      """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pd.DataFrame({"A": [1.5, 2.5], "B": [1, 2], "C": ["x", "y"]}).to_csv(os.path.join(temp_dir, "file1.csv"), index=False)
+            pd.DataFrame({"A": [3], "B": [None], "C": ["z"]}).to_csv(os.path.join(temp_dir, "file2.csv"), index=False)
+
+            schema = combine_module.infer_first_schema(temp_dir, ["file1.csv", "file2.csv"])
+            self.assertEqual(schema, {"A": "float64", "B": "Int64"})
+
+            # the integers of the first file stay integers when the second file has gaps
+            df = combine_module.read_file(os.path.join(temp_dir, "file2.csv"), schema=schema)
+            self.assertEqual(df["A"].dtype, "float64")
+            self.assertEqual(df["B"].dtype, "Int64")
+
+            output_file = os.path.join(temp_dir, "combined.csv")
+            combine_files(input_dir=temp_dir, output_file=output_file, file_type="csv", infer_schema_from_first=True)
+            pd.testing.assert_frame_equal(pd.read_csv(output_file), pd.DataFrame({"A": [1.5, 2.5, 3.0], "B": [1, 2, None], "C": ["x", "y", "z"]}))
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_combine_with_pyarrow_csv_engine(self):
+        """
+      In this test, we check that CSV files parsed with the pyarrow engine give the same output as the default engine.
+      """
+        combine_files(input_dir=self.test_dir, output_file=self.output_file_1, file_type="csv", csv_engine="pyarrow")
+        combined_df = pd.read_csv(self.output_file_1)
+        pd.testing.assert_frame_equal(combined_df, pd.DataFrame({"A": [1, 2, 5, 6], "B": [3, 4, 7, 8]}))
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_memory_mapped_combine(self):
+        """
+      In this test, we check that memory mapped Feather inputs are read into Arrow buffers, memory mapped CSV inputs into the same
+      NumPy columns as regular reads, and that they give the same output as regular reads.
+      """
+        csv_file = os.path.join(self.test_dir, "file1.csv")
+        pd.testing.assert_frame_equal(combine_module.read_file(csv_file, memory_map=True), combine_module.read_file(csv_file))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            feather_file = os.path.join(temp_dir, "file1.feather")
+            pd.read_csv(csv_file).to_feather(feather_file)
+            df = combine_module.read_file(feather_file, memory_map=True)
+            self.assertTrue(all(isinstance(dtype, pd.ArrowDtype) for dtype in df.dtypes))
+
+        for chunk_size in [None, 1]:
+            metrics = combine_files(input_dir=self.test_dir, output_file=self.output_file_3, file_type="both", chunk_size=chunk_size, memory_map=True)
+            self.assertTrue(metrics.succeeded)
+            expected_df = pd.DataFrame({"A": [1, 2, 9, 10, 5, 6, 13, 14], "B": [3, 4, 11, 12, 7, 8, 15, 16]})
+            pd.testing.assert_frame_equal(pd.read_csv(self.output_file_3), expected_df)
+
+    def test_excel_output_split_across_sheets(self):
+        """
+      In this test, we check that an Excel output reaching the row limit continues on new sheets, and that they are read back as one table.
+      """
+        expected_df = pd.DataFrame({"A": [1, 2, 9, 10, 5, 6, 13, 14], "B": [3, 4, 11, 12, 7, 8, 15, 16]})
+        with tempfile.TemporaryDirectory() as temp_dir, mock.patch.object(file_io, "EXCEL_MAX_ROWS", 4):
+            output_file = os.path.join(temp_dir, "combined.xlsx")
+            for chunk_size in [None, 3]:
+                combine_files(input_dir=self.test_dir, output_file=output_file, file_type="both", chunk_size=chunk_size)
+
+                # every sheet holds the header and at most 3 rows
+                sheets = pd.read_excel(output_file, sheet_name=None)
+                self.assertEqual(list(sheets), ["Sheet1", "Sheet2", "Sheet3"])
+                self.assertEqual([len(sheet) for sheet in sheets.values()], [3, 3, 2])
+
+                pd.testing.assert_frame_equal(file_io.read_frame(output_file), expected_df)
+                pd.testing.assert_frame_equal(pd.concat(file_io.iter_file_chunks(output_file, 2), ignore_index=True), expected_df)
+
+    def test_excel_reads_match_read_excel(self):
+        """
+      In this test, we check that whole and chunked Excel reads give the same table as read_excel for a sheet without a
+      dimension element (whose rows are as long as their last value), with blank and repeated header cells.
+      """
+        import re
+        import zipfile
+        from openpyxl import Workbook
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            written_file = os.path.join(temp_dir, "written.xlsx")
+            workbook = Workbook()
+            for row in [["a", None, "a", "b", "a"], [1, 2.5, "x", 4, 5], [6, 7], [8, None, "y"], [9, 1.5, "z", 3, 2]]:
+                workbook.active.append(row)
+            workbook.save(written_file)
+
+            excel_file = os.path.join(temp_dir, "no_dimension.xlsx")
+            with zipfile.ZipFile(written_file) as source, zipfile.ZipFile(excel_file, "w") as target:
+                for item in source.infolist():
+                    data = source.read(item.filename)
+                    if item.filename == "xl/worksheets/sheet1.xml":
+                        data = re.sub(rb"<dimension[^>]*/>", b"", data)
+                    target.writestr(item, data)
+
+            expected_df = pd.read_excel(excel_file)
+            self.assertEqual(list(expected_df.columns), ["a", "Unnamed: 1", "a.1", "b", "a.2"])
+            pd.testing.assert_frame_equal(file_io.read_frame(excel_file), expected_df)
+            pd.testing.assert_frame_equal(pd.concat(file_io.iter_file_chunks(excel_file, 2), ignore_index=True), expected_df)
+            pd.testing.assert_frame_equal(file_io.read_frame(excel_file, ["a.1", "b"]), pd.read_excel(excel_file, usecols=["a.1", "b"]))
+
+    def test_excel_blank_rows(self):
+        """
+      In this test, we check that blank rows in the middle of an Excel sheet are kept as rows of missing values and blank rows
+      at its end are dropped, as read_excel does, by whole and chunked reads.
+      """
+        from openpyxl import Workbook
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            excel_file = os.path.join(temp_dir, "blank_rows.xlsx")
+            workbook = Workbook()
+            for row in [["A", "B"], [1, "x"], [None, None], [None, None], [2, "y"], [3, "z"], [None, None]]:
+                workbook.active.append(row)
+            workbook.save(excel_file)
+
+            expected_df = pd.read_excel(excel_file)
+            self.assertEqual(len(expected_df), 5)
+            pd.testing.assert_frame_equal(file_io.read_frame(excel_file), expected_df)
+            chunks = list(file_io.iter_file_chunks(excel_file, 3))
+            self.assertEqual([len(chunk) for chunk in chunks], [3, 2])
+            pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True).astype(expected_df.dtypes), expected_df)
+
+    def test_failed_csv_write_keeps_output(self):
+        """
+      In this test, we check that a CSV output written at once is only replaced once the new rows are fully written.
+      """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_file = os.path.join(temp_dir, "combined.csv")
+            file_io.write_frame(pd.DataFrame({"A": [1, 2]}), output_file)
+
+            with mock.patch.object(pd.DataFrame, "to_csv", side_effect=OSError("No space left on device")):
+                with self.assertRaises(OSError):
+                    file_io.write_frame(pd.DataFrame({"A": [3, 4]}), output_file)
+            self.assertEqual(os.listdir(temp_dir), ["combined.csv"])
+            pd.testing.assert_frame_equal(pd.read_csv(output_file), pd.DataFrame({"A": [1, 2]}))
+
+    def test_combine_compressed_files(self):
+        """
+      In this test, we check that gzip, bz2 and xz compressed CSV files are found, read and combined into a compressed output.
+      """
+        expected_df = pd.DataFrame({"A": [0, 1, 2, 3, 4, 5, 6, 7], "B": [1.5, 2.5, 1.5, 2.5, 1.5, 2.5, 1.5, 2.5]})
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = os.path.join(temp_dir, "input")
+            os.makedirs(input_dir)
+            for i, extension in enumerate(["csv", "csv.gz", "csv.bz2", "csv.xz"]):
+                expected_df.iloc[2 * i:2 * i + 2].to_csv(os.path.join(input_dir, f"file{i}.{extension}"), index=False)
+
+            output_file = os.path.join(temp_dir, "combined.csv.gz")
+            for chunk_size in [None, 1]:
+                metrics = combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", chunk_size=chunk_size)
+                self.assertTrue(metrics.succeeded)
+                self.assertEqual(metrics.stages["read"].calls, 4 if chunk_size is None else 8)
+                with open(output_file, "rb") as f:
+                    self.assertEqual(f.read(2), b"\x1f\x8b")
+                pd.testing.assert_frame_equal(pd.read_csv(output_file), expected_df)
+
+    def test_reconcile_differing_columns(self):
+        """
+      In this test, we check that files with differing columns and dtypes are aligned to their union or intersection instead of aborting.
+      """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = os.path.join(temp_dir, "input")
+            os.makedirs(input_dir)
+            pd.DataFrame({"A": [1, 2], "B": [1.5, 2.5]}).to_csv(os.path.join(input_dir, "file0.csv"), index=False)
+            pd.DataFrame({"B": [3, 4], "A": [3, 4], "C": ["x", "y"]}).to_csv(os.path.join(input_dir, "file1.csv"), index=False)
+            pd.DataFrame({"A": [5, 6], "C": [7, 8]}).to_csv(os.path.join(input_dir, "file2.csv"), index=False)
+
+            target = combine_module.reconcile_files(input_dir, ["file0.csv", "file1.csv", "file2.csv"])
+            self.assertEqual(list(target), ["A", "B", "C"])
+            self.assertEqual(str(target["A"]), "int64")
+            self.assertEqual(str(target["B"]), "float64")
+            self.assertEqual(str(target["C"]), "str")
+
+            output_file = os.path.join(temp_dir, "combined.csv")
+            expected_union = pd.DataFrame({"A": [1, 2, 3, 4, 5, 6], "B": [1.5, 2.5, 3, 4, None, None],
+                                           "C": [None, None, "x", "y", "7", "8"]})
+            for chunk_size in [None, 1]:
+                metrics = combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", chunk_size=chunk_size, reconcile="union")
+                self.assertTrue(metrics.succeeded)
+                pd.testing.assert_frame_equal(pd.read_csv(output_file, dtype={"C": "str"}), expected_union)
+
+                metrics = combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", chunk_size=chunk_size, reconcile="intersection")
+                self.assertTrue(metrics.succeeded)
+                pd.testing.assert_frame_equal(pd.read_csv(output_file), pd.DataFrame({"A": [1, 2, 3, 4, 5, 6]}))
+
+            # without reconciliation, the differing headers still abort the combination
+            with self.assertLogs(level="ERROR"):
+                self.assertFalse(combine_files(input_dir=input_dir, output_file=output_file, file_type="csv").succeeded)
+
+    def test_reconcile_decimals_after_sampled_rows(self):
+        """
+      In this test, we check that decimals after the sampled rows of an integer column widen it instead of aborting a reconciled combination.
+      """
+        values = [str(i) for i in range(150)]
+        values[120] = "120.5"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = os.path.join(temp_dir, "input")
+            os.makedirs(input_dir)
+            # written by hand, pandas would write the ints of a column with a decimal as 1.0, 2.0, ...
+            with open(os.path.join(input_dir, "file0.csv"), "w") as f:
+                f.write("A\n" + "\n".join(values) + "\n")
+            with open(os.path.join(input_dir, "file1.csv"), "w") as f:
+                f.write("A,B\n" + "".join(f"{value},{value}\n" for value in values))
+            self.assertEqual(str(combine_module.reconcile_files(input_dir, ["file0.csv", "file1.csv"])["B"]), "Int64")
+
+            expected_df = pd.DataFrame({"A": [float(value) for value in values] * 2, "B": [None] * 150 + [float(value) for value in values]})
+            for chunk_size, extension in [(None, ".csv"), (40, ".csv"), (None, ".parquet"), (40, ".parquet")]:
+                if extension == ".parquet" and not importlib.util.find_spec("pyarrow"):
+                    continue
+                output_file = os.path.join(temp_dir, "combined" + extension)
+                metrics = combine_files(input_dir=input_dir, output_file=output_file, file_type="both", chunk_size=chunk_size, reconcile="union")
+                self.assertTrue(metrics.succeeded)
+                combined_df = pd.read_csv(output_file) if extension == ".csv" else pd.read_parquet(output_file)
+                pd.testing.assert_frame_equal(combined_df.astype("float64"), expected_df)
+
+    def test_merge_sorted_files(self):
+        """
+      In this test, we check that files sorted by time are merged into a time ordered output, in one and in several chunks per file.
+      """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = os.path.join(temp_dir, "input")
+            os.makedirs(input_dir)
+            times = [["2024-01-01 00:00", "2024-01-01 02:00", "2024-01-01 05:00"], ["2024-01-01 01:00", "2024-01-01 02:00"],
+                     ["2024-01-01 03:00", "2024-01-01 04:00", "2024-01-01 06:00", "2024-01-01 07:00"]]
+            for device, device_times in enumerate(times):
+                pd.DataFrame({"time": device_times, "device": device}).to_csv(os.path.join(input_dir, f"device{device}.csv"), index=False)
+
+            expected_df = pd.DataFrame({
+                "time": ["2024-01-01 00:00", "2024-01-01 01:00", "2024-01-01 02:00", "2024-01-01 02:00", "2024-01-01 03:00",
+                         "2024-01-01 04:00", "2024-01-01 05:00", "2024-01-01 06:00", "2024-01-01 07:00"],
+                "device": [0, 1, 0, 1, 2, 2, 0, 2, 2],
+            })
+            output_file = os.path.join(temp_dir, "merged.csv")
+            for chunk_size in [None, 2]:
+                metrics = combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", chunk_size=chunk_size, merge_on="time")
+                self.assertTrue(metrics.succeeded)
+                pd.testing.assert_frame_equal(pd.read_csv(output_file), expected_df)
+
+            # a file that isn't sorted aborts the merge without touching the output
+            pd.DataFrame({"time": ["2024-01-02", "2024-01-01"], "device": 3}).to_csv(os.path.join(input_dir, "device3.csv"), index=False)
+            with self.assertLogs(level="ERROR") as log:
+                self.assertFalse(combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", merge_on="time").succeeded)
+            self.assertIn("is not sorted by 'time'", log.output[0])
+            pd.testing.assert_frame_equal(pd.read_csv(output_file), expected_df)
+
+    def test_dedup_overlapping_files(self):
+        """
+      In this test, we check that rows in several overlapping files are written once, in memory, in chunks and while merging.
+      """
+        expected_df = pd.DataFrame({"time": [f"2024-01-01 00:00:{second:02d}" for second in range(10)], "A": [1, 2, 3, 1, 2, 3, 1, 2, 3, 1]})
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = os.path.join(temp_dir, "input")
+            os.makedirs(input_dir)
+            for i, (start, stop) in enumerate([(0, 6), (4, 10), (2, 5)]):
+                expected_df.iloc[start:stop].to_csv(os.path.join(input_dir, f"export{i}.csv"), index=False)
+
+            output_file = os.path.join(temp_dir, "combined.csv")
+            for options in [{}, {"chunk_size": 2}, {"merge_on": "time", "chunk_size": 2}]:
+                metrics = combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", dedup=True, **options)
+                self.assertTrue(metrics.succeeded)
+                self.assertEqual(metrics.duplicate_rows, 5)
+                self.assertEqual(metrics.to_dict()["duplicate_rows"], 5)
+                pd.testing.assert_frame_equal(pd.read_csv(output_file), expected_df)
+
+            # on a key column, only the first row of every value of A is kept
+            metrics = combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", dedup=["A"])
+            self.assertEqual(metrics.duplicate_rows, 12)
+            pd.testing.assert_frame_equal(pd.read_csv(output_file), expected_df.iloc[:3])
+            self.assertIsNone(combine_files(input_dir=input_dir, output_file=output_file, file_type="csv").duplicate_rows)
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_streamed_combine_widens_arrow_columns(self):
+        """
+      In this test, we check that a chunked combine into Parquet and Feather files widens a column of ints when a later chunk has decimals.
+      """
+        expected_df = pd.DataFrame({"A": [1, 2, 3, 4, 5.5, 6], "B": list("abcdef")})
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = os.path.join(temp_dir, "input")
+            os.makedirs(input_dir)
+            # the first chunks only have ints, pandas would write them as 1.0, 2.0, ...
+            with open(os.path.join(input_dir, "export.csv"), "w") as f:
+                f.write("A,B\n1,a\n2,b\n3,c\n4,d\n5.5,e\n6,f\n")
+
+            for output_file in [os.path.join(temp_dir, "combined.parquet"), os.path.join(temp_dir, "combined.feather")]:
+                metrics = combine_files(input_dir=input_dir, output_file=output_file, file_type="both", chunk_size=2)
+                self.assertTrue(metrics.succeeded)
+                combined_df = pd.read_parquet(output_file) if output_file.endswith(".parquet") else pd.read_feather(output_file)
+                pd.testing.assert_frame_equal(combined_df, expected_df)
+            self.assertFalse([file for file in os.listdir(temp_dir) if file.endswith(".part")])
+
+    @unittest.skipIf(os.name == "nt", "file modes are POSIX only")
+    def test_outputs_get_default_permissions(self):
+        """
+      In this test, we check that outputs and metrics files get the default permissions of new files, as set by the umask.
+      """
+        umask = os.umask(0o027)
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                for output_file in [os.path.join(temp_dir, "combined.csv"), os.path.join(temp_dir, "combined.xlsx")]:
+                    metrics_file = os.path.join(temp_dir, "metrics.json")
+                    metrics = combine_files(input_dir=self.test_dir, output_file=output_file, file_type="both", chunk_size=1, metrics_file=metrics_file)
+                    self.assertTrue(metrics.succeeded)
+                    self.assertEqual(os.stat(output_file).st_mode & 0o777, 0o640)
+                    self.assertEqual(os.stat(metrics_file).st_mode & 0o777, 0o640)
+                self.assertEqual(os.umask(0o027), 0o027)
+        finally:
+            os.umask(umask)
+
+    def test_dedup_across_chunk_dtypes(self):
+        """
+      In this test, we check that duplicates are found when a chunk reads a column with another dtype, e.g. ints turning into floats.
+      """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = os.path.join(temp_dir, "input")
+            os.makedirs(input_dir)
+            # the chunks read A as ints, floats (1.5) and floats with a missing value (1.0, n/a), and C as text or as empty floats
+            with open(os.path.join(input_dir, "export.csv"), "w") as f:
+                f.write("A,B,C\n1,x,2024-01-01\n2,y,\n1.5,z,\n1,x,2024-01-01\n1,,2024-01-01\nn/a,,2024-01-01\n")
+            output_file = os.path.join(temp_dir, "combined.csv")
+            metrics = combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", chunk_size=2, dedup=True)
+            self.assertTrue(metrics.succeeded)
+            self.assertEqual(metrics.duplicate_rows, 1)
+            self.assertEqual(pd.read_csv(output_file)["B"].tolist(), ["x", "y", "z", np.nan, np.nan])
+
+            metrics = combine_files(input_dir=input_dir, output_file=output_file, file_type="csv", chunk_size=2, dedup=["A"])
+            self.assertEqual(metrics.duplicate_rows, 2)
+
 if __name__ == "__main__":
     unittest.main()
-
@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import tempfile
+import unittest
+from datetime import datetime
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.combine_files import combine_files, get_files
+from src.discovery import discover_files, parse_timestamp
+
+class TestDiscovery(unittest.TestCase):
+    def setUp(self):
+        # a date partitioned layout with a file name timestamp, a misplaced file and a file of another type
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = self.temp_dir.name
+        self.files = {
+            "2024/01/02/sensor_a.csv": 1,
+            "2024/01/10/sensor_b.csv": 2,
+            "2023/12/31/sensor_c.csv": 3,
+            "misc/log_20231130.csv": 4,
+            "readme.txt": 5,
+        }
+        for relative_path, value in self.files.items():
+            path = os.path.join(self.input_dir, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pd.DataFrame({"A": [value]}).to_csv(path, index=False)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_recursive_discovery_and_order(self):
+        """
+      In this test, we check that files are found in subdirectories and sorted by name or by the date in their path.
+      """
+        self.assertEqual(discover_files(self.input_dir, (".csv",)), [])
+        self.assertEqual(
+            discover_files(self.input_dir, (".csv",), recursive=True),
+            ["2023/12/31/sensor_c.csv", "2024/01/02/sensor_a.csv", "2024/01/10/sensor_b.csv", "misc/log_20231130.csv"]
+        )
+        self.assertEqual(
+            discover_files(self.input_dir, (".csv",), recursive=True, sort_by="timestamp"),
+            ["misc/log_20231130.csv", "2023/12/31/sensor_c.csv", "2024/01/02/sensor_a.csv", "2024/01/10/sensor_b.csv"]
+        )
+        self.assertEqual(parse_timestamp("log_20240131T120501.csv"), datetime(2024, 1, 31, 12, 5, 1))
+        self.assertIsNone(parse_timestamp("sensor_12345678.csv"))
+
+    def test_glob_mtime_and_size_filters(self):
+        """
+      In this test, we check the include/exclude patterns and the modification time and size filters.
+      """
+        found = discover_files(self.input_dir, (".csv",), recursive=True, include="2024/*/*/*.csv", exclude=["sensor_b*"])
+        self.assertEqual(found, ["2024/01/02/sensor_a.csv"])
+
+        old = time.time() - 3600
+        os.utime(os.path.join(self.input_dir, "misc", "log_20231130.csv"), (old, old))
+        found = discover_files(self.input_dir, (".csv",), recursive=True, min_mtime=time.time() - 60, sort_by="mtime")
+        self.assertNotIn("misc/log_20231130.csv", found)
+        self.assertEqual(len(found), 3)
+        self.assertEqual(discover_files(self.input_dir, (".csv",), recursive=True, max_size=1), [])
+
+    def test_combine_partitioned_directory(self):
+        """
+      In this test, we check that a partitioned directory is combined in timestamp order, leaving out the output file inside it.
+      """
+        output_file = os.path.join(self.input_dir, "combined.csv")
+        for _ in range(2):
+            metrics = combine_files(input_dir=self.input_dir, output_file=output_file, file_type="csv",
+                                    discovery={"recursive": True, "sort_by": "timestamp"})
+            self.assertTrue(metrics.succeeded)
+            pd.testing.assert_frame_equal(pd.read_csv(output_file), pd.DataFrame({"A": [4, 3, 1, 2]}))
+
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(get_files(self.input_dir, "csv", output_file, sort_by="size"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,21 +1,38 @@
 import os
 import sys
+import tempfile
 import unittest
+import threading
+from unittest import mock
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
 import numpy as np
 import pandas as pd
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from src.combine_files import combine_files
+from src.combine_files import combine_and_filter, combine_files
 
 class TestCombineFilesErrors(unittest.TestCase):
     def setUp(self):
+        # parsed Excel files are cached in a temporary directory, not in the user's cache
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        cache_env = mock.patch.dict(os.environ, {"COMBINE_FILTER_CACHE_DIR": self.cache_dir.name})
+        cache_env.start()
+        self.addCleanup(cache_env.stop)
         self.test_dir_1 = os.path.join("tests_IO", "diff_sized_files")
         self.test_dir_2 = os.path.join("tests_IO", "diff_col_names")
         self.test_dir_3 = os.path.join("tests_IO", "empty_cells")
+        self.test_dir_4 = os.path.join("tests_IO", "inconsistent_headers")
         self.output_file_1 = os.path.join("tests_IO", "output_mismatch.csv")
         self.output_file_2 = os.path.join("tests_IO", "output_inconsistent_size.csv")
         self.output_file_3 = os.path.join("tests_IO", "output_inconsistent_name.csv")
         self.output_file_4 = os.path.join("tests_IO", "output_empty_cells.csv")
+        self.output_file_5 = os.path.join("tests_IO", "output_streamed_mismatch.csv")
+        self.output_file_6 = os.path.join("tests_IO", "output_parallel_mismatch.csv")
+        self.output_file_7 = os.path.join("tests_IO", "output_inconsistent_headers.csv")
+        self.output_file_8 = os.path.join("tests_IO", "output_invalid_conditions.csv")
+        self.output_file_9 = os.path.join("tests_IO", "output_cancelled.csv")
 
     def test_mismatched_file_type(self):
         """
@@ -67,5 +84,102 @@ class TestCombineFilesErrors(unittest.TestCase):
         # check that the combined output matches the expected DataFrame
         pd.testing.assert_frame_equal(combined_df, expected_df)
 
+    def test_streamed_inconsistent_col_name(self):
+        """
+      In this test, we check that a streamed combination aborts on inconsistent columns without leaving an output file behind.
+      """
+        with self.assertLogs(level="ERROR") as log:
+            combine_files(input_dir=self.test_dir_2, output_file=self.output_file_5, file_type="csv", chunk_size=1)
+
+        # verify error log about inconsistent columns and that no (partial) output was written
+        self.assertIn("Files have inconsistent columns or data types. Aborting combination.", log.output[0])
+        self.assertFalse(os.path.exists(self.output_file_5))
+        self.assertFalse([f for f in os.listdir("tests_IO") if f.endswith(".part")])
+
+    def test_parallel_inconsistent_col_sizes(self):
+        """
+      In this test, we check that the parallel combination still aborts on the first inconsistent file.
+      """
+        with self.assertLogs(level="ERROR") as log:
+            combine_files(input_dir=self.test_dir_1, output_file=self.output_file_6, file_type="both", workers=2)
+
+        # verify error log about inconsistent columns and that nothing was written
+        self.assertIn("Files have inconsistent columns or data types. Aborting combination.", log.output[0])
+        self.assertFalse(os.path.exists(self.output_file_6))
+
+    def test_preflight_reports_all_inconsistent_files(self):
+        """
+      In this test, we check that the header probe reports every inconsistent file at once without fully reading any file.
+      """
+        with mock.patch("src.combine_files.read_file") as read_file, self.assertLogs(level="ERROR") as log:
+            combine_files(input_dir=self.test_dir_4, output_file=self.output_file_7, file_type="csv")
+
+        # verify that both the reordered and the retyped file are reported, and no file was parsed
+        self.assertIn("Files have inconsistent columns or data types. Aborting combination.", log.output[0])
+        self.assertIn("File file2.csv has the columns in a different order", log.output[1])
+        self.assertIn("File file3.csv has inconsistent data types: C (text, expected numeric)", log.output[2])
+        read_file.assert_not_called()
+        self.assertFalse(os.path.exists(self.output_file_7))
+
+    def test_combine_and_filter_invalid_column(self):
+        """
+      In this test, we check that the combination is aborted if a condition refers to a column the files don't have.
+      """
+        conditions = {"D": {"type": "equals", "value": 10}}
+        with self.assertLogs(level="ERROR") as log:
+            combine_and_filter(input_dir=self.test_dir_3, output_file=self.output_file_8, conditions=conditions, file_type="csv")
+
+        # verify the validation error and that nothing was written
+        self.assertIn("Value error: Column 'D' not found in the data. Please check the column names.", log.output[0])
+        self.assertFalse(os.path.exists(self.output_file_8))
+
+    def test_cancel_streamed_combination(self):
+        """
+      In this test, we check that cancelling a streamed combination halfway through leaves no (partial) output file behind.
+      """
+        cancel_event = threading.Event()
+        events = []
+
+        def progress(event):
+            # cancel as soon as the first chunk was written
+            events.append(event)
+            cancel_event.set()
+
+        with self.assertLogs(level="WARNING") as log:
+            combine_files(input_dir=self.test_dir_3, output_file=self.output_file_9, file_type="csv", chunk_size=1,
+                          progress=progress, cancel_event=cancel_event)
+
+        # verify the cancellation was logged after the first chunk and nothing was written
+        self.assertIn(f"Combination cancelled, {self.output_file_9} was not written.", log.output[-1])
+        self.assertEqual(len(events), 1)
+        self.assertFalse(os.path.exists(self.output_file_9))
+        self.assertFalse([f for f in os.listdir("tests_IO") if f.endswith(".part")])
+
+    def test_parallel_worker_failure(self):
+        """
+      In this test, we check that a worker process dying is logged and aborts the parallel combination without writing anything.
+      """
+        class BrokenPool:
+            # stands in for a process pool whose worker died, every file submitted to it fails
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def submit(self, *args):
+                future = Future()
+                future.set_exception(BrokenProcessPool("A child process terminated abruptly."))
+                return future
+
+            def shutdown(self, **kwargs):
+                pass
+
+        output_file = os.path.join(self.cache_dir.name, "output_worker_failure.csv")
+        with mock.patch("src.combine_files.ProcessPoolExecutor", BrokenPool), self.assertLogs(level="ERROR") as log:
+            metrics = combine_files(input_dir=os.path.join("tests_IO", "same_sized_files"), output_file=output_file, file_type="both",
+                                    workers=2, preflight=False)
+
+        self.assertFalse(metrics.succeeded)
+        self.assertTrue(any("failed in a worker: BrokenProcessPool" in entry for entry in log.output), log.output)
+        self.assertFalse(os.path.exists(output_file))
+
 if __name__ == "__main__":
     unittest.main()
@@ -32,7 +32,7 @@ class TestFilterFile(unittest.TestCase):
         conditions = {"A": {"type": "greater_than", "value": 5}}
         with self.assertLogs(level="ERROR") as log:
             filter_file(file_path=unsupported_file, output_file=self.output_file_2, conditions=conditions)
-        self.assertIn("Unsupported file format. Please select a CSV or Excel file.", log.output[0])
+        self.assertIn("Unsupported file format. Please select a CSV, Excel, Parquet or Feather file.", log.output[0])
 
     def test_invalid_condition_type(self):
         """
@@ -52,5 +52,40 @@ class TestFilterFile(unittest.TestCase):
             validate_conditions(conditions, self.df_columns)
         self.assertIn("Condition 'greater_than' for column 'A' requires a numeric value.", str(context.exception))
 
+    def test_invalid_expression(self):
+        """
+      In this test, we check that filter expressions with a syntax error or an unknown column are rejected before filtering.
+      """
+        with self.assertRaises(ValueError) as context:
+            validate_conditions({"expression": "A > 5 AND"}, self.df_columns)
+        self.assertIn("Invalid filter expression 'A > 5 AND'", str(context.exception))
+
+        with self.assertRaises(ValueError) as context:
+            validate_conditions({"expression": ["A > 5", "D IS NULL"]}, self.df_columns)
+        self.assertIn("The following columns in the filter expression are not valid: D", str(context.exception))
+
+    def test_invalid_time_range(self):
+        """
+      In this test, we check that a time range on an unknown column, or ending before it starts, is rejected.
+      """
+        with self.assertRaises(ValueError) as context:
+            validate_conditions({"time_range": {"start": "2024-01-01"}}, self.df_columns)
+        self.assertIn("Column 'time' of the time range not found in the data.", str(context.exception))
+
+        with self.assertRaises(ValueError) as context:
+            validate_conditions({"time_range": {"column": "A", "start": "2024-02-01", "end": "2024-01-01"}}, self.df_columns)
+        self.assertIn("has to be before its end", str(context.exception))
+
+    def test_invalid_aggregation(self):
+        """
+      In this test, we check that an aggregation with an unknown column, function or time bucket is rejected.
+      """
+        for aggregate, message in [({"by": "D"}, "columns of the aggregation are not valid: D"),
+                                   ({"by": "A", "functions": ["median"]}, "Unsupported aggregate functions: median"),
+                                   ({"by": "A", "every": "1 fortnight"}, "Invalid time bucket '1 fortnight'")]:
+            with self.assertLogs(level="ERROR") as log:
+                self.assertFalse(filter_file(self.test_file, self.output_file_1, {}, aggregate=aggregate).succeeded)
+            self.assertTrue(any(message in entry for entry in log.output), log.output)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import unittest
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.expressions import evaluate_expression, expression_columns, expression_filters, parse_expression
+from src.filter_combined_file import conditions_from_list
+
+class TestExpressions(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            "time": ["2024-01-01 00:00:00", "2024-01-15 12:00:00", "2024-02-01 00:00:00", "2023-12-31 23:59:59"],
+            "tempSen1": [18.5, 25.0, 31.0, np.nan],
+            "sensor": ["lab_1", "hall_2", "lab_3", None],
+        })
+
+    def test_parse_and_evaluate(self):
+        """
+      In this test, we check the precedence of NOT, AND and OR, chained comparisons, null checks and string matches.
+      """
+        cases = {
+            "20 < tempSen1 < 30": [False, True, False, False],
+            "tempSen1 BETWEEN 20 AND 35 or tempSen1 is null": [False, True, True, True],
+            "NOT tempSen1 < 20 AND sensor STARTSWITH 'lab_'": [False, False, True, False],
+            "sensor IN ('lab_1', 'hall_2') OR NOT (tempSen1 >= 20 OR sensor CONTAINS '3')": [True, True, False, True],
+            "sensor NOT IN ('lab_1') AND sensor IS NOT NULL": [False, True, True, False],
+        }
+        for text, expected in cases.items():
+            np.testing.assert_array_equal(evaluate_expression(parse_expression(text), self.df), expected, err_msg=text)
+        self.assertEqual(expression_columns(parse_expression("sensor ENDSWITH '1' OR 20 < tempSen1")), ["sensor", "tempSen1"])
+
+    def test_datetime_range(self):
+        """
+      In this test, we check that date literals select a time range on text and on datetime columns alike.
+      """
+        node = parse_expression("time >= '2024-01-01' AND time < '2024-02-01'")
+        expected = [True, True, False, False]
+        np.testing.assert_array_equal(evaluate_expression(node, self.df), expected)
+        df = self.df.assign(time=pd.to_datetime(self.df["time"]))
+        np.testing.assert_array_equal(evaluate_expression(node, df), expected)
+        self.assertEqual(expression_filters(node), [])
+
+    def test_pushdown_and_gui_list(self):
+        """
+      In this test, we check the pyarrow filters of an expression and that repeated GUI conditions on one column are all kept.
+      """
+        node = parse_expression("20 < tempSen1 AND sensor IN ('lab_1') AND (tempSen1 < 30 OR sensor IS NULL)")
+        self.assertEqual(expression_filters(node), [("tempSen1", ">", 20), ("sensor", "in", ["lab_1"])])
+
+        conditions = conditions_from_list([
+            ("tempSen1", "greater_than", 20.0), ("tempSen1", "less_than", 30.0), ("expression", "sensor IS NULL"),
+            ("columns_to_keep", ["tempSen1"]),
+        ])
+        self.assertEqual(conditions, {
+            "tempSen1": [{"type": "greater_than", "value": 20.0}, {"type": "less_than", "value": 30.0}],
+            "expression": "sensor IS NULL",
+            "columns_to_keep": ["tempSen1"],
+        })
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,15 @@
 import os
 import sys
+import tempfile
 import unittest
+import importlib.util
+from unittest import mock
+import numpy as np
 import pandas as pd
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from src.filter_combined_file import filter_file
+from src import filter_combined_file as filter_module
+from src.filter_combined_file import build_mask, filter_file, time_window
 
 class TestFilterFile(unittest.TestCase):
     def setUp(self):
@@ -15,6 +20,12 @@ class TestFilterFile(unittest.TestCase):
         self.output_file_4 = os.path.join("tests_IO", "filtered_output_4.csv")
         self.output_file_5 = os.path.join("tests_IO", "filtered_output_5.csv")
         self.output_file_6 = os.path.join("tests_IO", "filtered_output_6.csv")
+        self.output_file_7 = os.path.join("tests_IO", "filtered_output_7.csv")
+        self.output_file_8 = os.path.join("tests_IO", "filtered_output_8.csv")
+        self.parquet_file = os.path.join("tests_IO", "input_test_filtering.parquet")
+        self.output_file_9 = os.path.join("tests_IO", "filtered_output_9.feather")
+        self.output_file_10 = os.path.join("tests_IO", "filtered_output_10.csv")
+        self.output_file_11 = os.path.join("tests_IO", "filtered_output_11.parquet")
 
     def test_greater_than_filter(self):
         """
@@ -82,5 +93,186 @@ class TestFilterFile(unittest.TestCase):
         expected_df = pd.DataFrame({"A": [1, 5, 10, 15, 20], "C": [3, 7, 12, 17, 22]})
         pd.testing.assert_frame_equal(filtered_df, expected_df)
 
+    def test_multiple_conditions_with_columns_to_keep(self):
+        """
+      In this test, we check that several conditions are combined, including one on a column that is not kept.
+      """
+        conditions = {
+            "A": {"type": "greater_than", "value": 1},
+            "B": {"type": "less_than", "value": 20},
+            "C": {"type": "not_equals", "value": 12},
+            "columns_to_keep": ["C", "A"]
+        }
+        filter_file(file_path=self.test_file, output_file=self.output_file_7, conditions=conditions)
+        filtered_df = pd.read_csv(self.output_file_7)
+
+        expected_df = pd.DataFrame({"C": [7, 17], "A": [5, 15]})
+        pd.testing.assert_frame_equal(filtered_df, expected_df)
+
+    def test_chunked_filter(self):
+        """
+      In this test, we check that filtering the file in chunks gives the same result as filtering it at once.
+      """
+        conditions = {"A": {"type": "greater_than", "value": 1}, "columns_to_remove": ["B"]}
+        filter_file(file_path=self.test_file, output_file=self.output_file_8, conditions=conditions, chunk_size=2)
+        filtered_df = pd.read_csv(self.output_file_8)
+
+        expected_df = pd.DataFrame({"A": [5, 10, 15, 20], "C": [7, 12, 17, 22]})
+        pd.testing.assert_frame_equal(filtered_df, expected_df)
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_parquet_filter_to_feather(self):
+        """
+      In this test, we check the filtering of a Parquet file (in chunks and at once) into a Feather file.
+      """
+        pd.read_csv(self.test_file).to_parquet(self.parquet_file, index=False, row_group_size=2)
+        conditions = {"A": {"type": "greater_than", "value": 5}, "C": {"type": "not_equals", "value": 17}}
+        expected_df = pd.DataFrame({"A": [10, 20], "B": [11, 21], "C": [12, 22]})
+
+        for chunk_size in (None, 1):
+            filter_file(file_path=self.parquet_file, output_file=self.output_file_9, conditions=conditions, chunk_size=chunk_size)
+            filtered_df = pd.read_feather(self.output_file_9)
+            pd.testing.assert_frame_equal(filtered_df, expected_df)
+
+    def test_filter_returns_stage_metrics(self):
+        """
+      In this test, we check that filtering returns the timings and row counts of its stages.
+      """
+        conditions = {"A": {"type": "greater_than", "value": 15}, "B": {"type": "less_than", "value": 90}}
+        metrics = filter_file(self.test_file, self.output_file_10, conditions)
+
+        # the rows left after every condition are recorded, along with the bytes read and written
+        self.assertTrue(metrics.succeeded)
+        self.assertEqual(metrics.stages["read"].bytes_read, os.path.getsize(self.test_file))
+        self.assertEqual(metrics.stages["write"].bytes_written, os.path.getsize(self.output_file_10))
+        self.assertEqual(metrics.stages["filter"].rows_out, len(pd.read_csv(self.output_file_10)))
+        self.assertGreaterEqual(metrics.stages["filter:A"].rows_out, metrics.stages["filter:B"].rows_out)
+        self.assertGreater(metrics.to_dict()["seconds"], 0)
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_filter_with_schema(self):
+        """
+      In this test, we check that the schema spec sets the dtypes of the filtered columns, in memory and in chunks.
+      """
+        conditions = {"A": {"type": "greater_than", "value": 15}, "columns_to_keep": ["A", "B"]}
+        expected_df = pd.read_csv(self.test_file)[["A", "B"]].query("A > 15").reset_index(drop=True).astype("float32")
+        for chunk_size in [None, 2]:
+            filter_file(self.test_file, self.output_file_11, conditions, chunk_size=chunk_size, schema={"[AB]": "float32"})
+            pd.testing.assert_frame_equal(pd.read_parquet(self.output_file_11), expected_df)
+
+    def test_filter_compressed_file(self):
+        """
+      In this test, we check that a compressed CSV file is filtered into a compressed output, in memory and in chunks.
+      """
+        conditions = {"A": {"type": "greater_than", "value": 15}}
+        expected_df = pd.read_csv(self.test_file).query("A > 15").reset_index(drop=True)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_file = os.path.join(temp_dir, "input.csv.gz")
+            output_file = os.path.join(temp_dir, "filtered.csv.bz2")
+            pd.read_csv(self.test_file).to_csv(input_file, index=False)
+            for chunk_size in [None, 2]:
+                self.assertTrue(filter_file(input_file, output_file, conditions, chunk_size=chunk_size).succeeded)
+                pd.testing.assert_frame_equal(pd.read_csv(output_file), expected_df)
+
+    def test_filter_expression(self):
+        """
+      In this test, we check a filter expression with OR, a chained range and an in-set, next to two conditions on one column.
+      """
+        df = pd.read_csv(self.test_file)
+        conditions = {
+            "A": [{"type": "greater_than", "value": 1}, {"type": "less_than", "value": 20}],
+            "expression": "2 < B < 12 OR C IN (17, 3)",
+            "columns_to_keep": ["A", "C"],
+        }
+        expected_df = df[(df.A > 1) & (df.A < 20) & (((df.B > 2) & (df.B < 12)) | df.C.isin([17, 3]))][["A", "C"]].reset_index(drop=True)
+        self.assertEqual(expected_df["A"].tolist(), [5, 10, 15])
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_file = os.path.join(temp_dir, "filtered.csv")
+            for chunk_size in [None, 2]:
+                metrics = filter_file(self.test_file, output_file, conditions, chunk_size=chunk_size)
+                self.assertTrue(metrics.succeeded)
+                self.assertIn("filter:expression", metrics.stages)
+                pd.testing.assert_frame_equal(pd.read_csv(output_file), expected_df)
+
+            # the in-set and range of the expression are pushed down to the Parquet reader
+            if importlib.util.find_spec("pyarrow"):
+                conditions = {"expression": "A BETWEEN 5 AND 15 AND NOT C IN (12)"}
+                filter_file(self.parquet_file, output_file, conditions)
+                self.assertEqual(pd.read_csv(output_file)["A"].tolist(), [5, 15])
+
+    def test_time_range_filter(self):
+        """
+      In this test, we check the time range filter on a sorted time column, in memory and in chunks, where chunks outside the range
+      are skipped and reading stops after the range if the column is known to be sorted.
+      """
+        df = pd.DataFrame({"time": pd.date_range("2024-01-01", periods=100, freq="h").strftime("%Y-%m-%d %H:%M:%S"), "A": range(100)})
+        conditions = {"time_range": {"start": "2024-01-02", "end": "2024-01-03 06:00"}, "A": {"type": "not_equals", "value": 30}}
+        expected_df = df[(df["time"] >= "2024-01-02") & (df["time"] < "2024-01-03 06:00") & (df["A"] != 30)].reset_index(drop=True)
+        self.assertEqual(len(expected_df), 29)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_file = os.path.join(temp_dir, "input.csv")
+            output_file = os.path.join(temp_dir, "filtered.csv")
+            df.to_csv(input_file, index=False)
+            for is_sorted in [None, True]:
+                conditions["time_range"]["sorted"] = is_sorted
+                for chunk_size in [None, 10]:
+                    metrics = filter_file(input_file, output_file, conditions, chunk_size=chunk_size)
+                    self.assertTrue(metrics.succeeded)
+                    pd.testing.assert_frame_equal(pd.read_csv(output_file), expected_df)
+                    if chunk_size and is_sorted:
+                        # the chunk with 2024-01-03 06:00 is the last one read
+                        self.assertEqual(metrics.stages["read"].calls, 6)
+                    elif chunk_size:
+                        # the text times of every chunk are parsed, only the 4 chunks overlapping the range are filtered
+                        self.assertEqual(metrics.stages["filter:time_range"].calls, 4)
+
+        # datetime columns are searched when sorted, and masked otherwise
+        times = pd.DataFrame({"time": pd.to_datetime(df["time"]).dt.tz_localize("UTC")})
+        window = {"column": "time", "start": "2024-01-02", "end": "2024-01-03 06:00", "sorted": None}
+        self.assertEqual(time_window(times, window), slice(24, 54))
+        self.assertEqual(int(time_window(times.iloc[::-1], window).sum()), 30)
+
+    def test_aggregate_time_buckets(self):
+        """
+      In this test, we check per minute aggregates of the filtered rows, in memory and in chunks that split the minutes, against pandas' resample.
+      """
+        df = pd.DataFrame({"time": pd.date_range("2024-01-01", periods=300, freq="7s").strftime("%Y-%m-%d %H:%M:%S"),
+                           "A": [float(i % 13) for i in range(300)], "B": range(300)})
+        df.loc[::5, "A"] = None
+        aggregate = {"by": "time", "every": "1min", "functions": ["mean", "min", "max", "count"], "columns": ["A"]}
+        filtered = df[df["B"] != 100].assign(time=lambda d: pd.to_datetime(d["time"]))
+        expected_df = filtered.set_index("time")["A"].resample("1min").agg(["mean", "min", "max", "count"]).add_prefix("A_").reset_index()
+        expected_df["time"] = expected_df["time"].dt.strftime("%Y-%m-%d %H:%M:%S")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_file = os.path.join(temp_dir, "input.csv")
+            output_file = os.path.join(temp_dir, "aggregated.csv")
+            df.to_csv(input_file, index=False)
+            for chunk_size in [None, 11]:
+                metrics = filter_file(input_file, output_file, {"B": {"type": "not_equals", "value": 100}}, chunk_size=chunk_size,
+                                      aggregate=aggregate)
+                self.assertTrue(metrics.succeeded)
+                pd.testing.assert_frame_equal(pd.read_csv(output_file), expected_df, check_dtype=False)
+                self.assertEqual(metrics.stages["aggregate"].rows_in, 299)
+                self.assertEqual(metrics.stages["aggregate"].rows_out, 35)
+
+            # grouped by a key column, with all numeric columns by default
+            filter_file(input_file, output_file, {}, chunk_size=50, aggregate={"by": "A", "functions": ["sum"]})
+            self.assertEqual(pd.read_csv(output_file).set_index("A")["B_sum"].to_dict(), df.groupby("A")["B"].sum().to_dict())
+
+    def test_bool_columns_skip_numexpr(self):
+        """
+      In this test, we check that conditions on bool columns are evaluated by pandas, since numexpr can't compare bools with < and >.
+      """
+        df = pd.DataFrame({"A": [1, 2, 3], "flag": [True, False, True]})
+        numexpr = mock.Mock()
+        numexpr.evaluate.side_effect = lambda expression, local_dict: np.ones(3, dtype=bool)
+        with mock.patch.object(filter_module, "numexpr", numexpr):
+            mask = build_mask(df, {"A": {"type": "greater_than", "value": 1}, "flag": {"type": "greater_than", "value": 0}})
+            numexpr.evaluate.assert_not_called()
+            self.assertEqual(mask.tolist(), [False, False, True])
+
+            build_mask(df, {"A": {"type": "greater_than", "value": 1}})
+            numexpr.evaluate.assert_called_once()
+
 if __name__ == "__main__":
     unittest.main()
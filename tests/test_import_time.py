@@ -0,0 +1,49 @@
+import os
+import sys
+import unittest
+import subprocess
+import importlib.util
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# modules that must only be imported once a job runs (they make up most of the startup time)
+HEAVY_MODULES = {"pandas", "numpy", "openpyxl", "pyarrow"}
+
+def imported_modules(module, path):
+    """
+  This function imports module in a fresh interpreter with python -X importtime and returns the names of all modules
+  it imported. Which modules are imported doesn't depend on the speed of the machine, unlike the import times.
+  """
+    env = dict(os.environ, PYTHONPATH=path)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True)
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        modules.add(line.split("|")[-1].strip())
+    return modules
+
+class TestImportTime(unittest.TestCase):
+    def test_cli_startup(self):
+        """
+      In this test, we check that importing the CLI neither pulls in pandas & co. nor tkinter.
+      """
+        modules = imported_modules("src.cli", REPO_DIR)
+
+        self.assertIn("src.cli", modules)
+        self.assertFalse(HEAVY_MODULES & modules)
+        self.assertNotIn("tkinter", modules)
+
+    @unittest.skipUnless(importlib.util.find_spec("ttkbootstrap") and importlib.util.find_spec("_tkinter"), "the GUI dependencies are not installed")
+    def test_gui_startup(self):
+        """
+      In this test, we check that importing the GUI defers pandas and openpyxl to the jobs.
+      """
+        modules = imported_modules("select_files_gui", os.path.join(REPO_DIR, "src", "gui"))
+
+        self.assertIn("select_files_gui", modules)
+        self.assertFalse(HEAVY_MODULES & modules)
+
+if __name__ == "__main__":
+    unittest.main()